@@ -1,31 +1,60 @@
+import time
+STARTUP_STARTED = time.perf_counter()  # 啟動計時起點 (含模組匯入時間)
 import sys
 import os
-import pandas as pd
 import re
 import numpy as np
 import math
-import time
-from datetime import datetime
-from flask import Flask, jsonify, request, redirect, send_from_directory
-from tkinter import Tk, filedialog
+from datetime import date, datetime
+from flask import Flask, Response, jsonify, make_response, request, redirect
+from werkzeug.security import safe_join
 import socket
 import threading
 import tempfile
 import webbrowser
 import subprocess
-import pyodbc
+import importlib
+import mmap
+import locale
+import shutil
+import multiprocessing
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import json
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
-import plotly.offline
-import J750_J750EX_UFLEX_process_V4
-import ETS88_Accotest_process_V4
-import AG93000_process_V5
-import T2K_process_V2
+import base64
+import gzip
+import functools
+import itertools
+import hashlib
+import queue
+import posixpath
+import mimetypes
+import argparse
+import csv
+import glob
+from html import escape
+from collections import OrderedDict, namedtuple
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# 啟動時只載入提供首頁所需的模組;plotly、pyodbc、tkinter 與各機台的處理模組在第一次使用時才載入
+
+# brotli 為選用套件,未安裝時僅提供 gzip 壓縮
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 跨行程檔案鎖:Windows 使用 msvcrt,其他平台使用 fcntl
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # 修復高 DPI 螢幕模糊問題
 try:
     from ctypes import windll
@@ -37,17 +66,18 @@ except:
 username = os.environ.get('USERNAME', 'Unknown')
 
 # 從 JSON 檔案讀取 SQL Server 連線資訊
-json_path = r"M:\BI_Database\Apps\Database\Apps_Database\O_All\SQL_Server\SQL_Server_Info_User_BI.json"
-with open(json_path, 'r') as file:
-    sql_connection_info = json.load(file)
-
-# SQL Server 連線資訊
-SQL_SERVER_INFO = {
-    "server": sql_connection_info["server"],
-    "database": sql_connection_info["database"],
-    "username": sql_connection_info["username"],
-    "password": sql_connection_info["password"],
-    "apps_log_table": sql_connection_info["apps_log_table"]
+# SQL Server 連線資訊 (第一次寫入使用記錄時才讀取,見 get_sql_server_info)
+SQL_SERVER_INFO_PATH = r"M:\BI_Database\Apps\Database\Apps_Database\O_All\SQL_Server\SQL_Server_Info_User_BI.json"
+
+# 機台類型對應的處理模組名稱 (選擇機台時才匯入,見 get_processor_module)
+PROCESSOR_MODULES = {
+    'J750': 'J750_J750EX_UFLEX_process_V4',
+    'J750EX': 'J750_J750EX_UFLEX_process_V4',
+    'UFLEX': 'J750_J750EX_UFLEX_process_V4',
+    'ETS88': 'ETS88_Accotest_process_V4',
+    'Accotest': 'ETS88_Accotest_process_V4',
+    'AG93000': 'AG93000_process_V5',
+    'T2K': 'T2K_process_V2',
 }
 
 # 網路資源路徑
@@ -67,15 +97,125 @@ current_worker = None
 last_activity_time = time.time()
 ACTIVITY_TIMEOUT = 30 * 60  # 30 分鐘無活動自動關閉
 
-# 分析相關全域變數
-selected_machine_type = None
-autoz_log_timestamp = None
-analysis_file_data = None
-processor_module = None
+# 分析相關全域變數 (機台選擇與分析資料存放於各工作階段,見 session_store)
+dataset_versions = itertools.count(1)  # 每次建立分析資料時遞增的版本號
+
+# 工作階段設定
+SESSION_HEADER = 'X-Session-Id'
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+SESSION_MAX_COUNT = 8                         # 同時保留的工作階段數
+SESSION_MAX_BYTES = 2 * 1024 * 1024 * 1024    # 所有工作階段分析資料合計的記憶體上限 (bytes)
+
+# 圖表快取設定 (每個工作階段各自保留,佔用的記憶體計入 SESSION_MAX_BYTES)
+CHART_CACHE_MAX_ENTRIES = 8          # 三軸 × 兩種編碼與 Wafer 狀態
+WAFER_STATS_CACHE_MAX_ENTRIES = 1    # Wafer 統計表只保留目前版本
+CHART_WARMUP_WORKERS = 4             # 分析完成後預先建立三軸圖表與 Wafer 狀態的執行緒數
+
+# 圖表資料編碼設定
+CHART_ENCODINGS = ('binary', 'json')
+CHART_ENCODING_DEFAULT = 'binary'
+CHART_JSON_PRECISION = 4             # json 模式下浮點數保留的小數位數
+TYPED_ARRAY_MIN_LENGTH = 16          # 短於此長度的陣列維持一般 JSON 陣列
+
+# 圖表繪製層級設定 (依點數自動選擇 svg / webgl / envelope)
+RENDER_WEBGL_MIN_POINTS = 50_000        # 點數達到此值改用 WebGL (Scattergl) 繪製
+RENDER_ENVELOPE_MIN_POINTS = 1_000_000  # 點數達到此值改為分段最小/最大值包絡
+RENDER_ENVELOPE_BUCKETS = 2000          # 包絡模式的分段數
+
+# 主圖表抽樣設定 (min/max 分段抽樣,縮放時再取得視窗內的完整點位)
+CHART_OVERVIEW_MAX_POINTS = 4000        # 總覽圖點數上限 (每段保留最小值與最大值,分段數為一半)
+CHART_WINDOW_MAX_POINTS = 20_000        # 縮放視窗內點數不超過此值時回傳完整點位,否則同樣抽樣
+CHART_FORCED_KEEP_MAX_POINTS = 2000     # 抽樣時一律保留的點 (低於標準值) 上限,超過時這些點本身再以 min/max 抽樣
+
+# ALL.txt 平行解析設定
+PARALLEL_PARSE_MIN_SIZE = 64 * 1024 * 1024    # 小於此大小 (bytes) 的檔案使用單一行程解析
+PARALLEL_PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+PARALLEL_PARSE_COPY_BLOCK = 4 * 1024 * 1024
+SERIAL_PARSE_CHUNK_SIZE = 16 * 1024 * 1024    # 單一行程解析時每段的大小 (bytes),每段之間回報進度並檢查取消
+RECORD_START_SAMPLE_SIZE = 8 * 1024 * 1024    # 推得紀錄邊界時解析的檔案開頭樣本大小 (bytes)
+RECORD_START_VERIFY_CHUNKS = 4                # 驗證紀錄邊界時樣本切成的段數
+RECORD_START_CHECK_SIZE = 1024 * 1024         # 套用已推得的紀錄邊界前,確認其適用於該檔案的檔案開頭樣本大小 (bytes)
+
+# 解析結果快取設定
+PARSE_CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), 'AutoZ Wafer4P Aligner', 'parse_cache')
+PARSE_CACHE_MAX_BYTES = 1024 * 1024 * 1024   # 快取總大小上限,超過時刪除最久未使用的項目
+PARSE_CACHE_HASH_BYTES = 1024 * 1024          # 檔案指紋雜湊的檔頭與檔尾長度
+PARSE_CACHE_FORMAT = 2                        # 快取格式版本,格式變更時遞增使舊快取失效
+RECORD_START_CACHE_PATH = os.path.join(PARSE_CACHE_DIR, 'record_starts.json')  # 各處理模組版本推得的紀錄邊界
+
+# Wafer 統計表設定
+WAFER_STATS_PAGE_SIZE = 50           # 每頁預設列數
+WAFER_STATS_MAX_PAGE_SIZE = 500      # 每頁列數上限
+
+# follow 模式設定
+FOLLOW_POLL_INTERVAL = 5             # 結果頁面輪詢 ALL.txt 新增內容的間隔 (秒)
+
+# 批次處理 (命令列模式) 設定
+BATCH_AUTOZ_LOG_NAME = 'AutoZLog.txt'        # 批次資料夾中的檔案名稱 (不分大小寫)
+BATCH_ALL_TXT_NAME = 'ALL.txt'
+BATCH_OUTPUT_DIR = 'AutoZ_batch_output'
+
+# 版本檢查設定
+VERSION_CHECK_TTL = 10 * 60           # 版本檢查結果的快取時間 (秒)
+VERSION_CHECK_TIMEOUT = 5             # 等待版本檢查結果的時間上限 (秒),網路磁碟沒有回應時不會卡住畫面
+
+# 使用記錄設定
+USAGE_LOG_SPOOL_PATH = os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), 'AutoZ Wafer4P Aligner', 'usage_log_spool.jsonl')
+USAGE_LOG_BATCH_SIZE = 50             # 每次寫入資料庫的記錄數上限
+USAGE_LOG_CONNECT_TIMEOUT = 10        # 資料庫連線逾時 (秒)
+USAGE_LOG_RETRY_INITIAL = 5           # 寫入失敗後的第一次重試間隔 (秒),之後每次加倍
+USAGE_LOG_RETRY_MAX = 300
+USAGE_LOG_LOCK_RETRY = 0.05           # 等待其他實例釋放 spool 檔案鎖的重試間隔 (秒,Windows)
+USAGE_LOG_FLUSH_TIMEOUT = 5           # 批次模式結束前等待使用記錄寫入的時間上限 (秒)
+
+# 分析工作設定
+ANALYSIS_JOB_HISTORY = 8             # 保留的分析工作數量 (含已結束)
+ANALYSIS_JOB_FINAL_STATES = ('completed', 'failed', 'cancelled')
+
+# 回應壓縮設定
+COMPRESSION_MIN_SIZE = 1024       # 小於此大小 (bytes) 的回應不壓縮
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# 網路資源鏡像設定
+ASSET_MIRROR_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), 'AutoZ Wafer4P Aligner', 'asset_mirror')
+ASSET_STYLESHEETS = ('Google_Fonts/css/noto-sans-tc.css', 'Font_Awesome/css/all.min.css')  # 啟動時先行鏡像
+ASSET_MIRROR_PRELOAD = False          # 啟動時將鏡像內容全部載入記憶體
+ASSET_REVALIDATE_INTERVAL = 6 * 60 * 60   # 背景比對網路磁碟檔案的間隔 (秒),啟動時會先比對一次
+ASSET_MIRROR_WORKERS = 8              # 鏡像 CSS 引用的字型時同時複製的檔案數
 
 
 # 工具函數 
 
+class StartupTimer:
+    """記錄 main() 各啟動階段的耗時 (起點為 STARTUP_STARTED,第一個階段即為模組匯入)"""
+
+    def __init__(self, started):
+        self.started = started
+        self.last = started
+        self.phases = []
+        self.first_request_reported = False
+
+    def mark(self, phase):
+        """結束目前階段並記錄耗時"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        print("Startup timing:")
+        for phase, seconds in self.phases:
+            print(f"  {phase:<20} {seconds * 1000:8.1f} ms")
+        print(f"  {'total':<20} {(self.last - self.started) * 1000:8.1f} ms")
+
+    def report_first_request(self):
+        """首頁第一次回應時印出距離啟動的時間 (僅限由 main() 啟動時)"""
+        if self.phases and not self.first_request_reported:
+            self.first_request_reported = True
+            print(f"First page served {(time.perf_counter() - self.started) * 1000:.0f} ms after start")
+
+startup_timer = StartupTimer(STARTUP_STARTED)
+
 def update_activity():
     """更新最後活動時間"""
     global last_activity_time
@@ -159,258 +299,1153 @@ def check_version():
             'message': 'Failed to get launch permission.'
         }
 
-def save_log():
-    """儲存使用記錄到 SQL Server"""
-    try:
-        current_datetime = datetime.now()
-        
+class VersionChecker:
+    """在背景執行緒執行 check_version,結果快取 ttl 秒
+
+    安裝資料夾位於網路磁碟,連線慢或沒有回應時掃描可能很久。呼叫端最多等待 timeout 秒,
+    逾時後掃描仍在背景繼續並於完成時更新快取;掃描進行中不會重複啟動新的掃描。
+    掃描拋出例外時保留先前確定的結果;沒有確定結果時例外結果不快取,下次取得時重新掃描。
+    """
+
+    def __init__(self, ttl, timeout):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result = None
+        self._checked_at = None
+        self._scanning = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """啟動背景掃描 (已有掃描進行中時不重複啟動)"""
+        with self._lock:
+            if self._scanning:
+                return
+            self._scanning = True
+            self._done = threading.Event()
+        threading.Thread(target=self._scan, daemon=True).start()
+
+    def _scan(self):
+        started = time.perf_counter()
+        try:
+            result = check_version()
+        except Exception as e:
+            result = {
+                'status': 'error',
+                'type': 'exception',
+                'message': f'Version check failed: {str(e)}'
+            }
+
+        with self._lock:
+            if result.get('type') != 'exception' or self._result is None or self._result.get('type') == 'exception':
+                self._result = result
+            self._checked_at = time.monotonic()
+            self._scanning = False
+            done = self._done
+        done.set()
+
+        if result['status'] == 'error':
+            print(f"ERROR: {result['message']}")
+        print(f"Version check finished in {time.perf_counter() - started:.2f}s: {result['status']}")
+
+    def get(self):
+        """取得版本檢查結果
+
+        快取過期時在背景重新掃描並先回傳舊的結果;尚無任何結果時最多等待 timeout 秒,
+        逾時回傳 status 為 'unknown' 的結果。尚未取得確定結果前首頁停用操作並定期重新查詢,
+        伺服器端也拒絕分析操作 (見 require_launch_permission)。
+        """
+        with self._lock:
+            fresh = (self._result is not None and self._result.get('type') != 'exception'
+                     and time.monotonic() - self._checked_at <= self.ttl)
+        if not fresh:
+            self.refresh()
+
+        with self._lock:
+            result, done = self._result, self._done
+        if result is None and not done.wait(self.timeout):
+            return {
+                'status': 'unknown',
+                'message': 'Version check timed out'
+            }
+
+        with self._lock:
+            return self._result
+
+version_checker = VersionChecker(VERSION_CHECK_TTL, VERSION_CHECK_TIMEOUT)
+
+def require_launch_permission(view):
+    """路由裝飾器：版本檢查結果為 ok 或 update 時才執行
+
+    檢查尚未完成、掃描失敗或沒有權限時回傳錯誤,不只依賴首頁停用按鈕。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        result = version_checker.get()
+        if result['status'] not in ('ok', 'update'):
+            if result['status'] == 'unknown' or result.get('type') == 'exception':
+                error = 'Launch permission is still being checked, please try again shortly'
+            else:
+                error = result['message']
+            return jsonify({
+                'success': False,
+                'error': error
+            })
+        return view(*args, **kwargs)
+    return wrapper
+
+@functools.lru_cache(maxsize=None)
+def get_sql_server_info():
+    """讀取 SQL Server 連線資訊 (網路磁碟上的 JSON,只讀取一次)"""
+    with open(SQL_SERVER_INFO_PATH, 'r') as file:
+        sql_connection_info = json.load(file)
+
+    return {
+        "server": sql_connection_info["server"],
+        "database": sql_connection_info["database"],
+        "username": sql_connection_info["username"],
+        "password": sql_connection_info["password"],
+        "apps_log_table": sql_connection_info["apps_log_table"]
+    }
+
+def import_processor_module(module_name):
+    """匯入處理模組
+
+    PROCESSOR_MODULES 中的模組以靜態 import 匯入,PyInstaller 打包時才分析得到 (仍在第一次使用時才載入);
+    其他名稱 (例如測試用的處理模組) 以 importlib 匯入。
+    """
+    if module_name == 'J750_J750EX_UFLEX_process_V4':
+        import J750_J750EX_UFLEX_process_V4 as module
+    elif module_name == 'ETS88_Accotest_process_V4':
+        import ETS88_Accotest_process_V4 as module
+    elif module_name == 'AG93000_process_V5':
+        import AG93000_process_V5 as module
+    elif module_name == 'T2K_process_V2':
+        import T2K_process_V2 as module
+    else:
+        module = importlib.import_module(module_name)
+    return module
+
+def get_processor_module(machine_type):
+    """匯入並回傳機台類型對應的處理模組 (第一次使用時才匯入)"""
+    return import_processor_module(PROCESSOR_MODULES[machine_type])
+
+# 使用記錄
+#
+# save_log 只將記錄放入佇列,由背景執行緒先附加寫入本機的 spool 檔 (每行一筆 JSON),
+# 再批次寫入資料庫,成功後才自 spool 移除;資料庫無法連線時以指數退避重試,
+# 未送出的記錄保留在 spool 中,下次啟動時再送出。啟動流程不會等待資料庫。
+# 同時開啟的多個實例共用同一個 spool,附加與「讀取、送出、移除」整個流程以跨行程檔案鎖保護,
+# 同一筆記錄不會被兩個實例送出,也不會在移除時遺失其他實例剛附加的記錄。
+# 寫入目標可替換,例如測試時以 SQLiteLogTarget 代替 SQL Server
+# (設定環境變數 AUTOZ_USAGE_LOG_SQLITE 為 SQLite 檔案路徑即可)。
+
+class InterProcessLock:
+    """以作業系統檔案鎖實作的跨行程互斥鎖 (with 區塊內持有)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, 'a+b')
+        try:
+            if msvcrt is not None:
+                # 鎖定第一個位元組 (可超出檔尾),LK_NBLCK 失敗時自行重試以免 LK_LOCK 十秒後放棄
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(USAGE_LOG_LOCK_RETRY)
+            elif fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+        return self
+
+    def __exit__(self, *exc_info):
+        f, self._file = self._file, None
+        try:
+            if msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            elif fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
+
+class SqlServerLogTarget:
+    """將使用記錄寫入 SQL Server 的 apps_log_table"""
+
+    def write(self, records):
+        import pyodbc
+
+        sql_server_info = get_sql_server_info()
         conn_str = (
             f'DRIVER={{SQL Server}};'
-            f'SERVER={SQL_SERVER_INFO["server"]};'
-            f'DATABASE={SQL_SERVER_INFO["database"]};'
-            f'UID={SQL_SERVER_INFO["username"]};'
-            f'PWD={SQL_SERVER_INFO["password"]};'
+            f'SERVER={sql_server_info["server"]};'
+            f'DATABASE={sql_server_info["database"]};'
+            f'UID={sql_server_info["username"]};'
+            f'PWD={sql_server_info["password"]};'
             f'App=AutoZ Wafer4P Aligner'
         )
-        
-        with pyodbc.connect(conn_str) as conn:
+
+        with pyodbc.connect(conn_str, timeout=USAGE_LOG_CONNECT_TIMEOUT) as conn:
             cursor = conn.cursor()
-            
+
             insert_query = f"""
-            INSERT INTO {SQL_SERVER_INFO["apps_log_table"]} 
+            INSERT INTO {sql_server_info["apps_log_table"]} 
             (Activation_Time, User_Id, Status, Apps_Name)
             VALUES (?, ?, ?, ?)
             """
-            
-            cursor.execute(insert_query, 
-                          (current_datetime, username, "Open", "AutoZ Wafer4P Aligner"))
+
+            cursor.executemany(insert_query, [
+                (datetime.fromisoformat(record['activation_time']), record['user_id'], record['status'], record['apps_name'])
+                for record in records
+            ])
             conn.commit()
-            
-            print("Log saved successfully")
-            
-    except pyodbc.Error as e:
-        print(f"SQL Server connection error: {str(e)}")
-    except Exception as e:
-        print(f"Error saving log: {str(e)}")
+
+class SQLiteLogTarget:
+    """將使用記錄寫入 SQLite (測試時代替 SQL Server,欄位與 apps_log_table 相同)"""
+
+    def __init__(self, path, table='apps_log'):
+        self.path = path
+        self.table = table
+
+    def write(self, records):
+        import sqlite3
+
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(Activation_Time TEXT, User_Id TEXT, Status TEXT, Apps_Name TEXT)"
+            )
+            conn.executemany(
+                f"INSERT INTO {self.table} (Activation_Time, User_Id, Status, Apps_Name) VALUES (?, ?, ?, ?)",
+                [(record['activation_time'], record['user_id'], record['status'], record['apps_name']) for record in records]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+class UsageLogger:
+    """以背景執行緒、本機 spool 檔與批次寫入處理使用記錄 (送出方式為至少一次)"""
+
+    def __init__(self, spool_path, target, batch_size=USAGE_LOG_BATCH_SIZE,
+                 retry_initial=USAGE_LOG_RETRY_INITIAL, retry_max=USAGE_LOG_RETRY_MAX):
+        self.spool_path = spool_path
+        self.target = target
+        self.batch_size = batch_size
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._queue = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._spool_lock = InterProcessLock(f"{spool_path}.lock")
+        self._thread = None
+
+    def log(self, status):
+        """加入一筆使用記錄 (不等待寫入)"""
+        record = {
+            'activation_time': datetime.now().isoformat(),
+            'user_id': username,
+            'status': status,
+            'apps_name': 'AutoZ Wafer4P Aligner'
+        }
+        with self._lock:
+            self._idle.clear()
+            self._queue.put(record)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout):
+        """等待佇列中的記錄寫入 spool 並嘗試送出,最多等待 timeout 秒
+
+        Returns:
+            bool: 是否在時間內完成 (資料庫無法連線時記錄仍保留在 spool 中)
+        """
+        return self._idle.wait(timeout)
+
+    def _read_spool(self):
+        try:
+            with open(self.spool_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # 寫入中斷留下的不完整記錄
+                continue
+        return records
+
+    def _append_spool(self, records):
+        os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+
+    def _drop_spool(self, count):
+        """自 spool 移除前 count 筆已送出的記錄 (呼叫端需持有 spool 檔案鎖,且讀取後 spool 未被修改)"""
+        remaining = self._read_spool()[count:]
+        temp_path = f"{self.spool_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in remaining)
+        os.replace(temp_path, self.spool_path)
+
+    def _run(self):
+        retry_delay = self.retry_initial
+        next_attempt = 0.0
+
+        while True:
+            batch = None
+            error = None
+            with self._spool_lock:
+                pending = self._read_spool()
+                if pending and time.monotonic() >= next_attempt:
+                    batch = pending[:self.batch_size]
+                    try:
+                        self.target.write(batch)
+                        self._drop_spool(len(batch))
+                    except Exception as e:
+                        error = e
+
+            if batch is not None:
+                if error is None:
+                    retry_delay = self.retry_initial
+                    print(f"Usage log saved ({len(batch)} records)")
+                else:
+                    print(f"Usage log not saved, retrying in {retry_delay}s: {str(error)}")
+                    next_attempt = time.monotonic() + retry_delay
+                    retry_delay = min(retry_delay * 2, self.retry_max)
+                continue
+
+            with self._lock:
+                if self._queue.empty():
+                    self._idle.set()
+            timeout = max(0.0, next_attempt - time.monotonic()) if pending else None
+            try:
+                records = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                continue
+            while not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            with self._spool_lock:
+                self._append_spool(records)
+
+def create_usage_log_target():
+    """依環境變數 AUTOZ_USAGE_LOG_SQLITE 選擇 SQLite,否則寫入 SQL Server"""
+    sqlite_path = os.environ.get('AUTOZ_USAGE_LOG_SQLITE')
+    return SQLiteLogTarget(sqlite_path) if sqlite_path else SqlServerLogTarget()
+
+usage_logger = UsageLogger(USAGE_LOG_SPOOL_PATH, create_usage_log_target())
+
+def save_log(status="Open"):
+    """記錄使用狀況 (背景寫入 SQL Server,不等待資料庫)"""
+    usage_logger.log(status)
+
+# 晶圓資料結構
+SortedAxis = namedtuple('SortedAxis', ['values', 'codes', 'starts', 'wafers'])
+
+def axis_values(data, value_key):
+    """取得單一晶圓某軸的數值 (列表或 float64 陣列),沒有該軸資料時回傳空 tuple"""
+    values = data.get(value_key)
+    return () if values is None else values
+
+class AppendBuffer:
+    """尾端可追加的 numpy 陣列 (follow 模式中同一資料集的各版本共用)
+
+    extend() 只寫入目前內容之後的位置,先前版本持有的 view 內容不變;
+    容量不足時擴充為約 1.25 倍,攤提後每個點位的複製次數為常數。
+    """
+
+    def __init__(self, array):
+        self.data = array
+        self.length = len(array)
+
+    def holds(self, array):
+        """array 是否為目前的完整內容 (只有最新版本可以接續追加)"""
+        return len(array) == self.length and np.may_share_memory(array, self.data)
+
+    def extend(self, values):
+        """在尾端追加 values,回傳新內容的 view"""
+        end = self.length + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, self.length + self.length // 4), dtype=self.data.dtype)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+        self.data[self.length:end] = values
+        self.length = end
+        return self.data[:end]
+
+class WaferDataset:
+    """晶圓量測資料的欄式 (columnar) 儲存結構
+
+    由 process_all_txt 回傳的 wafer_data 字典建立一次, 各軸數值以連續的
+    float64 陣列儲存, 供所有圖表與統計函數共用, 避免重複走訪 dict-of-lists。
+
+    Attributes:
+        wafer_ids: 晶圓 ID 類別表 (依原始順序)
+        start_times: 各晶圓開始時間 (依原始順序)
+        order: 依開始時間排序的晶圓排列 (permutation)
+        values: 各軸所有點位 {'x'|'y'|'z': float64 陣列}, 依原始晶圓順序串接
+        offsets: 各晶圓在對應軸陣列中的起始位置 (長度為晶圓數 + 1)
+        codes: 各點位所屬晶圓的類別代碼 (wafer_ids 的索引)
+    """
+
+    AXES = ('x', 'y', 'z')
+
+    def __init__(self, wafer_ids, start_times, values, offsets, codes=None, order=None):
+        self.wafer_ids = list(wafer_ids)
+        self.start_times = list(start_times)
+        self.values = values
+        self.offsets = offsets
+        if codes is None:
+            codes = {
+                axis: np.repeat(np.arange(len(self.wafer_ids), dtype=np.int32), np.diff(offsets[axis]))
+                for axis in self.AXES
+            }
+        self.codes = codes
+        if order is None:
+            # 與原本 sorted() 相同的穩定排序
+            order = np.array(
+                sorted(range(len(self.start_times)), key=lambda i: self.start_times[i]),
+                dtype=np.int64
+            )
+        self.order = order
+        self._id_array = np.empty(len(self.wafer_ids), dtype=object)
+        self._id_array[:] = self.wafer_ids
+        self._sorted_cache = {}
+        self._buffers = None    # follow 模式追加點位的共用緩衝區 (見 _append_increment)
+
+    @classmethod
+    def from_wafer_data(cls, wafer_data):
+        """由 process_all_txt 的 wafer_data 字典建立資料集"""
+        wafer_ids = list(wafer_data.keys())
+        start_times = [data['start_time'] for data in wafer_data.values()]
+        values = {}
+        offsets = {}
+
+        for axis in cls.AXES:
+            value_key = f"{axis}_values"
+            pieces = [np.asarray(axis_values(data, value_key), dtype=np.float64) for data in wafer_data.values()]
+            axis_offsets = np.zeros(len(wafer_ids) + 1, dtype=np.int64)
+            np.cumsum([piece.size for piece in pieces], out=axis_offsets[1:])
+            values[axis] = np.concatenate(pieces) if pieces else np.empty(0, dtype=np.float64)
+            offsets[axis] = axis_offsets
+
+        return cls(wafer_ids, start_times, values, offsets)
+
+    @property
+    def n_wafers(self):
+        return len(self.wafer_ids)
+
+    @property
+    def nbytes(self):
+        """陣列佔用的記憶體大小 (bytes),含已快取的排序資料"""
+        return sum(
+            self.values[axis].nbytes + self.offsets[axis].nbytes + self.codes[axis].nbytes
+            for axis in self.AXES
+        ) + self.order.nbytes + sum(
+            view.values.nbytes + view.codes.nbytes + view.starts.nbytes + view.wafers.nbytes
+            for view in list(self._sorted_cache.values())
+        )
+
+    def point_count(self, axis_type):
+        return int(self.values[axis_type].size)
+
+    def sorted_axis(self, axis_type):
+        """取得依晶圓開始時間排序後的單軸資料 (結果會快取)
+
+        沒有該軸資料的晶圓會被略過, 與原本逐晶圓走訪的行為相同。
+
+        Returns:
+            SortedAxis: values 為排序後的數值, codes 為各點位的晶圓代碼,
+                starts 為各晶圓在 values 中的起始索引, wafers 為對應的晶圓代碼
+        """
+        cached = self._sorted_cache.get(axis_type)
+        if cached is not None:
+            return cached
+
+        axis_offsets = self.offsets[axis_type]
+        lengths = np.diff(axis_offsets)[self.order]
+        keep = lengths > 0
+        wafers = self.order[keep]
+        lengths = lengths[keep]
+
+        starts = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        total = int(lengths.sum())
+        gather = np.repeat(axis_offsets[wafers] - starts, lengths) + np.arange(total, dtype=np.int64)
+
+        view = SortedAxis(
+            values=self.values[axis_type][gather],
+            codes=np.repeat(wafers.astype(np.int32), lengths),
+            starts=starts,
+            wafers=wafers
+        )
+        self._sorted_cache[axis_type] = view
+        return view
+
+    def wafer_labels(self, codes):
+        """將晶圓代碼陣列轉換為晶圓 ID 列表"""
+        return self._id_array[codes].tolist()
+
+    def with_increment(self, wafer_data, remove_counts=None):
+        """回傳併入增量解析結果後的新資料集 (follow 模式使用)
+
+        先自各晶圓尾端移除 remove_counts ({wafer_id: {axis: 點數}}) 指定的點數,再依
+        merge_all_txt_results 的規則併入 wafer_data:已存在的晶圓在尾端串接數值,新晶圓依序
+        加在最後。既有晶圓的順序與代碼維持不變 (點數歸零的晶圓仍保留,排序時自然略過)。
+        一般情況 (只有最後一片晶圓持續量測與新晶圓) 直接追加在尾端,只處理新增的點位 (見 _append_increment);
+        其他情況 (例如先前的晶圓重測) 重建所有陣列。
+        """
+        remove_counts = remove_counts or {}
+        appended = self._append_increment(wafer_data, remove_counts)
+        if appended is not None:
+            return appended
+
+        old_count = self.n_wafers
+        index = {wafer_id: i for i, wafer_id in enumerate(self.wafer_ids)}
+        wafer_ids = list(self.wafer_ids)
+        start_times = list(self.start_times)
+
+        for wafer_id, data in wafer_data.items():
+            position = index.get(wafer_id)
+            if position is None:
+                index[wafer_id] = len(wafer_ids)
+                wafer_ids.append(wafer_id)
+                start_times.append(data.get('start_time'))
+            elif start_times[position] is None:
+                start_times[position] = data.get('start_time')
+
+        values = {}
+        offsets = {}
+        for axis in self.AXES:
+            value_key = f"{axis}_values"
+            old_offsets = self.offsets[axis]
+            lengths = np.zeros(len(wafer_ids), dtype=np.int64)
+            lengths[:old_count] = np.diff(old_offsets)
+
+            # 移除上次暫時解析的尾端點位
+            keep = np.ones(int(old_offsets[-1]), dtype=bool)
+            for wafer_id, counts in remove_counts.items():
+                position = index.get(wafer_id)
+                count = counts.get(axis, 0)
+                if count and position is not None and position < old_count:
+                    end = int(old_offsets[position + 1])
+                    keep[end - count:end] = False
+                    lengths[position] -= count
+            kept_values = self.values[axis] if keep.all() else self.values[axis][keep]
+
+            # 新增點位插入各晶圓的尾端 (新晶圓接在最後)
+            kept_ends = np.cumsum(lengths[:old_count])
+            additions = [
+                (index[wafer_id], np.asarray(axis_values(data, value_key), dtype=np.float64))
+                for wafer_id, data in wafer_data.items()
+            ]
+            additions = sorted((item for item in additions if item[1].size), key=lambda item: item[0])
+
+            if additions:
+                codes = np.array([code for code, _ in additions], dtype=np.int64)
+                counts = np.array([added.size for _, added in additions], dtype=np.int64)
+                insert_at = np.full(codes.size, kept_values.size, dtype=np.int64)
+                existing = codes < old_count
+                insert_at[existing] = kept_ends[codes[existing]]
+                values[axis] = np.insert(kept_values, np.repeat(insert_at, counts),
+                                         np.concatenate([added for _, added in additions]))
+                lengths[codes] += counts
+            else:
+                values[axis] = kept_values
+
+            axis_offsets = np.zeros(len(wafer_ids) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=axis_offsets[1:])
+            offsets[axis] = axis_offsets
+
+        return WaferDataset(wafer_ids, start_times, values, offsets)
+
+    def _append_increment(self, wafer_data, remove_counts):
+        """with_increment 的快速路徑:將增量追加在各陣列尾端,不符合條件時回傳 None
+
+        條件為既有晶圓中只有最後一片 (依開始時間排序也是最後) 有變動、其重新解析的點位開頭與原本相同,
+        且新晶圓的開始時間依序不早於該晶圓。此時新增點位在原始順序與排序後都接在最後:
+        各軸數值與代碼 (含已快取的排序資料) 寫入與前一版本共用的 AppendBuffer,
+        只有每片晶圓一筆的 offsets 與 order 會複製。
+        """
+        old_count = self.n_wafers
+        last = old_count - 1
+        last_id = self.wafer_ids[last] if old_count else None
+        known = set(self.wafer_ids)
+
+        if any(wafer_id in known and wafer_id != last_id for wafer_id in itertools.chain(wafer_data, remove_counts)):
+            return None
+        if old_count and int(self.order[-1]) != last:
+            return None
+        if last_id in wafer_data and self.start_times[last] is None and wafer_data[last_id].get('start_time') is not None:
+            return None
+        new_ids = [wafer_id for wafer_id in wafer_data if wafer_id not in known]
+        new_times = [wafer_data[wafer_id].get('start_time') for wafer_id in new_ids]
+        times = ([self.start_times[last]] if old_count else []) + new_times
+        try:
+            if any(later < earlier for earlier, later in zip(times, times[1:])):
+                return None
+        except TypeError:
+            return None
+
+        # 各軸追加的 (晶圓代碼, 點位):最後一片晶圓去掉重新解析的部分,再接上新晶圓
+        additions = {}
+        for axis in self.AXES:
+            value_key = f"{axis}_values"
+            pieces = []
+            if old_count:
+                added = np.asarray(axis_values(wafer_data.get(last_id, {}), value_key), dtype=np.float64)
+                removed = remove_counts.get(last_id, {}).get(axis, 0)
+                stored = self.values[axis][int(self.offsets[axis][-2]):]
+                if removed > min(added.size, stored.size) or not np.array_equal(
+                        added[:removed], stored[stored.size - removed:], equal_nan=True):
+                    return None
+                pieces.append((last, added[removed:]))
+            for position, wafer_id in enumerate(new_ids, start=old_count):
+                pieces.append((position, np.asarray(axis_values(wafer_data[wafer_id], value_key), dtype=np.float64)))
+            additions[axis] = pieces
+
+        buffers = self._buffers if self._buffers is not None else {}
+
+        def extend(key, array, appended):
+            buffer = buffers.get(key)
+            if buffer is None or not buffer.holds(array):
+                buffer = buffers[key] = AppendBuffer(array)
+            return buffer.extend(appended)
+
+        wafer_ids = self.wafer_ids + new_ids
+        values = {}
+        offsets = {}
+        codes = {}
+        sorted_cache = {}
+        for axis, pieces in additions.items():
+            counts = np.array([piece.size for _, piece in pieces], dtype=np.int64)
+            appended = np.concatenate([piece for _, piece in pieces]) if pieces else np.empty(0, dtype=np.float64)
+            appended_codes = np.repeat(np.array([code for code, _ in pieces], dtype=np.int32), counts)
+            values[axis] = extend(('values', axis), self.values[axis], appended)
+            codes[axis] = extend(('codes', axis), self.codes[axis], appended_codes)
+
+            old_offsets = self.offsets[axis]
+            last_size = int(old_offsets[-1] - old_offsets[-2]) if old_count else 0
+            tail_added = int(counts[0]) if old_count else 0
+            axis_offsets = np.empty(len(wafer_ids) + 1, dtype=np.int64)
+            axis_offsets[:old_count] = old_offsets[:old_count]
+            axis_offsets[old_count] = old_offsets[-1] + tail_added
+            np.cumsum(counts[1 if old_count else 0:], out=axis_offsets[old_count + 1:])
+            axis_offsets[old_count + 1:] += axis_offsets[old_count]
+            offsets[axis] = axis_offsets
+
+            view = self._sorted_cache.get(axis)
+            if view is not None:
+                # 原本沒有此軸點位的晶圓在排序資料中新增起始位置
+                positions = len(view.values) + np.cumsum(counts) - counts
+                first_points = [
+                    (code, int(position)) for (code, piece), position in zip(pieces, positions)
+                    if piece.size and (code != last or last_size == 0)
+                ]
+                sorted_cache[axis] = SortedAxis(
+                    values=extend(('sorted_values', axis), view.values, appended),
+                    codes=extend(('sorted_codes', axis), view.codes, appended_codes),
+                    starts=np.concatenate((view.starts, np.array([start for _, start in first_points], dtype=np.int64))),
+                    wafers=np.concatenate((view.wafers, np.array([code for code, _ in first_points], dtype=np.int64)))
+                )
+
+        order = np.concatenate((self.order, np.arange(old_count, len(wafer_ids), dtype=np.int64)))
+        dataset = WaferDataset(wafer_ids, self.start_times + new_times, values, offsets, codes, order)
+        dataset._sorted_cache = sorted_cache
+        dataset._buffers = buffers
+        return dataset
 
 # 圖表生成函數
-def create_line_chart(wafer_data, axis_type, standard_value=None, standard_point_data=None):
-    """為指定的軸類型創建折線圖
-    
+def compute_axis_stats(values):
+    """計算單軸數值的統計資料 (最小、最大、平均、中位數、標準差與點數)"""
+    point_count = len(values)
+    return {
+        'min': float(values.min()) if point_count else 0,
+        'max': float(values.max()) if point_count else 0,
+        'mean': float(np.mean(values)) if point_count else 0,
+        'median': float(np.median(values)) if point_count else 0,
+        'std': float(np.std(values)) if point_count else 0,
+        'count': point_count
+    }
+
+def compute_anomaly_stats(values, standard_value):
+    """計算低於標準值的點數與比例"""
+    total_points = len(values)
+    anomaly_count = int(np.count_nonzero(values < standard_value))
+    return {
+        'total_points': total_points,
+        'normal_points': total_points - anomaly_count,
+        'anomaly_points': anomaly_count,
+        'anomaly_percent': (anomaly_count / total_points * 100) if total_points > 0 else 0
+    }
+
+def choose_render_tier(point_count):
+    """依點數選擇圖表繪製層級
+
+    Returns:
+        str: 'svg' (完整 SVG)、'webgl' (Scattergl) 或 'envelope' (分段最小/最大值包絡)
+    """
+    if point_count >= RENDER_ENVELOPE_MIN_POINTS:
+        return 'envelope'
+    if point_count >= RENDER_WEBGL_MIN_POINTS:
+        return 'webgl'
+    return 'svg'
+
+def bucket_envelope(values, bucket_count=RENDER_ENVELOPE_BUCKETS):
+    """將連續點位平均分成 bucket_count 段,計算每段的範圍與最小/最大值
+
+    Returns:
+        tuple: (starts, ends, mins, maxs) 每段第一個與最後一個點的索引,以及該段的最小/最大值
+    """
+    edges = np.linspace(0, len(values), min(bucket_count, len(values)) + 1).astype(np.int64)
+    starts = edges[:-1]
+    return starts, edges[1:] - 1, np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+
+def envelope_series(values, bucket_count, standard_value, first_index=0):
+    """異常分析圖表包絡層級的分段資料 (first_index 為 values[0] 在圖表中的索引)
+
+    Returns:
+        dict: x (各段中心)、min、max,以及 below:有低於標準值點位的分段,以該段最低值標示 ({'x', 'y', 'text'})
+    """
+    series = {'x': [], 'min': [], 'max': [], 'below': {'x': [], 'y': [], 'text': []}}
+    if not len(values):
+        return series
+
+    starts, ends, mins, maxs = bucket_envelope(values, bucket_count)
+    centers = (starts + ends) / 2 + first_index
+    below = values < standard_value
+    below_counts = np.add.reduceat(below.astype(np.int64), starts)
+    below_mins = np.minimum.reduceat(np.where(below, values, np.inf), starts)
+    has_below = below_counts > 0
+
+    series['x'] = centers.tolist()
+    series['min'] = mins.tolist()
+    series['max'] = maxs.tolist()
+    series['below'] = {
+        'x': centers[has_below].tolist(),
+        'y': below_mins[has_below].tolist(),
+        'text': [f"{count:,} points below standard<br>Points {start:,}–{end:,}<br>Lowest: {low:.2f} µm"
+                 for count, start, end, low in zip(below_counts[has_below].tolist(),
+                                                   (starts[has_below] + first_index).tolist(),
+                                                   (ends[has_below] + first_index).tolist(),
+                                                   below_mins[has_below].tolist())]
+    }
+    return series
+
+def decimate_min_max(values, max_points, keep_mask=None, max_forced=CHART_FORCED_KEEP_MAX_POINTS):
+    """min/max 分段抽樣:分成 max_points / 2 段,每段保留最小值與最大值所在的點
+
+    點數不超過 max_points 時保留全部;首尾兩點一律保留。keep_mask 為 True 的點也一律保留,
+    但超過 max_forced 點時 (例如整批低於標準值) 這些點本身再以 min/max 分段抽樣為 max_forced 點,
+    因此回傳點數最多約為 max_points + max_forced。
+
+    Returns:
+        ndarray: 保留點位的索引 (遞增)
+    """
+    point_count = len(values)
+    if point_count <= max_points:
+        return np.arange(point_count)
+
+    bucket_count = max(max_points // 2, 1)
+    edges = np.linspace(0, point_count, bucket_count + 1).astype(np.int64)
+    starts = edges[:-1]
+    buckets = np.repeat(np.arange(bucket_count), np.diff(edges))
+
+    keep = np.zeros(point_count, dtype=bool)
+    keep[[0, -1]] = True
+    if keep_mask is not None:
+        forced = np.flatnonzero(keep_mask)
+        if len(forced) > max_forced:
+            forced = forced[decimate_min_max(values[forced], max_forced)]
+        keep[forced] = True
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(values, starts)
+        hits = np.flatnonzero(values == extremes[buckets])
+        # 同一段有多個點等於極值時只取第一個
+        keep[hits[np.unique(buckets[hits], return_index=True)[1]]] = True
+    return np.flatnonzero(keep)
+
+def line_chart_series(dataset, axis_type, standard_point_data=None):
+    """主折線圖的完整點位序列 (依開始時間排序,有 AutoZ complete 點時放在索引 0)
+
+    Returns:
+        tuple: (view, values, first_wafer_index) 排序後的單軸資料、圖表數值與第一個晶圓點的索引
+    """
+    view = dataset.sorted_axis(axis_type)
+    if standard_point_data and axis_type in standard_point_data:
+        return view, np.concatenate(([standard_point_data[axis_type]], view.values)), 1
+    return view, view.values, 0
+
+def select_line_chart_points(values, start, stop, max_points, first_wafer_index, standard_value=None):
+    """選出主折線圖 [start, stop) 範圍內要繪製的點位
+
+    點數超過 max_points 時以 min/max 分段抽樣,AutoZ complete 點與低於標準值的點一律保留
+    (低於標準值的點超過 CHART_FORCED_KEEP_MAX_POINTS 時再抽樣,見 decimate_min_max)。
+
+    Returns:
+        tuple: (indices, decimated) 圖表索引與是否經過抽樣
+    """
+    window = values[start:stop]
+    if len(window) <= max_points:
+        return np.arange(start, start + len(window)), False
+
+    keep_mask = np.zeros(len(window), dtype=bool) if standard_value is None else window < standard_value
+    if first_wafer_index and start == 0:
+        keep_mask[0] = True
+    return decimate_min_max(window, max_points, keep_mask) + start, True
+
+def line_trace_points(dataset, view, values, indices, first_wafer_index, tier):
+    """主折線圖數值 trace 的點位資料 (x、y、hover 標籤,svg 層級另含逐點顏色與大小)
+
+    svg 層級的 AutoZ complete 點以紅色大點畫在同一條線上;其他層級的 AutoZ complete 點另外繪製,不包含在內。
+    """
+    if tier != 'svg':
+        indices = indices[indices >= first_wafer_index]
+    wafer_indices = indices[indices >= first_wafer_index]
+    has_autoz_point = len(indices) > len(wafer_indices)
+
+    labels = dataset.wafer_labels(view.codes[wafer_indices - first_wafer_index])
+    if has_autoz_point:
+        labels = ["AutoZ Complete"] + labels
+
+    points = {'x': indices.tolist(), 'y': values[indices].tolist(), 'text': labels}
+    if tier == 'svg':
+        # 其他點是 Wafer 資料（藍色小點）,第一個點是 AutoZ Complete（紅色大點）
+        colors = ['#93A1C1'] * len(indices)
+        sizes = [8] * len(indices)
+        if has_autoz_point:
+            colors[0] = '#e5857b'
+            sizes[0] = 20
+        points['marker'] = {'color': colors, 'size': sizes}
+    return points
+
+@functools.lru_cache(maxsize=1)
+def get_plotly_template():
+    """Plotly 預設樣板 (與 go.Figure 轉為字典時附帶的 layout.template 相同,所有圖表共用,不可修改)"""
+    import plotly.io as pio
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+def chart_layout(axis_type):
+    """主圖表與異常分析圖表共用的版面設定 (Plotly 驗證後的字典格式)"""
+    axis_title_font = {'family': 'Arial', 'size': 14}
+    tick_font = {'family': 'Arial', 'size': 12}
+    return {
+        'width': 1100,
+        'height': 600,
+        'showlegend': True,
+        'xaxis': {
+            'title': {'text': "Sequential Index", 'font': axis_title_font},
+            'tickfont': tick_font,
+            'showgrid': True,
+            'gridcolor': 'lightgray'
+        },
+        'yaxis': {
+            'title': {'text': f"{axis_type.upper()} Value (µm)", 'font': axis_title_font},
+            'tickfont': tick_font,
+            'showgrid': True,
+            'gridcolor': 'lightgray'
+        },
+        'legend': {
+            'x': 1.1,
+            'y': 1,
+            'bgcolor': 'rgba(255, 255, 255, 0.8)',
+            'bordercolor': 'lightgray',
+            'borderwidth': 1,
+            'font': {'family': 'Arial', 'size': 12}
+        },
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+        'hovermode': 'closest',
+        'margin': {'l': 50, 'r': 30, 't': 60, 'b': 50},
+        'template': get_plotly_template()
+    }
+
+def build_line_chart_figure(dataset, axis_type, standard_value=None, standard_point_data=None, tier=None):
+    """為指定的軸類型建立折線圖的 Plotly 字典 (不經 go.Figure 驗證,可直接序列化)
+
     Args:
-        wafer_data: 晶圓資料字典
+        dataset: WaferDataset 晶圓資料集
         axis_type: 軸類型 ('x', 'y', 'z')
         standard_value: 標準參考值 (僅用於 Z 軸)
         standard_point_data: AutoZ complete 點位資料
-        
+        tier: 繪製層級,未指定時依點數由 choose_render_tier 決定
+
     Returns:
-        tuple: (fig, stats) Plotly 圖表物件和統計資料
+        tuple: (figure, stats) Plotly 圖表字典和統計資料
     """
-    fig = go.Figure()
-    
-    # 追蹤最大/最小值用於註釋定位
-    max_y_value = float('-inf')
-    min_y_value = float('inf')
-    
-    # 為 x 軸創建連續索引
-    continuous_x = []
-    continuous_y = []
-    wafer_boundaries = []
-    wafer_labels = []
-    point_labels = []
+    traces = []
+    layout = chart_layout(axis_type)
 
-    value_key = f"{axis_type}_values"
+    # 依開始時間排序後的晶圓資料,AutoZ complete 點（如果有提供）作為第一個點
+    view, continuous_y, first_wafer_index = line_chart_series(dataset, axis_type, standard_point_data)
+    has_autoz_point = first_wafer_index == 1
 
-    # 按開始時間排序晶圓
-    sorted_wafers = sorted(wafer_data.items(), key=lambda x: x[1]['start_time'])
+    point_count = len(continuous_y)
+    if tier is None:
+        tier = choose_render_tier(point_count)
 
-    current_index = 0
+    # 總覽圖點數固定:超過上限時以 min/max 分段抽樣,縮放時由 /api/chart_window 補上視窗內的完整點位
+    indices, _ = select_line_chart_points(
+        continuous_y, 0, point_count, CHART_OVERVIEW_MAX_POINTS, first_wafer_index,
+        standard_point_data[axis_type] if has_autoz_point else None
+    )
+    points = line_trace_points(dataset, view, continuous_y, indices, first_wafer_index, tier)
+    hovertemplate = "Point: %{text}<br>" + axis_type.upper() + " Value: %{y:.2f} µm<extra></extra>"
 
-    # 首先插入 AutoZ complete 點作為第一個點（如果有提供）
-    if standard_point_data and axis_type in standard_point_data:
-        autoz_value = standard_point_data[axis_type]
-        continuous_x.append(0)
-        continuous_y.append(autoz_value)
-        point_labels.append("AutoZ Complete")
-        current_index = 1  # 後續的 Wafer 資料從 index 1 開始
-
-    # 處理每個晶圓
-    for wafer_id, data in sorted_wafers:
-        if value_key in data and data[value_key]:
-            values = data[value_key]
-            
-            start_idx = current_index
-            end_idx = start_idx + len(values)
-            
-            continuous_x.extend(range(start_idx, end_idx))
-            continuous_y.extend(values)
-            point_labels.extend([wafer_id] * len(values))
-            
-            wafer_boundaries.append((start_idx, end_idx - 1))
-            wafer_labels.append(wafer_id)
-            
-            current_index = end_idx
-            
-            if values:
-                max_y_value = max(max_y_value, max(values))
-                min_y_value = min(min_y_value, min(values))
-    
-    # 準備顏色和大小陣列
-    if continuous_x and continuous_y:
-        colors = []
-        sizes = []
-
-        # 檢查是否有 AutoZ complete 點
-        has_autoz_point = (standard_point_data and axis_type in standard_point_data)
-
-        # 更新最大/最小值（包含 AutoZ complete 點）
-        if has_autoz_point and continuous_y:
-            max_y_value = max(max_y_value, continuous_y[0])
-            min_y_value = min(min_y_value, continuous_y[0])
-
-        for i in range(len(continuous_x)):
-            if i == 0 and has_autoz_point:
-                # 第一個點是 AutoZ Complete（紅色大點）
-                colors.append('#e5857b')
-                sizes.append(20)
-            else:
-                # 其他點是 Wafer 資料（藍色小點）
-                colors.append('#93A1C1')
-                sizes.append(8)
-        
+    # 每個晶圓的第一個點位置
+    wafer_boundaries = (view.starts + first_wafer_index).tolist()
+
+    # 追蹤最大/最小值用於註釋定位（包含 AutoZ complete 點）
+    if point_count:
+        max_y_value = float(continuous_y.max())
+        min_y_value = float(continuous_y.min())
+
+    if point_count and tier == 'svg':
         # 添加主線跡與標記
-        fig.add_trace(
-            go.Scatter(
-                x=continuous_x,
-                y=continuous_y,
-                mode='lines+markers',
-                name=f"{axis_type.upper()} Values",
-                text=point_labels,
-                line=dict(color='#93A1C1', width=4),
-                marker=dict(
-                    size=sizes,
-                    color=colors,
-                    line=dict(color='white', width=2)
-                ),
-                hovertemplate="Point: %{text}<br>" + axis_type.upper() + " Value: %{y:.2f} µm<extra></extra>"
-            )
-        )
-    
+        traces.append({
+            'type': 'scatter',
+            'x': points['x'],
+            'y': points['y'],
+            'mode': 'lines+markers',
+            'name': f"{axis_type.upper()} Values",
+            'text': points['text'],
+            'line': {'color': '#93A1C1', 'width': 4},
+            'marker': {
+                'size': points['marker']['size'],
+                'color': points['marker']['color'],
+                'line': {'color': 'white', 'width': 2}
+            },
+            'hovertemplate': hovertemplate
+        })
+
+    elif point_count:
+        # WebGL 與包絡層級:晶圓點位以 Scattergl 繪製並使用單一顏色與大小,避免逐點樣式陣列
+        traces.append({
+            'type': 'scattergl',
+            'x': points['x'],
+            'y': points['y'],
+            'mode': 'lines+markers',
+            'name': f"{axis_type.upper()} Values",
+            'text': points['text'],
+            'line': {'color': '#93A1C1', 'width': 2},
+            'marker': {'size': 4, 'color': '#93A1C1'},
+            'hovertemplate': hovertemplate
+        })
+
+    # WebGL 與包絡層級的 AutoZ complete 點另外以單點 trace 標示
+    if has_autoz_point and tier != 'svg':
+        traces.append({
+            'type': 'scatter',
+            'x': [0],
+            'y': [float(continuous_y[0])],
+            'mode': 'markers',
+            'name': 'AutoZ Complete',
+            'text': ['AutoZ Complete'],
+            'marker': {'size': 20, 'color': '#e5857b', 'line': {'color': 'white', 'width': 2}},
+            'hovertemplate': hovertemplate
+        })
+
     # 僅為 Z 軸添加標準參考線
     if standard_value is not None and axis_type == 'z':
-        x_range_start = min(continuous_x) if continuous_x else 0
-        x_range_end = max(continuous_x) if continuous_x else 1
-        
-        fig.add_trace(
-            go.Scatter(
-                x=[x_range_start, x_range_end],
-                y=[standard_value, standard_value],
-                mode='lines',
-                name=f"{axis_type.upper()} Standard",
-                line=dict(color='#e5857b', width=4, dash='dash')
-            )
-        )
-        
+        x_range_start = 0
+        x_range_end = point_count - 1 if point_count else 1
+
+        traces.append({
+            'type': 'scatter',
+            'x': [x_range_start, x_range_end],
+            'y': [standard_value, standard_value],
+            'mode': 'lines',
+            'name': f"{axis_type.upper()} Standard",
+            'line': {'color': '#e5857b', 'width': 4, 'dash': 'dash'}
+        })
+
         # 在 Z 標準線上添加常駐標籤
-        if continuous_x:
+        if point_count:
             x_range = x_range_end - x_range_start if x_range_end > x_range_start else 1
             x_pos = x_range_start + x_range / 2
-            
-            fig.add_annotation(
-                x=x_pos,
-                y=standard_value,
-                text=f"Z Standard: {standard_value:.2f} µm",
-                showarrow=False,
-                yshift=15,
-                bgcolor="rgba(255, 255, 255, 0.8)",
-                bordercolor="#e5857b",
-                borderwidth=2,
-                borderpad=4,
-                font=dict(color="#e5857b", size=12, family="Microsoft JhengHei")
-            )
-    
-    # 添加晶圓邊界標記
-    for i, (start, end) in enumerate(wafer_boundaries):
-        fig.add_trace(
-            go.Scatter(
-                x=[start, start],
-                y=[min_y_value, max_y_value],
-                mode='lines',
-                line=dict(
-                    color='rgba(69, 73, 106, 0.25)',
-                    width=1.2,  
-                    dash='dot'
-                ),
-                showlegend=False
-            )
-        )
-    
-    # 更新佈局
-    fig.update_layout(
-        width=1100,
-        height=600,
-        showlegend=True,
-        xaxis=dict(
-            title="Sequential Index",
-            title_font=dict(family='Arial', size=14),
-            tickfont=dict(family='Arial', size=12),
-            showgrid=True,
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title=f"{axis_type.upper()} Value (µm)",
-            title_font=dict(family='Arial', size=14),
-            tickfont=dict(family='Arial', size=12),
-            showgrid=True,
-            gridcolor='lightgray'
-        ),
-        legend=dict(
-            x=1.1,
-            y=1,
-            bgcolor='rgba(255, 255, 255, 0.8)',
-            bordercolor='lightgray',
-            borderwidth=1,
-            font=dict(family='Arial', size=12)
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='closest',
-        margin=dict(l=50, r=30, t=60, b=50)
-    )
-    
+
+            layout['annotations'] = [{
+                'x': x_pos,
+                'y': standard_value,
+                'text': f"Z Standard: {standard_value:.2f} µm",
+                'showarrow': False,
+                'yshift': 15,
+                'bgcolor': "rgba(255, 255, 255, 0.8)",
+                'bordercolor': "#e5857b",
+                'borderwidth': 2,
+                'borderpad': 4,
+                'font': {'color': "#e5857b", 'size': 12, 'family': "Microsoft JhengHei"}
+            }]
+
+    # 添加晶圓邊界標記（所有邊界合併為單一 trace,以 None 斷開各線段,
+    # 讓 trace 數量不隨晶圓數增加;晶圓數多於總覽圖點數上限時省略）
+    if wafer_boundaries and len(wafer_boundaries) <= CHART_OVERVIEW_MAX_POINTS:
+        boundary_x = [None] * (len(wafer_boundaries) * 3)
+        boundary_x[0::3] = wafer_boundaries
+        boundary_x[1::3] = wafer_boundaries
+        boundary_y = [min_y_value, max_y_value, None] * len(wafer_boundaries)
+
+        traces.append({
+            'type': 'scatter',
+            'x': boundary_x,
+            'y': boundary_y,
+            'mode': 'lines',
+            'name': 'Wafer Boundaries',
+            'line': {'color': 'rgba(69, 73, 106, 0.25)', 'width': 1.2, 'dash': 'dot'},
+            'connectgaps': False,
+            'hoverinfo': 'skip',
+            'showlegend': False
+        })
+
     # 計算統計數據
-    all_values = continuous_y.copy() if continuous_y else []
-    
-    stats = {
-        'min': min(all_values) if all_values else 0,
-        'max': max(all_values) if all_values else 0,
-        'mean': np.mean(all_values) if all_values else 0,
-        'median': np.median(all_values) if all_values else 0,
-        'std': np.std(all_values) if all_values else 0,
-        'count': len(all_values)
-    }
-    
-    return fig, stats
+    stats = compute_axis_stats(continuous_y)
 
-def create_wafer_status_dashboard(wafer_data, z_standard):
-    """創建 Wafer 狀態儀表板,顯示哪些 Wafer 有低於標準的 Z 值"""
-    
+    return {'data': traces, 'layout': layout}, stats
+
+def create_line_chart(dataset, axis_type, standard_value=None, standard_point_data=None, tier=None):
+    """為指定的軸類型創建折線圖 (go.Figure 版本,供匯出 HTML 使用;參數同 build_line_chart_figure)
+
+    Returns:
+        tuple: (fig, stats) Plotly 圖表物件和統計資料
+    """
+    import plotly.graph_objects as go
+
+    figure, stats = build_line_chart_figure(dataset, axis_type, standard_value, standard_point_data, tier)
+    return go.Figure(figure), stats
+
+def compute_wafer_status(dataset, z_standard):
+    """計算各 Wafer 低於 Z 標準值的點數 (依開始時間排序)
+
+    Returns:
+        dict: {wafer_id: {'below_standard', 'below_count', 'total_count', 'percent_below'}}
+    """
     wafer_status = {}
-    sorted_wafers = sorted(wafer_data.items(), key=lambda x: x[1]['start_time'])
-    
-    for wafer_id, data in sorted_wafers:
-        if 'z_values' in data and data['z_values']:
-            below_standard = any(z < z_standard for z in data['z_values'])
-            below_count = sum(1 for z in data['z_values'] if z < z_standard)
-            total_count = len(data['z_values'])
-            percent_below = (below_count / total_count * 100) if total_count > 0 else 0
-            
+    view = dataset.sorted_axis('z')
+
+    if len(view.starts):
+        # 以晶圓起始位置做分段加總,一次計算所有晶圓低於標準的點數
+        below_counts = np.add.reduceat((view.values < z_standard).astype(np.int64), view.starts)
+        total_counts = np.diff(np.append(view.starts, len(view.values)))
+
+        for wafer_id, below_count, total_count in zip(
+            dataset.wafer_labels(view.wafers), below_counts.tolist(), total_counts.tolist()
+        ):
             wafer_status[wafer_id] = {
-                'below_standard': below_standard,
+                'below_standard': below_count > 0,
                 'below_count': below_count,
                 'total_count': total_count,
-                'percent_below': percent_below
+                'percent_below': below_count / total_count * 100
             }
+
+    return wafer_status
+
+WAFER_STATS_FIELDS = ('count', 'min', 'max', 'mean', 'std', 'range', 'below')
+
+def compute_wafer_stats(dataset, standards):
+    """以晶圓位移做分段 reduceat,一次計算所有晶圓 X/Y/Z 三軸的統計資料
+
+    Args:
+        dataset: WaferDataset 晶圓資料集
+        standards: 各軸標準值 {'x'|'y'|'z': float}
+
+    Returns:
+        dict: 欄位名稱 → 依原始晶圓順序排列的陣列。'wafer' 為晶圓 ID、'start' 為依開始時間排序的名次,
+              各軸欄位為 '{axis}_{field}' (field 見 WAFER_STATS_FIELDS),沒有該軸資料的晶圓統計值為 NaN
+    """
+    n_wafers = dataset.n_wafers
+    start_rank = np.empty(n_wafers, dtype=np.int64)
+    start_rank[dataset.order] = np.arange(n_wafers)
+    table = {
+        'wafer': np.array(dataset.wafer_labels(np.arange(n_wafers)), dtype=object),
+        'start': start_rank
+    }
+
+    for axis in dataset.AXES:
+        values = dataset.values[axis]
+        counts = np.diff(dataset.offsets[axis])
+        present = counts > 0
+
+        # 沒有點位的晶圓分段長度為 0,不參與 reduceat (否則會取到下一個晶圓的值)
+        starts = dataset.offsets[axis][:-1][present]
+        lengths = counts[present]
+
+        columns = {field: np.full(n_wafers, np.nan) for field in ('min', 'max', 'mean', 'std')}
+        below = np.zeros(n_wafers, dtype=np.int64)
+        if starts.size:
+            means = np.add.reduceat(values, starts) / lengths
+            deviations = values - np.repeat(means, lengths)
+            columns['min'][present] = np.minimum.reduceat(values, starts)
+            columns['max'][present] = np.maximum.reduceat(values, starts)
+            columns['mean'][present] = means
+            columns['std'][present] = np.sqrt(np.add.reduceat(deviations * deviations, starts) / lengths)
+            below[present] = np.add.reduceat((values < standards[axis]).astype(np.int64), starts)
+        columns['range'] = columns['max'] - columns['min']
+        columns['count'] = counts
+        columns['below'] = below
+
+        for field in WAFER_STATS_FIELDS:
+            table[f"{axis}_{field}"] = columns[field]
+
+    return table
+
+def wafer_stats_sort_keys():
+    """Wafer 統計表可排序的欄位"""
+    return ('wafer', 'start') + tuple(f"{axis}_{field}" for axis in WaferDataset.AXES for field in WAFER_STATS_FIELDS)
+
+def page_wafer_stats(table, sort='start', descending=False, page=1, page_size=WAFER_STATS_PAGE_SIZE):
+    """依指定欄位排序 Wafer 統計表並取出一頁
+
+    數值相同時依開始時間排序;沒有資料 (NaN) 的晶圓不論升降冪都排在最後。
+
+    Returns:
+        tuple: (rows, total) 該頁各列的字典 (NaN 轉為 None) 與晶圓總數
+    """
+    total = len(table['start'])
+    if sort == 'wafer':
+        order = np.argsort(table['wafer'], kind='stable')
+        if descending:
+            order = order[::-1]
+    else:
+        column = table[sort].astype(np.float64)
+        # lexsort 以最後一個鍵為主要排序鍵,NaN 排在最後
+        order = np.lexsort((table['start'], -column if descending else column))
+
+    selected = order[(page - 1) * page_size:page * page_size]
+    columns = {key: table[key][selected].tolist() for key in table}
+    rows = [
+        {key: (None if isinstance(value, float) and math.isnan(value) else value)
+         for key, value in zip(columns, row)}
+        for row in zip(*columns.values())
+    ]
+    return rows, total
+
+def get_wafer_stats(cache, analysis_data):
+    """取得分析資料的 Wafer 統計表 (存於工作階段的統計表快取,同一版本只計算一次)"""
+    standards = {axis: analysis_data[f"{axis}_standard"] for axis in WaferDataset.AXES}
+    return cache.get_or_build(
+        (analysis_data['version'], 'wafer_stats', standards['x'], standards['y'], standards['z']),
+        lambda: compute_wafer_stats(analysis_data['dataset'], standards)
+    )
+
+def create_wafer_status_dashboard(dataset, z_standard):
+    """創建 Wafer 狀態儀表板,顯示哪些 Wafer 有低於標準的 Z 值"""
+    
+    wafer_status = compute_wafer_status(dataset, z_standard)
     
     wafers_per_row = 4
     
@@ -535,255 +1570,1926 @@ def create_wafer_status_dashboard(wafer_data, z_standard):
     
     return css + html_content
 
-def create_anomaly_chart(wafer_data, axis_type, standard_value, standard_point_data=None):
-    """創建突顯低於標準值的圖表（支援 X/Y/Z 三軸）
+def build_anomaly_chart_figure(dataset, axis_type, standard_value, standard_point_data=None, tier=None):
+    """建立突顯低於標準值的圖表的 Plotly 字典（支援 X/Y/Z 三軸,不經 go.Figure 驗證）
 
     Args:
-        wafer_data: 晶圓資料字典
+        dataset: WaferDataset 晶圓資料集
         axis_type: 軸類型 ('x', 'y', 'z')
         standard_value: 標準值
         standard_point_data: AutoZ complete 點位資料
+        tier: 繪製層級,未指定時依點數由 choose_render_tier 決定
 
     Returns:
-        tuple: (fig, stats) Plotly 圖表物件和統計資料
+        tuple: (figure, stats) Plotly 圖表字典和統計資料
     """
-    fig = go.Figure()
+    traces = []
 
-    continuous_x = []
-    normal_y = []
-    anomaly_y = []
-    normal_indices = []
-    anomaly_indices = []
-    wafer_ids = []
+    view = dataset.sorted_axis(axis_type)
 
-    sorted_wafers = sorted(wafer_data.items(), key=lambda x: x[1]['start_time'])
-    current_index = 0
+    # 檢查是否有 AutoZ complete 點
+    has_autoz_point = bool(standard_point_data and axis_type in standard_point_data)
+
+    # 每個點的 hover 前綴：AutoZ complete 點在最前面,其餘為所屬晶圓
+    wafer_prefixes = np.empty(dataset.n_wafers, dtype=object)
+    wafer_prefixes[:] = [f'Wafer ID: {wid}' for wid in dataset.wafer_ids]
+    point_prefixes = wafer_prefixes[view.codes]
 
     # 首先插入 AutoZ complete 點作為第一個點（如果有提供）
-    if standard_point_data and axis_type in standard_point_data:
-        autoz_value = standard_point_data[axis_type]
-        wafer_ids.append("AutoZ Complete")
-        if autoz_value < standard_value:
-            anomaly_indices.append(0)
-            anomaly_y.append(autoz_value)
-        else:
-            normal_indices.append(0)
-            normal_y.append(autoz_value)
-        current_index = 1  # 後續的 Wafer 資料從 index 1 開始
+    if has_autoz_point:
+        values = np.concatenate(([standard_point_data[axis_type]], view.values))
+        point_prefixes = np.concatenate((np.array(['AutoZ Complete'], dtype=object), point_prefixes))
+    else:
+        values = view.values
 
-    for wafer_id, data in sorted_wafers:
-        values_key = f'{axis_type}_values'
-        if values_key in data and data[values_key]:
-            values = data[values_key]
-            indices = list(range(current_index, current_index + len(values)))
+    current_index = len(values)
+    if tier is None:
+        tier = choose_render_tier(current_index)
 
-            for idx, val in zip(indices, values):
-                wafer_ids.append(wafer_id)
-                if val < standard_value:
-                    anomaly_indices.append(idx)
-                    anomaly_y.append(val)
-                else:
-                    normal_indices.append(idx)
-                    normal_y.append(val)
+    # 以布林遮罩一次完成分類
+    anomaly_mask = values < standard_value
+    normal_indices = np.flatnonzero(~anomaly_mask)
+    anomaly_indices = np.flatnonzero(anomaly_mask)
 
-            current_index += len(values)
+    def build_trace_arrays(indices, color, size):
+        """依遮罩選出的索引建立單一 trace 的座標、樣式與 hover 文字"""
+        point_y = values[indices].tolist()
+        colors = [color] * len(indices)
+        sizes = [size] * len(indices)
+        symbols = ['circle'] * len(indices)
 
-    # 檢查是否有 AutoZ complete 點
-    has_autoz_point = (standard_point_data and axis_type in standard_point_data)
+        # 只有索引 0 可能是 AutoZ Complete 點（橘色菱形）
+        if has_autoz_point and len(indices) and indices[0] == 0:
+            colors[0] = '#FF6600'
+            sizes[0] = 14
+            symbols[0] = 'diamond'
+
+        value_label = f"<br>{axis_type.upper()} Value: "
+        text = [f"{prefix}{value_label}{val:.2f} µm"
+                for prefix, val in zip(point_prefixes[indices].tolist(), point_y)]
+
+        return indices.tolist(), point_y, colors, sizes, symbols, text
 
     # 添加正常點
-    if normal_indices:
-        normal_wafer_ids_list = []
-        for i in normal_indices:
-            if i < len(wafer_ids):
-                normal_wafer_ids_list.append(wafer_ids[i])
-        
-        normal_colors = []
-        normal_sizes = []
-        normal_symbols = []
-
-        for i, idx in enumerate(normal_indices):
-            if idx == 0 and has_autoz_point:
-                # AutoZ Complete 點（橘色菱形）
-                normal_colors.append('#FF6600')
-                normal_sizes.append(14)
-                normal_symbols.append('diamond')
-            else:
-                # 正常點（綠色圓形）
-                normal_colors.append('#4CAF50')
-                normal_sizes.append(8)
-                normal_symbols.append('circle')
-        
-        fig.add_trace(
-            go.Scatter(
-                x=normal_indices,
-                y=normal_y,
-                mode='markers',
-                name='Normal Points',
-                marker=dict(
-                    color=normal_colors,
-                    size=normal_sizes,
-                    symbol=normal_symbols,
-                    line=dict(width=1, color='white')
-                ),
-                text=[f"{'AutoZ Complete' if (idx == 0 and has_autoz_point) else f'Wafer ID: {wid}'}<br>{axis_type.upper()} Value: {val:.2f} µm"
-                      for idx, wid, val in zip(normal_indices, normal_wafer_ids_list, normal_y)],
-                hoverinfo='text'
-            )
-        )
+    if tier == 'svg' and len(normal_indices):
+        x, y, colors, sizes, symbols, text = build_trace_arrays(normal_indices, '#4CAF50', 8)
+        traces.append({
+            'type': 'scatter',
+            'x': x,
+            'y': y,
+            'mode': 'markers',
+            'name': 'Normal Points',
+            'marker': {
+                'color': colors,
+                'size': sizes,
+                'symbol': symbols,
+                'line': {'width': 1, 'color': 'white'}
+            },
+            'text': text,
+            'hoverinfo': 'text'
+        })
     
     # 添加異常點
-    if anomaly_indices:
-        anomaly_wafer_ids_list = []
-        for i in anomaly_indices:
-            if i < len(wafer_ids):
-                anomaly_wafer_ids_list.append(wafer_ids[i])
-        
-        anomaly_colors = []
-        anomaly_sizes = []
-        anomaly_symbols = []
-
-        for i, idx in enumerate(anomaly_indices):
-            if idx == 0 and has_autoz_point:
-                # AutoZ Complete 點（橘色菱形）
-                anomaly_colors.append('#FF6600')
-                anomaly_sizes.append(14)
-                anomaly_symbols.append('diamond')
-            else:
-                # 異常點（紅色圓形）
-                anomaly_colors.append('#F44336')
-                anomaly_sizes.append(10)
-                anomaly_symbols.append('circle')
-        
-        fig.add_trace(
-            go.Scatter(
-                x=anomaly_indices,
-                y=anomaly_y,
-                mode='markers',
-                name='Below Standard',
-                marker=dict(
-                    color=anomaly_colors,
-                    size=anomaly_sizes,
-                    symbol=anomaly_symbols,
-                    line=dict(width=1, color='white')
-                ),
-                text=[f"{'AutoZ Complete' if (idx == 0 and has_autoz_point) else f'Wafer ID: {wid}'}<br>{axis_type.upper()} Value: {val:.2f} µm"
-                      for idx, wid, val in zip(anomaly_indices, anomaly_wafer_ids_list, anomaly_y)],
-                hoverinfo='text'
-            )
-        )
-    
+    if tier == 'svg' and len(anomaly_indices):
+        x, y, colors, sizes, symbols, text = build_trace_arrays(anomaly_indices, '#F44336', 10)
+        traces.append({
+            'type': 'scatter',
+            'x': x,
+            'y': y,
+            'mode': 'markers',
+            'name': 'Below Standard',
+            'marker': {
+                'color': colors,
+                'size': sizes,
+                'symbol': symbols,
+                'line': {'width': 1, 'color': 'white'}
+            },
+            'text': text,
+            'hoverinfo': 'text'
+        })
+
+    if tier == 'webgl':
+        # WebGL:AutoZ complete 點另外標示,其餘點位使用單一顏色與大小
+        for indices, name, color, size in ((normal_indices, 'Normal Points', '#4CAF50', 5),
+                                           (anomaly_indices, 'Below Standard', '#F44336', 6)):
+            if has_autoz_point:
+                indices = indices[indices != 0]
+            if not len(indices):
+                continue
+            x, y, _, _, _, text = build_trace_arrays(indices, color, size)
+            traces.append({
+                'type': 'scattergl',
+                'x': x,
+                'y': y,
+                'mode': 'markers',
+                'name': name,
+                'marker': {'color': color, 'size': size},
+                'text': text,
+                'hoverinfo': 'text'
+            })
+
+    elif tier == 'envelope':
+        # 包絡:所有點位以分段最小/最大值填色帶表示,低於標準的點位以每段最低值標示
+        first_wafer_index = 1 if has_autoz_point else 0
+        wafer_values = values[first_wafer_index:]
+        series = envelope_series(wafer_values, RENDER_ENVELOPE_BUCKETS, standard_value, first_wafer_index)
+        points_per_bucket = math.ceil(len(wafer_values) / max(len(series['x']), 1))
+
+        if series['x']:
+            traces.append({
+                'type': 'scatter',
+                'x': series['x'],
+                'y': series['min'],
+                'mode': 'lines',
+                'name': 'Points Min',
+                'line': {'color': '#4CAF50', 'width': 1},
+                'hoverinfo': 'skip',
+                'showlegend': False
+            })
+            traces.append({
+                'type': 'scatter',
+                'x': series['x'],
+                'y': series['max'],
+                'mode': 'lines',
+                'name': f"All Points (min–max per {points_per_bucket:,} points)",
+                'fill': 'tonexty',
+                'fillcolor': 'rgba(76, 175, 80, 0.35)',
+                'line': {'color': '#4CAF50', 'width': 1},
+                'hoverinfo': 'skip'
+            })
+            if series['below']['x']:
+                traces.append({
+                    'type': 'scatter',
+                    'x': series['below']['x'],
+                    'y': series['below']['y'],
+                    'mode': 'markers',
+                    'name': 'Below Standard',
+                    'marker': {'color': '#F44336', 'size': 8, 'line': {'width': 1, 'color': 'white'}},
+                    'text': series['below']['text'],
+                    'hoverinfo': 'text'
+                })
+
+    if has_autoz_point and tier != 'svg':
+        traces.append({
+            'type': 'scatter',
+            'x': [0],
+            'y': [float(values[0])],
+            'mode': 'markers',
+            'name': 'AutoZ Complete',
+            'marker': {'color': '#FF6600', 'size': 14, 'symbol': 'diamond', 'line': {'width': 1, 'color': 'white'}},
+            'text': [f"AutoZ Complete<br>{axis_type.upper()} Value: {values[0]:.2f} µm"],
+            'hoverinfo': 'text'
+        })
+
     # 添加標準線
     x_range_start = 0
     x_range_end = current_index
-    fig.add_trace(
-        go.Scatter(
-            x=[x_range_start, x_range_end],
-            y=[standard_value, standard_value],
-            mode='lines',
-            name=f"{axis_type.upper()} Standard ({standard_value} µm)",
-            line=dict(color='#E91E63', width=3, dash='dash')
-        )
-    )
-    
+    traces.append({
+        'type': 'scatter',
+        'x': [x_range_start, x_range_end],
+        'y': [standard_value, standard_value],
+        'mode': 'lines',
+        'name': f"{axis_type.upper()} Standard ({standard_value} µm)",
+        'line': {'color': '#E91E63', 'width': 3, 'dash': 'dash'}
+    })
+
     # 計算異常點統計
-    total_points = len(normal_indices) + len(anomaly_indices)
-    anomaly_count = len(anomaly_indices)
-    anomaly_percent = (anomaly_count / total_points * 100) if total_points > 0 else 0
-    
-    # 更新佈局
-    fig.update_layout(
-        width=1100,
-        height=600,
-        showlegend=True,
-        xaxis=dict(
-            title="Sequential Index",
-            title_font=dict(family='Arial', size=14),
-            tickfont=dict(family='Arial', size=12),
-            showgrid=True,
-            gridcolor='lightgray'
-        ),
-        yaxis=dict(
-            title=f"{axis_type.upper()} Value (µm)",
-            title_font=dict(family='Arial', size=14),
-            tickfont=dict(family='Arial', size=12),
-            showgrid=True,
-            gridcolor='lightgray'
-        ),
-        legend=dict(
-            x=1.1,
-            y=1,
-            bgcolor='rgba(255, 255, 255, 0.8)',
-            bordercolor='lightgray',
-            borderwidth=1,
-            font=dict(family='Arial', size=12)
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='closest',
-        margin=dict(l=50, r=30, t=60, b=50)
+    stats = compute_anomaly_stats(values, standard_value)
+
+    return {'data': traces, 'layout': chart_layout(axis_type)}, stats
+
+def create_anomaly_chart(dataset, axis_type, standard_value, standard_point_data=None, tier=None):
+    """創建突顯低於標準值的圖表 (go.Figure 版本,供匯出 HTML 使用;參數同 build_anomaly_chart_figure)
+
+    Returns:
+        tuple: (fig, stats) Plotly 圖表物件和統計資料
+    """
+    import plotly.graph_objects as go
+
+    figure, stats = build_anomaly_chart_figure(dataset, axis_type, standard_value, standard_point_data, tier)
+    return go.Figure(figure), stats
+
+
+# 圖表資料編碼
+def encode_typed_array(array, precision=CHART_JSON_PRECISION):
+    """將數值陣列編碼為 Plotly.js 可直接使用的 base64 little-endian typed array
+
+    整數依範圍選用 u1/i4;浮點數在 float32 誤差小於 precision 位小數的一半時使用 f4,否則使用 f8。
+    """
+    if array.dtype.kind in 'iu':
+        if array.size and array.min() >= 0 and array.max() < 256:
+            dtype = 'u1'
+        elif not array.size or (array.min() >= np.iinfo(np.int32).min and array.max() <= np.iinfo(np.int32).max):
+            dtype = 'i4'
+        else:
+            dtype = 'f8'
+    else:
+        with np.errstate(over='ignore', invalid='ignore'):
+            error = np.abs(array.astype(np.float32).astype(np.float64) - array)
+        dtype = 'f4' if np.all(error <= 0.5 * 10 ** -precision) else 'f8'
+
+    data = np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {'dtype': dtype, 'bdata': base64.b64encode(data.tobytes()).decode('ascii')}
+
+def encode_chart_arrays(fig_dict, encoding, precision=CHART_JSON_PRECISION):
+    """編碼圖表中的數值陣列 (x 索引、y 數值、標記大小)
+
+    binary 模式轉為 typed array;json 模式將浮點數四捨五入到 precision 位小數。
+    含 None 的陣列 (例如晶圓邊界的斷點) 與過短的陣列維持原樣。
+    """
+    def encode(values):
+        if not isinstance(values, (list, tuple)) or len(values) < TYPED_ARRAY_MIN_LENGTH:
+            return values
+        array = np.asarray(values)
+        if array.dtype.kind not in 'iuf':
+            return values
+        if encoding == 'binary':
+            return encode_typed_array(array, precision)
+        if array.dtype.kind == 'f':
+            return np.round(array, precision).tolist()
+        return values
+
+    for trace in fig_dict.get('data', []):
+        for key in ('x', 'y'):
+            if key in trace:
+                trace[key] = encode(trace[key])
+        marker = trace.get('marker')
+        if marker and 'size' in marker:
+            marker['size'] = encode(marker['size'])
+
+    return fig_dict
+
+# 回應壓縮
+def choose_encoding():
+    """依 Accept-Encoding 選擇壓縮方式 (優先 brotli,其次 gzip),皆不支援時回傳 'identity'"""
+    if brotli is not None and request.accept_encodings['br'] > 0:
+        return 'br'
+    if request.accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return 'identity'
+
+def compress_body(body, encoding, label, gzip_level=None, brotli_quality=None):
+    """壓縮回應內容,並記錄壓縮比與耗時以便調整設定"""
+    start = time.perf_counter()
+    if encoding == 'br':
+        quality = COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        compressed = brotli.compress(body, quality=quality)
+    else:
+        level = COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        compressed = gzip.compress(body, level, mtime=0)
+    elapsed = time.perf_counter() - start
+
+    print(f"Compressed {label} ({encoding}): {len(body):,} -> {len(compressed):,} bytes "
+          f"({len(compressed) / max(len(body), 1):.1%}) in {elapsed * 1000:.1f} ms")
+    return compressed
+
+class ResponsePayload:
+    """序列化後的回應內容與 ETag,各壓縮版本在第一次需要時才產生並保存
+
+    每個壓縮版本有各自的 ETag,讓條件請求能對應到客戶端實際收到的版本。
+    """
+
+    def __init__(self, body, mimetype, label, gzip_level=None, brotli_quality=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.label = label
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._gzip_level = gzip_level
+        self._brotli_quality = brotli_quality
+        self._variants = {'identity': (body, self.etag)}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding):
+        """取得指定壓縮方式的 (body, etag),低於 COMPRESSION_MIN_SIZE 的內容不壓縮"""
+        if len(self.body) < COMPRESSION_MIN_SIZE:
+            encoding = 'identity'
+        with self._lock:
+            cached = self._variants.get(encoding)
+            if cached is None:
+                compressed = compress_body(
+                    self.body, encoding, self.label, self._gzip_level, self._brotli_quality
+                )
+                cached = (compressed, f"{self.etag}-{encoding}")
+                self._variants[encoding] = cached
+            return encoding, cached
+
+    @property
+    def nbytes(self):
+        """已產生的各壓縮版本合計大小 (bytes)"""
+        with self._lock:
+            return sum(len(body) for body, _ in self._variants.values())
+
+    def precompress(self, encodings=None):
+        """預先產生壓縮版本 (未指定 encodings 時產生所有可用的版本)"""
+        if encodings is None:
+            encodings = ('gzip', 'br') if brotli is not None else ('gzip',)
+        for encoding in encodings:
+            self.variant(encoding)
+        return self
+
+def make_etag_response(body, etag, mimetype='application/json', cache_control='no-cache'):
+    """回傳帶 ETag 的回應,若客戶端的 If-None-Match 相符則回傳 304"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def make_payload_response(payload, cache_control='no-cache'):
+    """以協商後的壓縮版本回應 ResponsePayload,並支援 If-None-Match 條件請求"""
+    encoding, (body, etag) = payload.variant(choose_encoding())
+
+    response = make_etag_response(body, etag, payload.mimetype, cache_control)
+    if encoding != 'identity' and response.status_code == 200:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compress_response(view):
+    """路由裝飾器：依 Accept-Encoding 壓縮超過 COMPRESSION_MIN_SIZE 的動態回應
+
+    帶 ETag 的回應由 make_payload_response 自行處理壓縮版本,此處不再壓縮。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or 'ETag' in response.headers):
+            return response
+
+        body = response.get_data()
+        encoding = choose_encoding()
+        if len(body) < COMPRESSION_MIN_SIZE or encoding == 'identity':
+            return response
+
+        response.set_data(compress_body(body, encoding, request.path))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return wrapper
+
+# 圖表快取
+class ChartResponseCache:
+    """以 (資料集版本, 軸, 標準值) 為鍵的 LRU 快取,儲存序列化後的 ResponsePayload
+
+    每個工作階段各有一份 (見 AnalysisSession),分頁之間不會互相擠出圖表。
+    sizeof 計算單一項目的記憶體大小 (預設為 ResponsePayload.nbytes)。
+    以 discard_version 移除的版本不再存入,之後才完成的建立 (例如背景預先計算) 只回傳結果。
+    """
+
+    def __init__(self, max_entries, sizeof=None):
+        self.max_entries = max_entries
+        self.sizeof = sizeof or (lambda payload: payload.nbytes)
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """取得快取項目,不存在時回傳 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, payload):
+        """存入 ResponsePayload 並回傳 (已移除的版本不存入)"""
+        with self._lock:
+            if key[0] in self._retired:
+                return payload
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def get_or_build(self, key, build):
+        """取得快取項目,不存在時呼叫 build() 建立並存入
+
+        同一個鍵正在由其他執行緒 (例如背景預先計算) 建立時,等待其結果而不重複計算;
+        該次建立失敗時不沿用其例外,由等待的呼叫端自行重新建立。
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry
+                pending = self._pending.get(key)
+                building = pending is None
+                if building:
+                    pending = self._pending[key] = Future()
+
+            if building:
+                break
+            try:
+                return pending.result()
+            except Exception:
+                continue
+
+        # 先移除 pending 再通知等待者,重新建立時不會再取得同一個失敗的 Future
+        try:
+            payload = self.put(key, build())
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+        pending.set_result(payload)
+        return payload
+
+    @property
+    def nbytes(self):
+        """快取項目合計的記憶體大小 (bytes)"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(self.sizeof(entry) for entry in entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def discard_version(self, version):
+        """移除指定資料集版本的所有快取項目,之後也不再存入該版本"""
+        with self._lock:
+            self._retired.add(version)
+            for key in [key for key in self._entries if key[0] == version]:
+                del self._entries[key]
+
+# 預先壓縮的靜態內容
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+static_payloads = {}
+static_payloads_lock = threading.Lock()
+
+def get_static_payload(name, build):
+    """取得已預先壓縮的靜態內容,首次使用時以 build() 產生 (bytes, mimetype, options) 並快取"""
+    with static_payloads_lock:
+        payload = static_payloads.get(name)
+        if payload is None:
+            body, mimetype, options = build()
+            payload = ResponsePayload(body, mimetype, name, **options).precompress()
+            static_payloads[name] = payload
+        return payload
+
+def discard_static_payload(name):
+    """移除已快取的靜態內容 (內容變更時使用,下次取得時重新產生)"""
+    with static_payloads_lock:
+        static_payloads.pop(name, None)
+
+def get_index_payload():
+    """首頁內容固定不變,只產生並以最高壓縮等級壓縮一次"""
+    return get_static_payload(
+        'index',
+        lambda: (link_mirrored_assets(generate_index_html()).encode('utf-8'), 'text/html', {'gzip_level': 9, 'brotli_quality': 11})
     )
-    
-    stats = {
-        'total_points': total_points,
-        'normal_points': len(normal_indices),
-        'anomaly_points': anomaly_count,
-        'anomaly_percent': anomaly_percent
-    }
-    
-    return fig, stats
 
+# Plotly.js 靜態資源 (以版本號區分網址,可由瀏覽器長期快取)
+def get_plotly_js_url():
+    """取得結果頁面引用 Plotly.js 的網址"""
+    import plotly.offline
+    return f"/vendor/plotly-{plotly.offline.get_plotlyjs_version()}.min.js"
+
+def get_plotly_js_payload():
+    """Plotly.js 檔案較大,brotli 使用較低的壓縮等級以縮短首次產生時間"""
+    import plotly.offline
+    return get_static_payload(
+        'plotly_js',
+        lambda: (plotly.offline.get_plotlyjs().encode('utf-8'), 'application/javascript', {'gzip_level': 9, 'brotli_quality': 6})
+    )
+
+# 網路字型與圖示資源的本機鏡像
+#
+# Font Awesome 與 Google Fonts 位於 M: 網路磁碟。第一次使用時將檔案複製到本機鏡像並以內容的
+# SHA-256 命名,頁面改以 /assets/c/<sha>/<檔名> 引用,回應帶 immutable 快取標頭,重新載入頁面時
+# 不會再經過網路磁碟。CSS 以相對路徑引用的字型會一併鏡像,並改寫為 content-addressed 網址。
+# 背景執行緒定期比對網路磁碟上的檔案大小與修改時間,有變更時重新鏡像 (網址隨內容改變)。
+
+# Windows 登錄檔中的 MIME 類型可能缺漏或錯誤,字型與 CSS 明確指定
+for extension, asset_mimetype in (('.css', 'text/css'), ('.svg', 'image/svg+xml'), ('.woff2', 'font/woff2'),
+                                  ('.woff', 'font/woff'), ('.ttf', 'font/ttf'), ('.otf', 'font/otf')):
+    mimetypes.add_type(asset_mimetype, extension)
+
+CSS_URL_PATTERN = re.compile(rb'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+class AssetMirror:
+    """網路資源的本機 content-addressed 鏡像
+
+    manifest 記錄每個資源路徑 (例如 'Font_Awesome/css/all.min.css') 對應的內容雜湊、
+    來源檔案的大小與修改時間,以及 CSS 引用的其他資源。
+    """
+
+    def __init__(self, roots, directory):
+        self.roots = roots
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self._manifest = self._load_manifest()
+        self._memory = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self.manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def source_path(self, relpath):
+        """資源在網路磁碟上的路徑,不在允許的根目錄下時回傳 None"""
+        root, _, sub_path = relpath.partition('/')
+        base_path = self.roots.get(root)
+        if base_path is None or not sub_path:
+            return None
+        return safe_join(base_path, sub_path)
+
+    def object_path(self, sha):
+        return os.path.join(self.directory, 'objects', sha[:2], sha)
+
+    def lookup(self, relpath):
+        """取得已鏡像資源的 manifest 項目,尚未鏡像時回傳 None"""
+        with self._lock:
+            return self._manifest.get(relpath)
+
+    def mirror(self, relpath):
+        """將資源複製到鏡像 (CSS 會連同引用的資源) 並回傳 manifest 項目,來源不存在時回傳 None"""
+        entry = self.lookup(relpath)
+        if entry is not None:
+            return entry
+
+        source = self.source_path(relpath)
+        if source is None or not os.path.isfile(source):
+            return None
+
+        stat = os.stat(source)
+        with open(source, 'rb') as f:
+            body = f.read()
+        refs = []
+        if relpath.endswith('.css'):
+            body, refs = self._rewrite_css(relpath, body)
+
+        sha = hashlib.sha256(body).hexdigest()
+        object_path = self.object_path(sha)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, object_path)
+
+        entry = {'sha': sha, 'size': stat.st_size, 'mtime': stat.st_mtime, 'refs': refs}
+        with self._lock:
+            self._manifest[relpath] = entry
+            self._save_manifest()
+        print(f"Mirrored asset {relpath} ({len(body):,} bytes)")
+        return entry
+
+    def _rewrite_css(self, relpath, body):
+        """將 CSS 中的相對 url() 改寫為 content-addressed 網址 (引用的資源同時鏡像)"""
+        css_dir = posixpath.dirname(relpath)
+        targets = {}
+        for match in CSS_URL_PATTERN.finditer(body):
+            url = match.group(2).decode('utf-8', 'replace').strip()
+            if re.match(r'^([a-z][a-z0-9+.-]*:|/|#)', url, re.IGNORECASE):
+                continue
+            path = re.split(r'[?#]', url, 1)[0]
+            targets[url] = posixpath.normpath(posixpath.join(css_dir, path))
+
+        with ThreadPoolExecutor(max_workers=ASSET_MIRROR_WORKERS) as executor:
+            entries = dict(zip(targets, executor.map(self.mirror, targets.values())))
+
+        def replace(match):
+            url = match.group(2).decode('utf-8', 'replace').strip()
+            entry = entries.get(url)
+            if entry is None:
+                return match.group(0)
+            fragment = url[url.index('#'):] if '#' in url else ''
+            return f"url({asset_object_url(entry['sha'], targets[url])}{fragment})".encode('utf-8')
+
+        refs = sorted({targets[url] for url, entry in entries.items() if entry is not None})
+        return CSS_URL_PATTERN.sub(replace, body), refs
+
+    def mirror_in_background(self, relpath, on_done=None):
+        """在背景執行緒鏡像資源 (同一路徑不重複排程),完成後呼叫 on_done"""
+        with self._lock:
+            if relpath in self._pending:
+                return
+            self._pending.add(relpath)
+
+        def run():
+            try:
+                if self.mirror(relpath) is not None and on_done is not None:
+                    on_done()
+            except Exception as e:
+                print(f"Error mirroring asset {relpath}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(relpath)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def read(self, sha):
+        """讀取鏡像內容 (已預先載入時由記憶體取得),不存在時回傳 None"""
+        body = self._memory.get(sha)
+        if body is not None:
+            return body
+        try:
+            with open(self.object_path(sha), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def preload(self):
+        """將 manifest 中所有資源的內容載入記憶體"""
+        with self._lock:
+            shas = {entry['sha'] for entry in self._manifest.values()}
+        loaded = 0
+        for sha in shas:
+            body = self.read(sha)
+            if body is not None:
+                self._memory[sha] = body
+                loaded += len(body)
+        print(f"Preloaded {len(shas)} mirrored assets ({loaded:,} bytes)")
+
+    def revalidate(self):
+        """比對網路磁碟上的來源檔案,重新鏡像已變更的資源與引用它們的 CSS
+
+        網路磁碟無法存取時保留現有鏡像。
+
+        Returns:
+            bool: 是否有資源變更
+        """
+        with self._lock:
+            entries = dict(self._manifest)
+
+        changed = set()
+        for relpath, entry in entries.items():
+            try:
+                stat = os.stat(self.source_path(relpath))
+            except (OSError, TypeError):
+                continue
+            if stat.st_size != entry['size'] or stat.st_mtime != entry['mtime']:
+                changed.add(relpath)
+        changed |= {relpath for relpath, entry in entries.items() if changed.intersection(entry['refs'])}
+        if not changed:
+            return False
+
+        with self._lock:
+            for relpath in changed:
+                self._manifest.pop(relpath, None)
+            self._save_manifest()
+        for relpath in sorted(changed, key=lambda path: not path.endswith('.css')):
+            self.mirror(relpath)
+
+        # 移除不再被引用的內容
+        with self._lock:
+            in_use = {entry['sha'] for entry in self._manifest.values()}
+        for sha in {entry['sha'] for entry in entries.values()} - in_use:
+            self._memory.pop(sha, None)
+            try:
+                os.remove(self.object_path(sha))
+            except OSError:
+                pass
+        print(f"Asset mirror revalidated: {len(changed)} changed")
+        return True
+
+asset_mirror = AssetMirror({
+    'Font_Awesome': NETWORK_ASSETS['font_awesome_base'],
+    'Google_Fonts': NETWORK_ASSETS['google_fonts_base'],
+}, ASSET_MIRROR_DIR)
+
+def asset_object_url(sha, relpath):
+    """content-addressed 資源網址 (保留原檔名,讓瀏覽器能由副檔名判斷格式)"""
+    return f"/assets/c/{sha}/{posixpath.basename(relpath)}"
+
+def get_asset_url(relpath):
+    """頁面引用資源的網址:已鏡像時使用 content-addressed 網址,否則使用原路徑並在背景鏡像"""
+    entry = asset_mirror.lookup(relpath)
+    if entry is not None:
+        return asset_object_url(entry['sha'], relpath)
+
+    asset_mirror.mirror_in_background(relpath, on_done=lambda: discard_static_payload('index'))
+    return f"/assets/{relpath}"
+
+def link_mirrored_assets(html):
+    """將頁面中 href="/assets/..." 的引用改為 get_asset_url 的網址"""
+    return re.sub(r'href="/assets/([^"]+)"', lambda match: f'href="{get_asset_url(match.group(1))}"', html)
+
+def asset_mirror_thread():
+    """背景執行緒:鏡像頁面使用的 CSS、選擇性預先載入,並定期重新比對網路磁碟"""
+    try:
+        for relpath in ASSET_STYLESHEETS:
+            if asset_mirror.lookup(relpath) is None and asset_mirror.mirror(relpath) is not None:
+                discard_static_payload('index')
+        if ASSET_MIRROR_PRELOAD:
+            asset_mirror.preload()
+    except Exception as e:
+        print(f"Error mirroring assets: {str(e)}")
+
+    while True:
+        try:
+            if asset_mirror.revalidate():
+                discard_static_payload('index')
+                if ASSET_MIRROR_PRELOAD:
+                    asset_mirror.preload()
+        except Exception as e:
+            print(f"Error revalidating asset mirror: {str(e)}")
+        time.sleep(ASSET_REVALIDATE_INTERVAL)
+
+# 解析結果快取
+def get_processor_version(module):
+    """處理模組的版本識別 (模組名稱、__version__ 與模組檔案的大小及修改時間)"""
+    version = [module.__name__, getattr(module, '__version__', None)]
+    module_file = getattr(module, '__file__', None)
+    if module_file and os.path.exists(module_file):
+        stat = os.stat(module_file)
+        version += [stat.st_size, stat.st_mtime_ns]
+    return version
+
+def get_file_fingerprint(file_path, hash_bytes=PARSE_CACHE_HASH_BYTES):
+    """檔案指紋：路徑、大小、修改時間,以及檔頭與檔尾內容的雜湊"""
+    stat = os.stat(file_path)
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(hash_bytes))
+        if stat.st_size > hash_bytes:
+            f.seek(max(hash_bytes, stat.st_size - hash_bytes))
+            digest.update(f.read(hash_bytes))
+    return [os.path.normcase(os.path.abspath(file_path)), stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+def encode_cache_meta(value):
+    """將快取 meta 轉為可 JSON 序列化的結構
+
+    dict、tuple、datetime 與 date 以 {'__標記__': 內容} 保留型別,numpy 純量轉為對應的 Python 值。
+
+    Raises:
+        TypeError: 含有無法還原的型別 (此時不寫入快取)
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    if type(value) is list:
+        return [encode_cache_meta(item) for item in value]
+    if type(value) is tuple:
+        return {'__tuple__': [encode_cache_meta(item) for item in value]}
+    if type(value) is dict:
+        return {'__dict__': [[encode_cache_meta(key), encode_cache_meta(item)] for key, item in value.items()]}
+    if type(value) is datetime:
+        return {'__datetime__': value.isoformat()}
+    if type(value) is date:
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"Unsupported type in parse cache meta: {type(value).__name__}")
+
+def decode_cache_meta(obj):
+    """json.loads 的 object_hook:還原 encode_cache_meta 標記的型別"""
+    (tag, content), = obj.items()
+    if tag == '__tuple__':
+        return tuple(content)
+    if tag == '__dict__':
+        return {key: item for key, item in content}
+    if tag == '__datetime__':
+        return datetime.fromisoformat(content)
+    if tag == '__date__':
+        return date.fromisoformat(content)
+    raise ValueError(f"Unknown parse cache meta tag: {tag}")
+
+class ParseCache:
+    """磁碟上的解析結果快取
+
+    每個項目為一個 .npz 檔:數值陣列直接以 numpy 格式儲存,其餘欄位以 JSON (見 encode_cache_meta) 存入 'meta',
+    讀取時不需要 pickle。
+    鍵值由機台類型、處理模組版本與檔案指紋組成,內容改變即自動失效。
+    讀取時更新檔案修改時間,總大小超過 max_bytes 時依修改時間刪除最久未使用的項目。
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def make_key(self, kind, machine_type, module, file_path, *extra):
+        """建立快取鍵值 (kind 區分 AutoZLog 與 ALL.txt,extra 為其他會影響解析結果的參數)"""
+        parts = [PARSE_CACHE_FORMAT, kind, machine_type, get_processor_version(module),
+                 get_file_fingerprint(file_path), [repr(value) for value in extra]]
+        return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key):
+        """讀取快取項目
+
+        Returns:
+            tuple: (meta, arrays),不存在或無法讀取時回傳 None
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files if name != 'meta'}
+                meta = json.loads(npz['meta'].tobytes().decode('utf-8'), object_hook=decode_cache_meta)
+            os.utime(path)
+            return meta, arrays
+        except Exception as e:
+            print(f"Parse cache entry {key} unreadable, ignoring: {e}")
+            return None
+
+    def store(self, key, meta, arrays):
+        """寫入快取項目 (先寫入暫存檔再替換,寫入失敗不影響分析)"""
+        try:
+            meta_bytes = np.frombuffer(json.dumps(encode_cache_meta(meta)).encode('utf-8'), dtype=np.uint8)
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, meta=meta_bytes, **arrays)
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            print(f"Failed to write parse cache entry: {e}")
+            return
+
+        self.evict()
+
+    def evict(self):
+        """刪除最久未使用的項目,直到總大小不超過上限"""
+        with self._lock:
+            try:
+                entries = []
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith('.npz'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                return
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+parse_cache = ParseCache(PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES)
 
 # Worker 函數
-def process_autoz_log_worker(file_path):
-    """處理 AutoZLog.txt 檔案"""
+def process_autoz_log_worker(file_path, module, machine_type):
+    """處理 AutoZLog.txt 檔案 (解析結果快取命中時直接使用快取的時間戳記)"""
     try:
-        timestamp = processor_module.process_autoz_log(file_path)
+        cache_key = parse_cache.make_key('autoz_log', machine_type, module, file_path)
+        cached = parse_cache.load(cache_key)
+        if cached is not None:
+            print("AutoZLog.txt loaded from parse cache")
+            return {'success': True, 'timestamp': cached[0]['timestamp'], 'error': None}
+
+        timestamp = module.process_autoz_log(file_path)
+        parse_cache.store(cache_key, {'timestamp': timestamp}, {})
         return {'success': True, 'timestamp': timestamp, 'error': None}
     except Exception as e:
         return {'success': False, 'timestamp': None, 'error': str(e)}
 
-def process_all_txt_worker(file_path, timestamp):
-    """處理 ALL.txt 檔案"""
+def process_all_txt_worker(module, file_path, timestamp, job=None):
+    """處理 ALL.txt 檔案 (由分析工作在背景執行緒中呼叫,job 用於回報進度與取消)"""
     try:
-        result = processor_module.process_all_txt(file_path, timestamp)
+        result = parse_all_txt(module, file_path, timestamp, job)
         return {'success': True, 'result': result, 'error': None}
     except Exception as e:
         return {'success': False, 'result': None, 'error': str(e)}
 
+# ALL.txt 紀錄邊界
+#
+# 平行解析與 follow 模式需要在「紀錄」的起始行切開 ALL.txt:每段加上檔頭後可由處理模組獨立解析,
+# 依檔案順序合併後與整檔解析的結果相同。各機台的處理模組不在此專案中,格式也各不相同,
+# 因此紀錄起始行的樣式由處理模組自己的解析結果推得:以 process_all_txt 解析檔案開頭的樣本,
+# 找出各晶圓 ID 第一次出現的行,以這些行共同的文字作為候選樣式;再將樣本在候選樣式處切段分別解析,
+# 合併後與整段解析的結果完全相同才採用。樣式依處理模組版本快取並保存於解析結果快取目錄,
+# 之後的每個檔案先以其開頭的小樣本確認樣式適用;無法推得或不適用時該檔案維持單一行程整檔解析。
+# 分段解析的頂層欄位 (例如各軸標準值) 在各段間不一致時,同樣改為整檔解析 (見 RecordBoundaryMismatch)。
+
+record_starts = {}
+record_starts_lock = threading.Lock()
+
+class RecordBoundaryMismatch(ValueError):
+    """在紀錄邊界切段解析的結果不一致 (此檔案的格式與推得的紀錄邊界不符)"""
+
+def field_values_equal(first, second):
+    """比對兩個欄位值 (純量、列表或陣列) 是否相同,NaN 視為相同"""
+    try:
+        return bool(np.array_equal(first, second, equal_nan=True))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return bool(np.all(first == second))
+    except (TypeError, ValueError):
+        return False
+
+def all_txt_results_equal(first, second):
+    """比對兩份 process_all_txt 的結果是否相同 (各軸數值可為列表或陣列,晶圓順序也必須相同)"""
+    if first.keys() != second.keys():
+        return False
+    for key in first:
+        if key != 'wafer_data' and not field_values_equal(first[key], second[key]):
+            return False
+
+    first_wafers = first['wafer_data']
+    second_wafers = second['wafer_data']
+    if list(first_wafers) != list(second_wafers):
+        return False
+    for wafer_id, data in first_wafers.items():
+        other = second_wafers[wafer_id]
+        if data.keys() != other.keys():
+            return False
+        for key, value in data.items():
+            if key.endswith('_values'):
+                equal = np.array_equal(
+                    np.asarray(value if value is not None else (), dtype=np.float64),
+                    np.asarray(other[key] if other[key] is not None else (), dtype=np.float64),
+                    equal_nan=True
+                )
+            else:
+                equal = field_values_equal(value, other[key])
+            if not equal:
+                return False
+    return True
+
+def record_start_candidates(sample, wafer_ids, encoding):
+    """由各晶圓 ID 在樣本中第一次出現的行推得紀錄起始行的候選樣式 (bytes 正規表示式)
+
+    候選依序為:同一行中緊接在晶圓 ID 之前的共同文字 (例如 "Wafer ID: ")、這些行共同的開頭文字,
+    兩者皆沒有時為「每一行」(每行皆可獨立解析的格式)。晶圓 ID 不在樣本中時沒有候選。
+    """
+    prefixes = []
+    for wafer_id in wafer_ids:
+        # 樣式以晶圓 ID 開頭才能使用字串搜尋加速,前一個字元另外檢查 (大樣本中以 lookbehind 開頭的樣式需逐位元組比對)
+        token = re.compile(re.escape(str(wafer_id).encode(encoding)) + rb'(?![\w-])')
+        match = next((match for match in token.finditer(sample)
+                      if not re.match(rb'[\w-]', sample[match.start() - 1:match.start()])), None)
+        if match is None:
+            return []
+        line_start = sample.rfind(b'\n', 0, match.start()) + 1
+        prefixes.append(sample[line_start:match.start()])
+
+    candidates = []
+    label = os.path.commonprefix([prefix[::-1] for prefix in prefixes])[::-1]
+    if re.search(rb'[A-Za-z]', label):
+        candidates.append(rb'^[^\r\n]*?' + re.escape(label))
+    leading = os.path.commonprefix(prefixes)
+    if leading.strip() and leading != label:
+        candidates.append(rb'^' + re.escape(leading))
+    if not candidates:
+        candidates.append(rb'^')
+    return candidates
+
+def verify_record_start(module, sample_path, timestamp, record_start, expected, chunk_count=RECORD_START_VERIFY_CHUNKS):
+    """將樣本在紀錄邊界切段分別解析,合併後是否與整段解析的結果 expected 相同"""
+    header_end, ranges = find_record_boundaries(sample_path, record_start, chunk_count)
+    if len(ranges) < 2:
+        return False
+
+    results = [
+        parse_all_txt_chunk(module.__name__, sample_path, timestamp, header_end, start, end)
+        for start, end in ranges
+    ]
+    try:
+        return all_txt_results_equal(merge_all_txt_results(results), expected)
+    except RecordBoundaryMismatch:
+        return False
+
+def write_all_txt_sample(file_path, size, end):
+    """將 ALL.txt 開頭的樣本 (前 size 位元組中完整的行,不超過 end) 寫入暫存檔
+
+    Returns:
+        tuple: (sample_path, sample) 暫存檔路徑 (由呼叫端刪除) 與樣本內容
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(min(end, size))
+    if len(sample) < end:
+        sample = sample[:sample.rfind(b'\n') + 1]
+
+    fd, sample_path = tempfile.mkstemp(prefix='autoz_sample_', suffix='.txt')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(sample)
+    return sample_path, sample
+
+def learn_record_start(module, file_path, timestamp, end=None):
+    """由 ALL.txt 開頭的樣本 (前 RECORD_START_SAMPLE_SIZE 位元組中完整的行) 推得並驗證紀錄起始行的樣式
+
+    Returns:
+        tuple: (record_start, conclusive) 樣式 (無法推得時為 None),以及結果是否可套用到同版本處理模組的其他檔案
+            (樣本中的晶圓不足兩片或解析失敗時為 False)
+    """
+    end = os.path.getsize(file_path) if end is None else end
+    sample_path, sample = write_all_txt_sample(file_path, RECORD_START_SAMPLE_SIZE, end)
+    try:
+        expected = module.process_all_txt(sample_path, timestamp)
+        wafer_ids = list(expected['wafer_data'])
+        if len(wafer_ids) < 2:
+            return None, False
+
+        for candidate in record_start_candidates(sample, wafer_ids, locale.getpreferredencoding(False)):
+            if verify_record_start(module, sample_path, timestamp, candidate, expected):
+                print(f"ALL.txt record boundary of {module.__name__}: {candidate!r}")
+                return candidate, True
+
+        print(f"No verified ALL.txt record boundary for {module.__name__}, parsing in a single process")
+        return None, True
+    except Exception as e:
+        print(f"Failed to determine ALL.txt record boundaries: {str(e)}")
+        return None, False
+    finally:
+        os.remove(sample_path)
+
+def check_record_start(module, file_path, timestamp, record_start, end=None):
+    """確認先前推得的紀錄邊界適用於此檔案
+
+    檔案開頭 RECORD_START_CHECK_SIZE 的樣本在紀錄邊界切成兩段分別解析,合併後須與整段解析相同
+    (檔頭與紀錄邊界皆符合)。樣本中不足兩筆紀錄時,只有樣本即為整個檔案 (不會切段) 才視為適用。
+    """
+    end = os.path.getsize(file_path) if end is None else end
+    sample_path, sample = write_all_txt_sample(file_path, RECORD_START_CHECK_SIZE, end)
+    try:
+        _, ranges = find_record_boundaries(sample_path, record_start, 2)
+        if len(ranges) < 2:
+            return len(sample) == end
+        expected = module.process_all_txt(sample_path, timestamp)
+        return verify_record_start(module, sample_path, timestamp, record_start, expected, 2)
+    except Exception as e:
+        print(f"Failed to check ALL.txt record boundaries: {str(e)}")
+        return False
+    finally:
+        os.remove(sample_path)
+
+def read_record_start_cache():
+    """讀取保存的紀錄起始行樣式 {處理模組版本: 樣式 (無法推得時為 None)},無法讀取時回傳空字典"""
+    try:
+        with open(RECORD_START_CACHE_PATH, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        # 樣式為任意 bytes,以 latin-1 一對一轉為字串儲存
+        return {key: None if value is None else value.encode('latin-1') for key, value in saved.items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def write_record_start_cache(key, record_start):
+    """保存推得的紀錄起始行樣式 (先寫入暫存檔再替換,寫入失敗不影響分析)"""
+    try:
+        saved = read_record_start_cache()
+        saved[key] = record_start
+        directory = os.path.dirname(RECORD_START_CACHE_PATH)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({name: None if value is None else value.decode('latin-1') for name, value in saved.items()}, f)
+        os.replace(temp_path, RECORD_START_CACHE_PATH)
+    except Exception as e:
+        print(f"Failed to save ALL.txt record boundary: {e}")
+
+def load_record_start(module):
+    """取得處理模組已推得的紀錄起始行樣式 (記憶體中沒有時讀取保存的結果)
+
+    Returns:
+        tuple: (key, known, record_start) 處理模組版本的快取鍵、是否已推得,以及樣式 (無法推得時為 None)
+    """
+    key = json.dumps(get_processor_version(module), default=str)
+    with record_starts_lock:
+        if key not in record_starts:
+            saved = read_record_start_cache()
+            if key in saved:
+                record_starts[key] = saved[key]
+        return key, key in record_starts, record_starts.get(key)
+
+def remember_record_start(key, record_start):
+    """快取並保存推得的紀錄起始行樣式"""
+    with record_starts_lock:
+        record_starts[key] = record_start
+    write_record_start_cache(key, record_start)
+
+def get_record_start(module, file_path, timestamp, end=None):
+    """取得處理模組 ALL.txt 紀錄起始行的樣式 (bytes 正規表示式),無法取得或不適用於此檔案時回傳 None
+
+    第一次使用時以 file_path 的開頭推得並驗證 (見 learn_record_start),結果依處理模組版本快取並保存於
+    RECORD_START_CACHE_PATH,之後啟動不需再推得。使用先前推得的樣式時,先以 check_record_start 確認適用於此檔案。
+    """
+    key, known, record_start = load_record_start(module)
+    if known:
+        if record_start is not None and not check_record_start(module, file_path, timestamp, record_start, end):
+            print(f"ALL.txt record boundary of {module.__name__} does not fit {file_path}, parsing it in a single process")
+            return None
+        return record_start
+
+    record_start, conclusive = learn_record_start(module, file_path, timestamp, end)
+    if conclusive:
+        remember_record_start(key, record_start)
+    return record_start
+
+# ALL.txt 平行解析
+#
+# 推得紀錄邊界的大型 ALL.txt 會在紀錄邊界切段,各段加上檔頭後交由 ProcessPoolExecutor
+# 以原本的 process_all_txt 平行解析,再依檔案順序合併。
+
+def find_record_boundaries(file_path, record_start, chunk_count, end=None):
+    """在紀錄邊界上將檔案 (前 end 位元組,預設為整個檔案) 切成約 chunk_count 段
+
+    Returns:
+        tuple: (header_end, ranges) 檔頭結束位置與各段的 (start, end) 位元組範圍
+    """
+    pattern = re.compile(record_start, re.MULTILINE)
+    file_size = os.path.getsize(file_path) if end is None else end
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        first = pattern.search(mapped, 0, file_size)
+        if first is None or first.start() >= file_size:
+            return file_size, []
+
+        header_end = first.start()
+        body_size = file_size - header_end
+        boundaries = [header_end]
+        for k in range(1, chunk_count):
+            target = header_end + body_size * k // chunk_count
+            if target <= boundaries[-1]:
+                continue
+            match = pattern.search(mapped, target, file_size)
+            if match is None or match.start() >= file_size:
+                break
+            if match.start() > boundaries[-1]:
+                boundaries.append(match.start())
+        boundaries.append(file_size)
+
+    return header_end, list(zip(boundaries[:-1], boundaries[1:]))
+
+def parse_all_txt_chunk(module_name, file_path, timestamp, header_end, start, end):
+    """子行程：解析檔頭與一段紀錄
+
+    寫入暫存檔後以原本的 process_all_txt 解析,各軸數值轉為 float64 陣列 (見 compact_wafer_data)。
+    """
+    module = import_processor_module(module_name)
+    fd, chunk_path = tempfile.mkstemp(prefix='autoz_chunk_', suffix='.txt')
+
+    try:
+        with os.fdopen(fd, 'wb') as out, open(file_path, 'rb') as src:
+            out.write(src.read(header_end))
+            src.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                block = src.read(min(PARALLEL_PARSE_COPY_BLOCK, remaining))
+                if not block:
+                    break
+                out.write(block)
+                remaining -= len(block)
+
+        return compact_wafer_data(module.process_all_txt(chunk_path, timestamp))
+    finally:
+        os.remove(chunk_path)
+
+def compact_wafer_data(result):
+    """將解析結果中各晶圓的 *_values 列表轉為 float64 陣列 (就地修改並回傳 result)
+
+    每個 Python float 加上列表指標約佔 32 bytes,陣列只需 8 bytes;分段解析時已完成的分段先行壓縮。
+    """
+    for data in result['wafer_data'].values():
+        for key, value in data.items():
+            if key.endswith('_values') and value is not None:
+                data[key] = np.asarray(value, dtype=np.float64)
+    return result
+
+def merge_all_txt_results(results):
+    """依檔案順序合併各段的解析結果,輸出與單一行程解析相同的結構
+
+    同一晶圓跨段時,各軸數值依序串接 (結果為 float64 陣列),其餘欄位 (例如 start_time) 以最先出現的值為準;
+    頂層欄位 (例如各軸標準值) 取第一個非 None 的值。
+
+    Raises:
+        RecordBoundaryMismatch: 各段的頂層欄位不一致 (每段都含檔頭,正確切段時應相同)
+    """
+    merged = {}
+    wafer_data = {}
+
+    for result in results:
+        for key, value in result.items():
+            if key == 'wafer_data' or value is None:
+                continue
+            if merged.get(key) is None:
+                merged[key] = value
+            elif not field_values_equal(merged[key], value):
+                raise RecordBoundaryMismatch(f"ALL.txt chunks disagree on '{key}', record boundaries do not fit this file")
+
+        for wafer_id, data in result['wafer_data'].items():
+            target = wafer_data.setdefault(wafer_id, {})
+            for key, value in data.items():
+                if key.endswith('_values'):
+                    target.setdefault(key, []).append(value)
+                elif target.get(key) is None:
+                    target[key] = value
+
+    for data in wafer_data.values():
+        for key, pieces in data.items():
+            if key.endswith('_values'):
+                pieces = [np.asarray(piece, dtype=np.float64) for piece in pieces if piece is not None]
+                if not pieces:
+                    data[key] = None
+                else:
+                    # 大部分晶圓只在一個分段中,直接沿用該段的陣列不再複製
+                    data[key] = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    merged['wafer_data'] = wafer_data
+    return merged
+
+def parse_all_txt_parallel(module, file_path, timestamp, record_start, workers=None, job=None, end=None):
+    """在紀錄邊界 (record_start) 切段並以 ProcessPoolExecutor 平行解析 ALL.txt (前 end 位元組,預設為整個檔案)
+
+    每完成一段即回報進度給 job;job 被取消時放棄尚未開始的分段。
+    """
+    workers = workers or PARALLEL_PARSE_WORKERS
+    header_end, ranges = find_record_boundaries(file_path, record_start, workers, end)
+
+    if len(ranges) <= 1:
+        return parse_all_txt_serial(module, file_path, timestamp, job, end, record_start)
+
+    print(f"Parsing ALL.txt in {len(ranges)} chunks with {workers} workers")
+    results = [None] * len(ranges)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(parse_all_txt_chunk, module.__name__, file_path, timestamp, header_end, start, end): index
+            for index, (start, end) in enumerate(ranges)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if job is not None:
+                start, end = ranges[index]
+                job.report_progress(end - start, results[index]['wafer_data'].keys())
+                job.check_cancelled()
+    finally:
+        executor.shutdown(wait=job is None, cancel_futures=True)
+
+    return merge_all_txt_results(results)
+
+def parse_all_txt_serial(module, file_path, timestamp, job=None, end=None, record_start=None):
+    """以單一行程解析 ALL.txt (前 end 位元組,預設為整個檔案;檔案持續寫入時結果仍固定)
+
+    推得紀錄邊界 record_start 時在紀錄邊界上切成約 SERIAL_PARSE_CHUNK_SIZE 的分段依序解析,
+    每段之間回報進度並檢查取消;處理模組一次只讀入一段,但保留的數值仍隨點數成長。
+    否則以 process_all_txt 一次解析整個檔案,中途無法取消 (見 AnalysisJob.disable_cancel)。
+    """
+    if job is not None:
+        job.check_cancelled()
+
+    if record_start is not None:
+        # 各段複製到暫存檔後以原本的 process_all_txt 解析,只讀到 end 為止
+        if end is None:
+            end = os.path.getsize(file_path)
+        chunk_count = max(1, -(-end // SERIAL_PARSE_CHUNK_SIZE))
+        header_end, ranges = find_record_boundaries(file_path, record_start, chunk_count, end)
+
+        results = []
+        for start, stop in ranges or [(header_end, end)]:
+            results.append(parse_all_txt_chunk(module.__name__, file_path, timestamp, header_end, start, stop))
+            if job is not None:
+                job.report_progress(stop - start, results[-1]['wafer_data'].keys())
+                job.check_cancelled()
+        result = results[0] if len(results) == 1 else merge_all_txt_results(results)
+    else:
+        if job is not None:
+            job.disable_cancel()
+        result = module.process_all_txt(file_path, timestamp)
+
+    if job is not None:
+        job.check_cancelled()
+        job.report_progress(job.total_bytes, result['wafer_data'].keys())
+    return result
+
+def parse_all_txt(module, file_path, timestamp, job=None):
+    """解析 ALL.txt：推得紀錄邊界時大檔平行解析,否則使用原本的單一行程解析
+
+    推得紀錄邊界時只解析開始時的檔案大小範圍,並記錄於 job.parsed_end 供 follow 模式接續。
+    分段解析的結果不一致時 (RecordBoundaryMismatch) 改為整檔解析。
+    """
+    end = os.path.getsize(file_path)
+    record_start = get_record_start(module, file_path, timestamp, end)
+    if record_start is None:
+        return parse_all_txt_serial(module, file_path, timestamp, job)
+
+    try:
+        if PARALLEL_PARSE_WORKERS > 1 and end >= PARALLEL_PARSE_MIN_SIZE:
+            result = parse_all_txt_parallel(module, file_path, timestamp, record_start, job=job, end=end)
+        else:
+            result = parse_all_txt_serial(module, file_path, timestamp, job, end, record_start)
+    except RecordBoundaryMismatch as e:
+        print(f"{e}, parsing it in a single process")
+        return parse_all_txt_serial(module, file_path, timestamp, job)
+
+    if job is not None:
+        job.parsed_end = end
+    return result
+
+def build_analysis_data(result):
+    """將 process_all_txt 的結果轉換為分析資料 (wafer_data 轉為 WaferDataset)"""
+    analysis_data = {key: value for key, value in result.items() if key != 'wafer_data'}
+    analysis_data['dataset'] = WaferDataset.from_wafer_data(result['wafer_data'])
+    analysis_data['version'] = next(dataset_versions)
+    return analysis_data
+
+def load_cached_analysis(cache_key):
+    """由解析結果快取重建分析資料
+
+    Returns:
+        tuple: (analysis_data, parsed_end),未命中時回傳 None
+    """
+    cached = parse_cache.load(cache_key)
+    if cached is None:
+        return None
+
+    meta, arrays = cached
+    dataset = WaferDataset(
+        meta['wafer_ids'],
+        meta['start_times'],
+        {axis: arrays[f"{axis}_values"] for axis in WaferDataset.AXES},
+        {axis: arrays[f"{axis}_offsets"] for axis in WaferDataset.AXES}
+    )
+    analysis_data = dict(meta['fields'])
+    analysis_data['dataset'] = dataset
+    analysis_data['version'] = next(dataset_versions)
+    return analysis_data, meta.get('parsed_end')
+
+def store_cached_analysis(cache_key, analysis_data, parsed_end=None):
+    """將分析資料 (欄式晶圓資料與其餘欄位) 及已解析的檔案位置寫入解析結果快取"""
+    dataset = analysis_data['dataset']
+    meta = {
+        'fields': {key: value for key, value in analysis_data.items() if key not in ('dataset', 'version')},
+        'wafer_ids': dataset.wafer_ids,
+        'start_times': dataset.start_times,
+        'parsed_end': parsed_end,
+    }
+    arrays = {}
+    for axis in WaferDataset.AXES:
+        arrays[f"{axis}_values"] = dataset.values[axis]
+        arrays[f"{axis}_offsets"] = dataset.offsets[axis]
+    parse_cache.store(cache_key, meta, arrays)
+
+# 分析工作
+class AnalysisCancelled(Exception):
+    """分析工作已被取消"""
+
+class AnalysisJob:
+    """在背景執行緒中執行 ALL.txt 分析,提供進度、預估剩餘時間與取消功能
+
+    工作本體為 process_all_txt_worker,完成後設定為所屬工作階段的分析資料。
+    處理模組、機台類型與時間戳記在建立工作時由工作階段取得,之後切換機台不影響執行中的工作。
+    解析結果快取命中時直接由快取重建分析資料,未命中時解析後寫入快取。
+    取消後的解析結果直接丟棄,不會覆蓋目前的分析資料。
+    同一工作階段先前的工作結束 (done) 後才開始解析,取消後仍在解析中的工作不會與新的工作同時執行。
+    """
+
+    def __init__(self, session, file_path, content_encoding='identity'):
+        self.job_id = uuid.uuid4().hex
+        self.session = session
+        self.content_encoding = content_encoding    # 完成後預先壓縮圖表使用的壓縮方式 (見 warm_chart_cache)
+        self.module = session.processor_module
+        self.machine_type = session.machine_type
+        self.file_path = file_path
+        self.timestamp = session.autoz_log_timestamp
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_processed = 0
+        self.parsed_end = None
+        self.wafers_found = 0
+        self.status = 'queued'
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.from_cache = False
+        self.cancellable = True
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.previous_jobs = []
+        self._wafer_ids = set()
+        self._lock = threading.Lock()
+
+    def report_progress(self, byte_count, wafer_ids):
+        """累加已處理的位元組數與找到的晶圓"""
+        with self._lock:
+            self.bytes_processed = min(self.total_bytes, self.bytes_processed + byte_count)
+            self._wafer_ids.update(wafer_ids)
+            self.wafers_found = len(self._wafer_ids)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled('Analysis cancelled')
+
+    def disable_cancel(self):
+        """之後的解析無法中途中止 (整檔解析),取消要求改為在解析完成後丟棄結果"""
+        with self._lock:
+            self.cancellable = False
+
+    def cancel(self):
+        """要求取消工作,已結束的工作不受影響
+
+        Returns:
+            bool: 是否已中止;整檔解析中回傳 False,工作維持執行中直到解析完成後丟棄結果
+        """
+        with self._lock:
+            if self.status in ANALYSIS_JOB_FINAL_STATES:
+                return False
+            self.cancel_event.set()
+            if not self.cancellable and self.status == 'running':
+                return False
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+            self._wafer_ids = set()
+        print(f"Analysis job {self.job_id} cancelled")
+        return True
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            self.done.set()
+
+    def _run(self):
+        # 等待同一工作階段先前的工作 (可能已取消但仍在解析目前的分段) 結束
+        for previous in self.previous_jobs:
+            while not previous.done.wait(0.2):
+                if self.cancel_event.is_set():
+                    return
+        self.previous_jobs = []
+
+        with self._lock:
+            if self.status != 'queued':
+                return
+            self.status = 'running'
+            self.started_at = time.time()
+
+        cache_key = None
+        analysis_data = None
+        try:
+            cache_key = parse_cache.make_key('all_txt', self.machine_type, self.module, self.file_path, self.timestamp)
+            cached = load_cached_analysis(cache_key)
+            if cached is not None:
+                analysis_data, self.parsed_end = cached
+        except Exception as e:
+            print(f"Parse cache unavailable: {e}")
+
+        if analysis_data is not None:
+            self.from_cache = True
+            result = {'success': True, 'result': None, 'error': None}
+        else:
+            result = process_all_txt_worker(self.module, self.file_path, self.timestamp, self)
+
+        with self._lock:
+            if self.cancel_event.is_set():
+                if self.status not in ANALYSIS_JOB_FINAL_STATES:
+                    self.status = 'cancelled'
+                    self.finished_at = time.time()
+                    self._wafer_ids = set()
+                    print(f"Analysis job {self.job_id} cancelled")
+                return
+
+            if result['success']:
+                try:
+                    if analysis_data is None:
+                        analysis_data = build_analysis_data(result['result'])
+                    self.session.set_analysis_data(analysis_data, {
+                        'module': self.module,
+                        'file_path': self.file_path,
+                        'timestamp': self.timestamp,
+                        'parsed_end': self.parsed_end
+                    })
+                    self.bytes_processed = self.total_bytes
+                    self.wafers_found = analysis_data['dataset'].n_wafers
+                    self.status = 'completed'
+                    if self.from_cache:
+                        print(f"ALL.txt loaded from parse cache in {time.time() - self.started_at:.2f}s")
+                    else:
+                        print("ALL.txt processed successfully")
+                except Exception as e:
+                    self.status = 'failed'
+                    self.error = str(e)
+            else:
+                self.status = 'failed'
+                self.error = result['error']
+                print(f"Error processing ALL.txt: {result['error']}")
+
+            self.finished_at = time.time()
+            self._wafer_ids = set()
+
+        if self.status == 'completed':
+            warm_chart_cache(self.session, analysis_data, self.content_encoding)
+            session_store.evict(keep=self.session)
+            if not self.from_cache and cache_key is not None:
+                store_cached_analysis(cache_key, analysis_data, self.parsed_end)
+
+    def to_dict(self):
+        """工作狀態 (供狀態 API 回傳)"""
+        with self._lock:
+            now = self.finished_at or time.time()
+            elapsed = now - self.started_at if self.started_at else 0
+            eta = None
+            if self.status == 'running' and 0 < self.bytes_processed < self.total_bytes:
+                eta = elapsed * (self.total_bytes - self.bytes_processed) / self.bytes_processed
+
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'bytes_processed': self.bytes_processed,
+                'total_bytes': self.total_bytes,
+                'wafers_found': self.wafers_found,
+                'from_cache': self.from_cache,
+                'cancellable': self.cancellable,
+                'cancel_requested': self.cancel_event.is_set(),
+                'elapsed': elapsed,
+                'eta': eta,
+                'error': self.error,
+                'redirect_url': f'/result?sid={self.session.session_id}' if self.status == 'completed' else None
+            }
+
+analysis_jobs = OrderedDict()
+analysis_jobs_lock = threading.Lock()
+
+def submit_analysis_job(session, file_path, content_encoding='identity'):
+    """建立並啟動分析工作 (每個工作階段同時間只執行一個分析,新的工作會取消該工作階段仍在執行的工作並停止 follow 模式)
+
+    被取消的工作結束前新的工作維持 queued,不會同時解析兩個檔案。
+    """
+    job = AnalysisJob(session, file_path, content_encoding)
+    session.stop_follow()
+
+    with analysis_jobs_lock:
+        for other in analysis_jobs.values():
+            if other.session is session:
+                other.cancel()
+                if not other.done.is_set():
+                    job.previous_jobs.append(other)
+        analysis_jobs[job.job_id] = job
+        while len(analysis_jobs) > ANALYSIS_JOB_HISTORY:
+            analysis_jobs.popitem(last=False)
+
+    threading.Thread(target=job.run, daemon=True).start()
+    return job
+
+def get_analysis_job(job_id):
+    with analysis_jobs_lock:
+        return analysis_jobs.get(job_id)
+
+def cancel_analysis_jobs(session=None):
+    """取消仍在執行的分析工作 (指定 session 時只取消該工作階段的工作)"""
+    with analysis_jobs_lock:
+        jobs = [job for job in analysis_jobs.values() if session is None or job.session is session]
+    for job in jobs:
+        job.cancel()
+
+# 即時追蹤 (follow 模式)
+#
+# 批次仍在量測時 ALL.txt 會持續增長。follow 模式由分析時記錄的已解析位置 (parsed_end) 接續,
+# 每次輪詢只解析最後一筆紀錄 (可能仍在寫入) 與之後新增的紀錄並併入資料集,
+# 結果頁面再以 Plotly.extendTraces 加上新增的點位。需要能推得 ALL.txt 的紀錄邊界 (見 get_record_start)。
+
+def find_last_record_start(file_path, record_start, start, end):
+    """尋找 [start, end) 範圍內最後一筆紀錄的起始位置 (由檔尾往前擴大搜尋範圍),找不到時回傳 None"""
+    pattern = re.compile(record_start, re.MULTILINE)
+    window = 64 * 1024
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        while True:
+            window_start = max(start, end - window)
+            last = None
+            for last in pattern.finditer(mapped, window_start, end):
+                pass
+            if last is not None:
+                return last.start()
+            if window_start == start:
+                return None
+            window *= 4
+
+class FollowState:
+    """follow 模式的解析狀態
+
+    offset 為已解析到的檔案位置;tail_start 為最後一筆紀錄的起始位置。該紀錄可能仍在寫入,
+    每次輪詢都與新增內容一起重新解析,並以 tail_counts 記錄其點數,併入前先自資料集移除。
+    """
+
+    def __init__(self, module, file_path, timestamp, parsed_end):
+        if parsed_end is None:
+            raise ValueError('Analysed part of ALL.txt is unknown, please re-run the analysis')
+        record_start = get_record_start(module, file_path, timestamp, parsed_end)
+        if record_start is None:
+            raise ValueError('Record boundaries of this ALL.txt format could not be determined')
+
+        self.module = module
+        self.file_path = file_path
+        self.timestamp = timestamp
+        self.record_start = record_start
+        self.header_end, _ = find_record_boundaries(file_path, record_start, 1, parsed_end)
+        self.tail_start = find_last_record_start(file_path, record_start, self.header_end, parsed_end)
+        if self.tail_start is None:
+            raise ValueError('No records found in ALL.txt')
+
+        self.offset = parsed_end
+        self.tail_counts = self._count_points(self._parse(self.tail_start, parsed_end))
+        self.previous_data = None
+
+    def _parse(self, start, end):
+        return parse_all_txt_chunk(self.module.__name__, self.file_path, self.timestamp, self.header_end, start, end)
+
+    @staticmethod
+    def _count_points(result):
+        return {
+            wafer_id: {axis: len(axis_values(data, f"{axis}_values")) for axis in WaferDataset.AXES}
+            for wafer_id, data in result['wafer_data'].items()
+        }
+
+    def poll(self, analysis_data):
+        """解析上次位置之後新增的內容
+
+        Returns:
+            dict: 併入新資料後的分析資料 (新的版本號),檔案沒有增長時回傳 None
+        """
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            raise ValueError('ALL.txt is smaller than the analysed part, please re-run the analysis')
+        if size == self.offset:
+            return None
+
+        # 只解析到最後一個完整的行,寫到一半的行留待下次輪詢
+        with open(self.file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = mapped.rfind(b'\n', self.offset, size) + 1
+        if end <= self.offset:
+            return None
+
+        new_tail = find_last_record_start(self.file_path, self.record_start, self.tail_start, end)
+        results = []
+        if new_tail > self.tail_start:
+            results.append(self._parse(self.tail_start, new_tail))
+        tail = self._parse(new_tail, end)
+        results.append(tail)
+
+        merged = merge_all_txt_results(results)
+        updated = dict(analysis_data)
+        updated['dataset'] = analysis_data['dataset'].with_increment(merged['wafer_data'], self.tail_counts)
+        updated['version'] = next(dataset_versions)
+
+        print(f"Follow: parsed {end - self.tail_start:,} bytes of ALL.txt from offset {self.tail_start:,}")
+        self.tail_start = new_tail
+        self.offset = end
+        self.tail_counts = self._count_points(tail)
+        return updated
+
+# 分析工作階段
+#
+# 每個瀏覽器分頁各自產生工作階段 ID (存於 sessionStorage,以 X-Session-Id 標頭或 sid 查詢參數傳遞),
+# 機台選擇、AutoZLog 時間戳記、分析資料與 follow 狀態都存放在工作階段中,
+# 多個批次可在同一個行程中並排分析而互不干擾。不使用 cookie,因為同一瀏覽器的分頁共用 cookie。
+
+class AnalysisSession:
+    """單一分頁的分析狀態"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.machine_type = None
+        self.processor_module = None
+        self.autoz_log_timestamp = None
+        self.analysis_data = None
+        self.analysis_source = None     # 分析資料的來源檔案與已解析位置 (follow 模式使用)
+        self.follow_state = None
+        self.follow_lock = threading.Lock()
+        self.closed = False
+        self.chart_cache = ChartResponseCache(CHART_CACHE_MAX_ENTRIES)
+        self.wafer_stats_cache = ChartResponseCache(
+            WAFER_STATS_CACHE_MAX_ENTRIES, lambda table: sum(column.nbytes for column in table.values())
+        )
+
+    @property
+    def nbytes(self):
+        """分析資料與圖表快取佔用的記憶體大小 (bytes),follow 模式保留的前一版本資料也一併計入"""
+        follow = self.follow_state
+        datasets = {
+            id(data['dataset']): data['dataset']
+            for data in (self.analysis_data, follow.previous_data if follow is not None else None)
+            if data is not None
+        }
+        return (sum(dataset.nbytes for dataset in datasets.values())
+                + self.chart_cache.nbytes + self.wafer_stats_cache.nbytes)
+
+    def set_analysis_data(self, data, source=None):
+        """替換分析資料 (source 為新的來源資訊),並移除舊版本的圖表快取
+
+        呼叫端持有其他鎖時不在此檢查記憶體上限,設定完成後應另外呼叫 session_store.evict。
+        """
+        previous = self.analysis_data
+        self.analysis_data = data
+        if source is not None or data is None:
+            self.analysis_source = source
+        if previous is not None:
+            self.chart_cache.discard_version(previous['version'])
+            self.wafer_stats_cache.discard_version(previous['version'])
+
+    def reset(self):
+        """取消執行中的分析工作、停止 follow 模式並清除機台選擇與分析資料"""
+        cancel_analysis_jobs(self)
+        self.stop_follow()
+        self.machine_type = None
+        self.processor_module = None
+        self.autoz_log_timestamp = None
+        self.set_analysis_data(None)
+
+    def follow_unavailable_reason(self):
+        """follow 模式無法使用的原因 (結果頁面據此停用按鈕),可以使用時回傳 None"""
+        source = self.analysis_source
+        if self.analysis_data is None or source is None:
+            return 'No analysis data available'
+        if source['parsed_end'] is None:
+            # 分析時無法推得紀錄邊界,整檔解析沒有可接續的位置
+            return 'Follow mode is unavailable: record boundaries of this ALL.txt format could not be determined'
+        return None
+
+    def start_follow(self):
+        """以目前分析資料的來源檔案啟動 follow 模式"""
+        with self.follow_lock:
+            if self.analysis_data is None or self.analysis_source is None:
+                raise ValueError('No analysis data available')
+            self.follow_state = FollowState(**self.analysis_source)
+            return self.follow_state
+
+    def stop_follow(self):
+        with self.follow_lock:
+            self.follow_state = None
+
+    def poll_follow(self):
+        """解析 ALL.txt 新增的內容並更新分析資料
+
+        Returns:
+            tuple: (FollowState, 前一版本的分析資料, 目前的分析資料);未啟動 follow 模式時回傳 None
+        """
+        with self.follow_lock:
+            follow = self.follow_state
+            if follow is None:
+                return None
+
+            current = self.analysis_data
+            updated = follow.poll(current)
+            if updated is not None:
+                follow.previous_data = current
+                self.set_analysis_data(updated)
+                current = updated
+            return follow, follow.previous_data, current
+
+class SessionStore:
+    """工作階段的 LRU 儲存區
+
+    工作階段數超過 max_sessions,或分析資料合計超過 max_bytes 時,由最久未使用的工作階段開始
+    整個移除 (取消其分析工作並釋放資料),目前使用中的工作階段不會被移除。
+    被移除的分頁需重新分析,解析結果快取仍在時可立即載入。
+    """
+
+    def __init__(self, max_sessions, max_bytes):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """取得工作階段 (不存在時建立) 並標記為最近使用"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            created = session is None
+            if created:
+                session = self._sessions[session_id] = AnalysisSession(session_id)
+            self._sessions.move_to_end(session_id)
+            session.closed = False
+
+        if created:
+            self.evict(keep=session)
+        return session
+
+    def evict(self, keep=None):
+        """移除最久未使用的工作階段,直到數量與記憶體都在上限內"""
+        evicted = []
+        with self._lock:
+            sizes = {session_id: session.nbytes for session_id, session in self._sessions.items()}
+            total = sum(sizes.values())
+            for session_id in list(self._sessions):
+                over_count = len(self._sessions) > self.max_sessions
+                if not over_count and total <= self.max_bytes:
+                    break
+                # 只超過記憶體上限時,沒有分析資料的工作階段 (例如剛選擇機台) 不需移除
+                if self._sessions[session_id] is keep or (not over_count and sizes[session_id] == 0):
+                    continue
+                evicted.append(self._sessions.pop(session_id))
+                total -= sizes[session_id]
+
+        for session in evicted:
+            session.reset()
+            print(f"Session {session.session_id} evicted (sessions: {len(self._sessions)}, "
+                  f"analysis data: {total / 1024 / 1024:.1f} MB)")
+
+    def close(self, session_id):
+        """標記分頁已關閉,回傳是否所有工作階段都已關閉"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.closed = True
+        return self.all_closed()
+
+    def all_closed(self):
+        with self._lock:
+            return all(session.closed for session in self._sessions.values())
+
+session_store = SessionStore(SESSION_MAX_COUNT, SESSION_MAX_BYTES)
+
+def get_session_id():
+    """目前請求的工作階段 ID (X-Session-Id 標頭或 sid 查詢參數,未提供或格式不符時為 'default')"""
+    session_id = request.headers.get(SESSION_HEADER) or request.args.get('sid') or 'default'
+    return session_id if SESSION_ID_PATTERN.match(session_id) else 'default'
+
+def get_session():
+    """取得目前請求的工作階段"""
+    return session_store.get(get_session_id())
+
 # Flask 路由 
 @app.route('/assets/<path:filename>')
 def serve_asset(filename):
-    """提供靜態資源檔案"""
-    if filename.startswith('Font_Awesome/'):
-        base_path = NETWORK_ASSETS['font_awesome_base']
-        sub_path = filename.replace('Font_Awesome/', '')
-    elif filename.startswith('Google_Fonts/'):
-        base_path = NETWORK_ASSETS['google_fonts_base']
-        sub_path = filename.replace('Google_Fonts/', '')
-    else:
+    """提供靜態資源檔案 (由本機鏡像提供,第一次使用時自網路磁碟複製)"""
+    try:
+        entry = asset_mirror.mirror(filename)
+    except OSError as e:
+        print(f"Error mirroring asset {filename}: {str(e)}")
+        entry = None
+    if entry is None:
         return "Not found", 404
 
-    return send_from_directory(base_path, sub_path)
+    return make_asset_response(entry['sha'], filename, 'no-cache')
+
+@app.route('/assets/c/<sha>/<name>')
+def serve_mirrored_asset(sha, name):
+    """提供 content-addressed 的鏡像資源 (內容不會改變,可永久快取)"""
+    if not re.fullmatch(r'[0-9a-f]{64}', sha):
+        return "Not found", 404
+    return make_asset_response(sha, name, IMMUTABLE_CACHE_CONTROL)
+
+def make_asset_response(sha, name, cache_control):
+    """以鏡像內容回應,文字類資源 (CSS、SVG) 預先壓縮並保存在記憶體"""
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype == 'image/svg+xml':
+        payload = static_payloads.get(f"asset {sha}")
+        if payload is None:
+            body = asset_mirror.read(sha)
+            if body is None:
+                return "Not found", 404
+            payload = get_static_payload(f"asset {sha}", lambda: (body, mimetype, {}))
+        return make_payload_response(payload, cache_control)
+
+    body = asset_mirror.read(sha)
+    if body is None:
+        return "Not found", 404
+    return make_etag_response(body, sha, mimetype, cache_control)
+
+@app.route('/vendor/plotly-<version>.min.js')
+def serve_plotly_js(version):
+    """提供 Plotly.js (僅回應目前內建的版本)"""
+    import plotly.offline
+    if version != plotly.offline.get_plotlyjs_version():
+        return "Not found", 404
+
+    return make_payload_response(get_plotly_js_payload(), IMMUTABLE_CACHE_CONTROL)
 
 
 @app.route('/')
 def index():
     """主頁面路由"""
     update_activity()
-    return generate_index_html()
+    response = make_payload_response(get_index_payload())
+    startup_timer.report_first_request()
+    return response
 
 @app.route('/result')
+@compress_response
 def result():
     """結果頁面路由"""
     update_activity()
     
-    global analysis_file_data
+    session = get_session()
+    analysis_data = session.analysis_data
     
-    if analysis_file_data is None:
+    if analysis_data is None:
         return redirect('/')
     
-    return generate_result_html(analysis_file_data)
+    return generate_result_html(analysis_data, session.machine_type, session.follow_unavailable_reason(),
+                                session.chart_cache)
 
 
 # API 端點
@@ -792,6 +3498,7 @@ def heartbeat():
     """心跳端點,用於保持活動狀態"""
     try:
         update_activity()
+        get_session()
         return jsonify({'success': True, 'status': 'ok'})
     except Exception as e:
         print(f"Error in heartbeat: {str(e)}")
@@ -802,10 +3509,10 @@ def heartbeat():
 
 @app.route('/api/check_version', methods=['GET'])
 def api_check_version():
-    """版本檢查 API"""
+    """版本檢查 API (回傳背景掃描快取的結果)"""
     try:
         update_activity()
-        result = check_version()
+        result = version_checker.get()
         return jsonify(result)
     except Exception as e:
         print(f"Error in api_check_version: {str(e)}")
@@ -855,6 +3562,7 @@ del "%~f0"
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/select_machine', methods=['POST'])
+@require_launch_permission
 def select_machine():
     """機台選擇 API"""
     try:
@@ -863,33 +3571,21 @@ def select_machine():
         data = request.get_json()
         machine_type = data.get('machine_type', '')
 
-        global selected_machine_type, processor_module, autoz_log_timestamp, analysis_file_data
+        session = get_session()
 
         # 重置狀態
-        selected_machine_type = None
-        processor_module = None
-        autoz_log_timestamp = None
-        analysis_file_data = None
+        session.reset()
 
         # 根據機台類型載入對應的處理模組
-        if machine_type in ['J750', 'J750EX', 'UFLEX']:
-            processor_module = J750_J750EX_UFLEX_process_V4
-            selected_machine_type = machine_type
-        elif machine_type in ['ETS88', 'Accotest']:
-            processor_module = ETS88_Accotest_process_V4
-            selected_machine_type = machine_type
-        elif machine_type == 'AG93000':
-            processor_module = AG93000_process_V5
-            selected_machine_type = machine_type
-        elif machine_type == 'T2K':
-            processor_module = T2K_process_V2
-            selected_machine_type = machine_type
-        else:
+        if machine_type not in PROCESSOR_MODULES:
             return jsonify({
                 'success': False,
                 'error': 'Invalid machine type'
             })
 
+        session.processor_module = get_processor_module(machine_type)
+        session.machine_type = machine_type
+
         print(f"Machine type selected: {machine_type}")
 
         return jsonify({
@@ -905,6 +3601,7 @@ def select_machine():
         })
 
 @app.route('/api/select_file', methods=['POST'])
+@require_launch_permission
 def select_file():
     """檔案選擇 API (使用 Tkinter 檔案對話框)"""
     update_activity()
@@ -912,13 +3609,15 @@ def select_file():
     data = request.get_json()
     file_type = data.get('file_type', '')
     
-    if not processor_module:
+    if not get_session().processor_module:
         return jsonify({
             'success': False,
             'error': 'Please select machine type first'
         })
     
     try:
+        from tkinter import Tk, filedialog
+
         # 創建 Tkinter root 視窗 (隱藏)
         root = Tk()
         root.withdraw()
@@ -958,12 +3657,13 @@ def select_file():
         })
 
 @app.route('/api/process_autoz_log', methods=['POST'])
+@require_launch_permission
 def api_process_autoz_log():
     """處理 AutoZLog.txt API"""
     try:
         update_activity()
 
-        global autoz_log_timestamp
+        session = get_session()
 
         data = request.get_json()
         file_path = data.get('file_path', '')
@@ -974,7 +3674,7 @@ def api_process_autoz_log():
                 'error': 'No file path provided'
             })
 
-        if not processor_module:
+        if not session.processor_module:
             return jsonify({
                 'success': False,
                 'error': 'Please select machine type first'
@@ -982,11 +3682,11 @@ def api_process_autoz_log():
 
         print(f"Processing AutoZLog.txt: {file_path}")
 
-        result = process_autoz_log_worker(file_path)
+        result = process_autoz_log_worker(file_path, session.processor_module, session.machine_type)
 
         if result['success']:
-            autoz_log_timestamp = result['timestamp']
-            print(f"AutoZLog processed successfully. Timestamp: {autoz_log_timestamp}")
+            session.autoz_log_timestamp = result['timestamp']
+            print(f"AutoZLog processed successfully. Timestamp: {session.autoz_log_timestamp}")
 
             return jsonify({
                 'success': True,
@@ -1000,76 +3700,245 @@ def api_process_autoz_log():
             })
 
     except Exception as e:
-        print(f"Error in api_process_autoz_log: {str(e)}")
+        print(f"Error in api_process_autoz_log: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to process AutoZLog.txt: {str(e)}'
+        })
+
+@app.route('/api/process_all_txt', methods=['POST'])
+@require_launch_permission
+def api_process_all_txt():
+    """處理 ALL.txt API"""
+    try:
+        update_activity()
+
+        session = get_session()
+
+        data = request.get_json()
+        file_path = data.get('file_path', '')
+
+        if not file_path:
+            return jsonify({
+                'success': False,
+                'error': 'No file path provided'
+            })
+
+        if not session.processor_module:
+            return jsonify({
+                'success': False,
+                'error': 'Please select machine type first'
+            })
+
+        if not session.autoz_log_timestamp:
+            return jsonify({
+                'success': False,
+                'error': 'AutoZLog timestamp not available. Please process AutoZLog.txt first.'
+            })
+
+        print(f"Processing ALL.txt: {file_path}")
+
+        job = submit_analysis_job(session, file_path, choose_encoding())
+
+        return jsonify({
+            'success': True,
+            'message': 'Analysis started',
+            'job_id': job.job_id
+        })
+
+    except Exception as e:
+        print(f"Error in api_process_all_txt: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to process ALL.txt: {str(e)}'
+        })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """分析工作狀態 API (已處理位元組數、晶圓數、經過時間與預估剩餘時間)"""
+    update_activity()
+
+    job = get_analysis_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        })
+
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """取消分析工作 API"""
+    update_activity()
+
+    job = get_analysis_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        })
+
+    return jsonify({
+        'success': True,
+        'cancelled': job.cancel(),
+        'job': job.to_dict()
+    })
+
+@app.route('/api/follow/start', methods=['POST'])
+def api_follow_start():
+    """啟動 follow 模式 (由目前分析資料已解析的位置接續解析 ALL.txt)"""
+    try:
+        update_activity()
+
+        session = get_session()
+        follow = session.start_follow()
+        print(f"Follow mode started at offset {follow.offset:,}")
+
+        return jsonify({
+            'success': True,
+            'offset': follow.offset,
+            'version': session.analysis_data['version']
+        })
+
+    except Exception as e:
+        print(f"Error in api_follow_start: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to start follow mode: {str(e)}'
+        })
+
+@app.route('/api/follow/stop', methods=['POST'])
+def api_follow_stop():
+    """停止 follow 模式"""
+    update_activity()
+    get_session().stop_follow()
+    return jsonify({'success': True})
+
+@app.route('/api/follow', methods=['GET'])
+def api_follow():
+    """follow 模式輪詢 API:解析新增內容,並回傳相對於前端圖表版本的增量資料
+
+    前端版本為前一版本時回傳 delta 供 Plotly.extendTraces 使用;無法增量更新時 delta 為 None,
+    前端應重新載入圖表。
+    """
+    try:
+        update_activity()
+
+        axis_type = request.args.get('axis', 'z').lower()
+        if axis_type not in ['x', 'y', 'z']:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid axis type'
+            })
+        version = request.args.get('version', type=int)
+
+        session = get_session()
+        polled = session.poll_follow()
+        if polled is None:
+            return jsonify({
+                'success': False,
+                'error': 'Follow mode is not active'
+            })
+
+        follow, previous, current = polled
+        session_store.evict(keep=session)
+
+        if version == current['version']:
+            return jsonify({
+                'success': True,
+                'changed': False,
+                'version': version,
+                'offset': follow.offset
+            })
+
+        delta = None
+        if previous is not None and version == previous['version']:
+            delta = build_chart_delta(previous, current, axis_type)
+
+        dataset = current['dataset']
+        return jsonify({
+            'success': True,
+            'changed': True,
+            'version': current['version'],
+            'axis': axis_type,
+            'delta': delta,
+            'summary': {
+                'total_wafers': dataset.n_wafers,
+                'total_points': dataset.point_count('z')
+            },
+            'offset': follow.offset
+        })
+
+    except Exception as e:
+        print(f"Error in api_follow: {str(e)}")
         return jsonify({
             'success': False,
-            'error': f'Failed to process AutoZLog.txt: {str(e)}'
+            'error': f'Failed to update from ALL.txt: {str(e)}'
         })
 
-@app.route('/api/process_all_txt', methods=['POST'])
-def api_process_all_txt():
-    """處理 ALL.txt API"""
+@app.route('/api/chart_window', methods=['GET'])
+def api_chart_window():
+    """主圖表縮放 API:依 Plotly relayout 的可見索引範圍回傳該視窗的細部點位"""
     try:
         update_activity()
 
-        global analysis_file_data
-
-        data = request.get_json()
-        file_path = data.get('file_path', '')
-
-        if not file_path:
+        analysis_data = get_session().analysis_data
+        if analysis_data is None:
             return jsonify({
                 'success': False,
-                'error': 'No file path provided'
+                'error': 'No analysis data available'
             })
 
-        if not processor_module:
+        axis_type = request.args.get('axis', 'z').lower()
+        if axis_type not in ['x', 'y', 'z']:
             return jsonify({
                 'success': False,
-                'error': 'Please select machine type first'
+                'error': 'Invalid axis type'
             })
 
-        if not autoz_log_timestamp:
+        encoding = request.args.get('encoding', CHART_ENCODING_DEFAULT)
+        if encoding not in CHART_ENCODINGS:
             return jsonify({
                 'success': False,
-                'error': 'AutoZLog timestamp not available. Please process AutoZLog.txt first.'
+                'error': 'Invalid chart encoding'
             })
 
-        print(f"Processing ALL.txt: {file_path}")
-
-        result = process_all_txt_worker(file_path, autoz_log_timestamp)
-
-        if result['success']:
-            analysis_file_data = result['result']
-            print("ALL.txt processed successfully")
-
-            return jsonify({
-                'success': True,
-                'message': 'Analysis completed successfully',
-                'redirect_url': '/result'
-            })
-        else:
-            print(f"Error processing ALL.txt: {result['error']}")
+        start = request.args.get('start', type=int)
+        stop = request.args.get('stop', type=int)
+        if start is None or stop is None:
             return jsonify({
                 'success': False,
-                'error': result['error']
+                'error': 'Missing window range'
             })
 
+        return jsonify(build_chart_window(analysis_data, axis_type, start, stop, encoding))
+
     except Exception as e:
-        print(f"Error in api_process_all_txt: {str(e)}")
+        print(f"Error in api_chart_window: {str(e)}")
         return jsonify({
             'success': False,
-            'error': f'Failed to process ALL.txt: {str(e)}'
+            'error': f'Failed to load chart window: {str(e)}'
         })
 
 @app.route('/api/shutdown', methods=['POST'])
 def shutdown():
-    """立即關閉伺服器（當瀏覽器關閉時調用）"""
+    """分頁關閉時調用:所有工作階段的分頁都關閉後立即關閉伺服器"""
+    session_id = get_session_id()
+    if not session_store.close(session_id):
+        print(f"Session {session_id} closed, other sessions still open")
+        return jsonify({'success': True})
+
     print("Browser closed, shutting down immediately...")
 
     def delayed_shutdown():
         time.sleep(0.5)
-        os._exit(0)
+        # 重新整理頁面時,新的請求會在此之前重新開啟工作階段
+        if session_store.all_closed():
+            os._exit(0)
 
     threading.Thread(target=delayed_shutdown, daemon=True).start()
     return jsonify({'success': True})
@@ -1080,9 +3949,10 @@ def regenerate_chart():
     try:
         update_activity()
 
-        global analysis_file_data
+        session = get_session()
+        analysis_data = session.analysis_data
 
-        if analysis_file_data is None:
+        if analysis_data is None:
             return jsonify({
                 'success': False,
                 'error': 'No analysis data available'
@@ -1096,65 +3966,342 @@ def regenerate_chart():
                 'success': False,
                 'error': 'Invalid axis type'
             })
-        wafer_data = analysis_file_data['wafer_data']
-        x_standard = analysis_file_data['x_standard']
-        y_standard = analysis_file_data['y_standard']
-        z_standard = analysis_file_data['z_standard']
-
-        standard_point_data = {
-            'x': x_standard,
-            'y': y_standard,
-            'z': z_standard
-        }
 
-        # 獲取對應軸的標準值
-        standard_map = {
-            'x': x_standard,
-            'y': y_standard,
-            'z': z_standard
-        }
-        standard_value = standard_map.get(axis_type)
+        encoding = data.get('encoding', CHART_ENCODING_DEFAULT)
+        if encoding not in CHART_ENCODINGS:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid chart encoding'
+            })
 
-        # 根據軸類型決定主圖表是否傳入標準值（僅 Z 軸顯示標準線）
-        main_standard = standard_value if axis_type == 'z' else None
+        return make_payload_response(get_chart_response(session.chart_cache, analysis_data, axis_type, encoding))
 
-        # 生成主圖表
-        main_fig, stats = create_line_chart(
-            wafer_data,
-            axis_type,
-            main_standard,
-            standard_point_data
-        )
+    except Exception as e:
+        print(f"Error in regenerate_chart: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Failed to regenerate chart: {str(e)}'
+        })
 
-        # 生成異常分析圖表
-        anomaly_fig, anomaly_stats = create_anomaly_chart(
-            wafer_data,
-            axis_type,
-            standard_value,
-            standard_point_data
-        )
+@app.route('/api/wafer_status', methods=['GET'])
+def api_wafer_status():
+    """Wafer 狀態儀表板 API (結果頁面切換到該分頁時才載入)"""
+    try:
+        update_activity()
+
+        session = get_session()
+        analysis_data = session.analysis_data
+
+        if analysis_data is None:
+            return jsonify({
+                'success': False,
+                'error': 'No analysis data available'
+            })
+
+        return make_payload_response(get_wafer_status_response(session.chart_cache, analysis_data))
+
+    except Exception as e:
+        print(f"Error in api_wafer_status: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Failed to load wafer status: {str(e)}'
+        })
+
+@app.route('/api/wafer_stats', methods=['GET'])
+@compress_response
+def api_wafer_stats():
+    """Wafer 統計表 API:回傳依指定欄位排序後的一頁各晶圓 X/Y/Z 統計資料"""
+    try:
+        update_activity()
+
+        session = get_session()
+        analysis_data = session.analysis_data
+        if analysis_data is None:
+            return jsonify({
+                'success': False,
+                'error': 'No analysis data available'
+            })
+
+        sort = request.args.get('sort', 'start')
+        if sort not in wafer_stats_sort_keys():
+            return jsonify({
+                'success': False,
+                'error': 'Invalid sort column'
+            })
+        order = request.args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid sort order'
+            })
 
-        # 將圖表轉為字典格式
-        main_chart_dict = main_fig.to_dict()
-        anomaly_chart_dict = anomaly_fig.to_dict()
+        page_size = min(max(request.args.get('page_size', WAFER_STATS_PAGE_SIZE, type=int), 1), WAFER_STATS_MAX_PAGE_SIZE)
+        total = analysis_data['dataset'].n_wafers
+        pages = max(math.ceil(total / page_size), 1)
+        page = min(max(request.args.get('page', 1, type=int), 1), pages)
 
+        rows, total = page_wafer_stats(get_wafer_stats(session.wafer_stats_cache, analysis_data), sort, order == 'desc', page, page_size)
         return jsonify({
             'success': True,
-            'main_chart': main_chart_dict,
-            'anomaly_chart': anomaly_chart_dict,
-            'stats': stats,
-            'anomaly_stats': anomaly_stats
+            'version': analysis_data['version'],
+            'sort': sort,
+            'order': order,
+            'page': page,
+            'pages': pages,
+            'page_size': page_size,
+            'total': total,
+            'rows': rows
         })
 
     except Exception as e:
-        print(f"Error in regenerate_chart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error in api_wafer_stats: {str(e)}")
         return jsonify({
             'success': False,
-            'error': f'Failed to regenerate chart: {str(e)}'
+            'error': f'Failed to load wafer statistics: {str(e)}'
         })
 
+def get_chart_response(cache, analysis_data, axis_type, encoding=CHART_ENCODING_DEFAULT):
+    """取得指定軸的序列化圖表回應 (ResponsePayload),相同資料集版本、軸、標準值與編碼時由工作階段的快取回傳"""
+    cache_key = (
+        analysis_data['version'],
+        axis_type,
+        analysis_data['x_standard'],
+        analysis_data['y_standard'],
+        analysis_data['z_standard'],
+        encoding
+    )
+
+    def build():
+        payload = build_chart_payload(analysis_data, axis_type, encoding)
+        body = app.json.dumps(payload).encode('utf-8')
+        return ResponsePayload(body, 'application/json', f"{axis_type} chart")
+
+    return cache.get_or_build(cache_key, build)
+
+def get_wafer_status_response(cache, analysis_data):
+    """取得 Wafer 狀態儀表板的序列化回應 (ResponsePayload),與圖表共用工作階段的快取"""
+    def build():
+        body = app.json.dumps({
+            'success': True,
+            'html': create_wafer_status_dashboard(analysis_data['dataset'], analysis_data['z_standard'])
+        }).encode('utf-8')
+        return ResponsePayload(body, 'application/json', 'wafer status')
+
+    return cache.get_or_build((analysis_data['version'], 'wafer_status', analysis_data['z_standard']), build)
+
+# 圖表預先計算
+chart_warmup_executor = ThreadPoolExecutor(max_workers=CHART_WARMUP_WORKERS, thread_name_prefix='chart-warmup')
+
+def warm_chart_cache(session, analysis_data, content_encoding):
+    """分析完成後於背景建立三軸圖表 (含統計資料) 與 Wafer 狀態儀表板,並預先壓縮後存入快取
+
+    只預先壓縮瀏覽器協商的 content_encoding (啟動分析的請求依 Accept-Encoding 選出),其他版本需要時才產生。
+
+    結果頁面內嵌的 Z 軸圖表最先建立,完成後其餘項目再平行建立,避免與 Z 軸圖表競爭。
+    結果頁面與軸切換之後只需讀取快取;尚未完成的項目由 ChartResponseCache.get_or_build 等待,不會重複計算。
+    工作階段已換成其他版本 (follow 模式更新、重新分析或被移除) 時,尚未開始的項目直接略過,
+    已在建立中的項目完成後也不會存入快取 (見 ChartResponseCache.discard_version)。
+    """
+    version = analysis_data['version']
+    cache = session.chart_cache
+
+    def warm(label, build, follow_up=()):
+        current = session.analysis_data
+        if current is None or current['version'] != version:
+            print(f"Skipped warm-up of {label} of version {version}: analysis data has changed")
+            return
+
+        start = time.perf_counter()
+        try:
+            payload = build()
+        except Exception as e:
+            payload = None
+            print(f"Warm-up of {label} failed: {e}")
+        finally:
+            for task in follow_up:
+                chart_warmup_executor.submit(warm, *task)
+
+        if payload is not None:
+            payload.precompress((content_encoding,))
+            print(f"Warmed up {label} of version {version} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    follow_up = [(f"{axis_type.upper()} chart", functools.partial(get_chart_response, cache, analysis_data, axis_type))
+                 for axis_type in ('x', 'y')]
+    follow_up.append(('wafer status', functools.partial(get_wafer_status_response, cache, analysis_data)))
+    chart_warmup_executor.submit(warm, 'Z chart', functools.partial(get_chart_response, cache, analysis_data, 'z'), follow_up)
+
+def build_chart_payload(analysis_data, axis_type, encoding=CHART_ENCODING_DEFAULT):
+    """生成指定軸的主圖表與異常分析圖表,回傳可序列化的回應內容"""
+    dataset = analysis_data['dataset']
+    x_standard = analysis_data['x_standard']
+    y_standard = analysis_data['y_standard']
+    z_standard = analysis_data['z_standard']
+
+    standard_point_data = {
+        'x': x_standard,
+        'y': y_standard,
+        'z': z_standard
+    }
+
+    # 獲取對應軸的標準值
+    standard_value = standard_point_data.get(axis_type)
+
+    # 根據軸類型決定主圖表是否傳入標準值（僅 Z 軸顯示標準線）
+    main_standard = standard_value if axis_type == 'z' else None
+
+    # 依點數 (含 AutoZ complete 點) 選擇兩張圖表共用的繪製層級
+    point_count = dataset.point_count(axis_type) + 1
+    render_tier = choose_render_tier(point_count)
+
+    # 生成主圖表 (直接建立 Plotly 字典,不經 go.Figure 驗證)
+    main_figure, stats = build_line_chart_figure(
+        dataset,
+        axis_type,
+        main_standard,
+        standard_point_data,
+        render_tier
+    )
+
+    # 生成異常分析圖表
+    anomaly_figure, anomaly_stats = build_anomaly_chart_figure(
+        dataset,
+        axis_type,
+        standard_value,
+        standard_point_data,
+        render_tier
+    )
+
+    print(f"Rendering {axis_type.upper()} chart with {render_tier} tier ({stats['count']:,} points)")
+
+    # 依編碼方式處理圖表中的數值陣列
+    return {
+        'success': True,
+        'version': analysis_data['version'],
+        'encoding': encoding,
+        'render_tier': render_tier,
+        'decimated': point_count > CHART_OVERVIEW_MAX_POINTS,
+        'main_chart': encode_chart_arrays(main_figure, encoding),
+        'anomaly_chart': encode_chart_arrays(anomaly_figure, encoding),
+        'stats': stats,
+        'anomaly_stats': anomaly_stats
+    }
+
+def has_prefix(values, prefix):
+    """values 的開頭是否與 prefix 相同 (follow 模式追加的資料與前一版本共用記憶體時不需逐點比對)"""
+    if len(values) < len(prefix):
+        return False
+    if not len(prefix) or values.__array_interface__['data'][0] == prefix.__array_interface__['data'][0]:
+        return True
+    return np.array_equal(values[:len(prefix)], prefix)
+
+def build_chart_delta(previous_data, analysis_data, axis_type):
+    """follow 模式:計算指定軸由前一版本到目前版本新增的圖表內容
+
+    新資料依開始時間排序後須完整保留舊資料 (新增點位都接在最後) 才能增量更新,
+    否則回傳 None,由前端重新載入整張圖表。點位格式與 build_line_chart_figure / build_anomaly_chart_figure 相同。
+    總覽圖經抽樣時,新增點位以目前總覽的分段寬度做 min/max 抽樣;包絡層級的異常分析圖表以相同寬度追加分段。
+    繪製層級改變或點數較圖表建立時倍增時由前端重新載入 (見結果頁面的 applyChartDelta)。
+    """
+    dataset = analysis_data['dataset']
+    old_view = previous_data['dataset'].sorted_axis(axis_type)
+    view = dataset.sorted_axis(axis_type)
+    old_count = len(old_view.values)
+
+    if not has_prefix(view.values, old_view.values) or not has_prefix(view.codes, old_view.codes):
+        return None
+
+    # 圖表的第一個點為 AutoZ complete 點
+    standard_value = analysis_data[f"{axis_type}_standard"]
+    all_values = np.concatenate(([standard_value], view.values))
+    new_values = view.values[old_count:]
+    new_codes = view.codes[old_count:]
+    first_index = old_count + 1
+    total_points = len(all_values)
+    render_tier = choose_render_tier(total_points)
+    decimated = total_points > CHART_OVERVIEW_MAX_POINTS
+    stats = compute_axis_stats(all_values)
+
+    # 主圖表:總覽經抽樣時,新增點位以相同的分段寬度抽樣 (低於標準值的點一律保留)
+    max_points = len(new_values)
+    if decimated:
+        bucket_width = total_points / max(CHART_OVERVIEW_MAX_POINTS // 2, 1)
+        max_points = 2 * math.ceil(len(new_values) / bucket_width)
+    indices, _ = select_line_chart_points(new_values, 0, len(new_values), max_points, 0, standard_value)
+
+    main = {
+        'x': (indices + first_index).tolist(),
+        'y': new_values[indices].tolist(),
+        'text': dataset.wafer_labels(new_codes[indices]),
+        'decimated': decimated,
+        'boundaries': (view.starts[view.starts >= old_count] + 1).tolist(),
+        'min': stats['min'],
+        'max': stats['max'],
+        'point_count': total_points
+    }
+
+    if render_tier == 'envelope':
+        # 以目前包絡的分段寬度追加新的分段
+        bucket_width = math.ceil(len(view.values) / RENDER_ENVELOPE_BUCKETS)
+        anomaly = {
+            'envelope': envelope_series(new_values, math.ceil(len(new_values) / bucket_width), standard_value, first_index),
+            'point_count': total_points
+        }
+    else:
+        new_x = np.arange(first_index, total_points)
+        labels = np.asarray(dataset.wafer_labels(new_codes), dtype=object)
+        value_label = f"<br>{axis_type.upper()} Value: "
+
+        def anomaly_points(mask):
+            return {
+                'x': new_x[mask].tolist(),
+                'y': new_values[mask].tolist(),
+                'text': [f"Wafer ID: {label}{value_label}{value:.2f} µm"
+                         for label, value in zip(labels[mask].tolist(), new_values[mask].tolist())]
+            }
+
+        anomaly_mask = new_values < standard_value
+        anomaly = {
+            'normal': anomaly_points(~anomaly_mask),
+            'anomaly': anomaly_points(anomaly_mask),
+            'point_count': total_points
+        }
+
+    return {
+        'render_tier': render_tier,
+        'main': main,
+        'anomaly': anomaly,
+        'stats': stats,
+        'anomaly_stats': compute_anomaly_stats(all_values, standard_value)
+    }
+
+def build_chart_window(analysis_data, axis_type, start, stop, encoding=CHART_ENCODING_DEFAULT):
+    """縮放視窗 [start, stop) 內的主圖表點位,格式與總覽圖的數值 trace 相同
+
+    視窗內點數不超過 CHART_WINDOW_MAX_POINTS 時回傳完整點位,否則以相同的 min/max 分段抽樣。
+    """
+    dataset = analysis_data['dataset']
+    standard_value = analysis_data[f"{axis_type}_standard"]
+    view, values, first_wafer_index = line_chart_series(dataset, axis_type, {axis_type: standard_value})
+
+    start = min(max(start, 0), len(values))
+    stop = min(max(stop, start), len(values))
+    indices, decimated = select_line_chart_points(
+        values, start, stop, CHART_WINDOW_MAX_POINTS, first_wafer_index, standard_value
+    )
+    points = line_trace_points(dataset, view, values, indices, first_wafer_index, choose_render_tier(len(values)))
+
+    return {
+        'success': True,
+        'version': analysis_data['version'],
+        'encoding': encoding,
+        'start': start,
+        'stop': stop,
+        'decimated': decimated,
+        'window': encode_chart_arrays({'data': [points]}, encoding)
+    }
+
 def generate_index_html():
     """Generate main page HTML"""
     
@@ -1423,6 +4570,23 @@ def generate_index_html():
                 box-shadow: inset 0 2px 4px rgba(0, 0, 0, 0.06);
             }
 
+            .progress-details {
+                font-size: 12px;
+                color: #888888;
+                margin-top: 8px;
+                min-height: 16px;
+            }
+
+            .progress-cancel {
+                display: none;
+                margin-top: 12px;
+                padding: 10px;
+            }
+
+            .progress-cancel.show {
+                display: flex;
+            }
+
             .progress-fill {
                 height: 100%;
                 background: linear-gradient(90deg, #5A5A5A 0%, #3A3A3A 100%);
@@ -1890,6 +5054,11 @@ def generate_index_html():
                 <div class="progress-bar-wrapper">
                     <div class="progress-fill" id="progressFill">0%</div>
                 </div>
+                <div class="progress-details" id="progressDetails"></div>
+                <button class="btn btn-secondary progress-cancel" id="cancelJobBtn">
+                    <i class="fas fa-xmark btn-icon"></i>
+                    <span id="cancelJobLabel">Cancel Analysis</span>
+                </button>
             </div>
         </div>
         
@@ -1962,6 +5131,23 @@ def generate_index_html():
         <div class="toast-container" id="toastContainer"></div>
 
         <script>
+            // ========== Session ==========
+            // Each tab keeps its own analysis session (kept across reloads) and sends it with every API request
+
+            const SESSION_ID = sessionStorage.getItem('autozSessionId') || (
+                window.crypto && crypto.randomUUID
+                    ? crypto.randomUUID()
+                    : Date.now().toString(36) + Math.random().toString(36).slice(2)
+            );
+            sessionStorage.setItem('autozSessionId', SESSION_ID);
+
+            const nativeFetch = window.fetch.bind(window);
+            window.fetch = (url, options = {}) => {
+                const headers = new Headers(options.headers || {});
+                headers.set('X-Session-Id', SESSION_ID);
+                return nativeFetch(url, { ...options, headers });
+            };
+
             // ========== Browser close detection mechanism ==========
 
             let isNormalNavigation = false;
@@ -2029,11 +5215,49 @@ def generate_index_html():
 
             // ========== Version check mechanism ==========
 
+            const VERSION_CHECK_RETRY = 2000;  // ms between re-checks while the verdict is unknown
+            let permissionPending = false;
+
+            // Disable page controls until the launch permission check gives a definite verdict,
+            // remembering which ones were enabled so they can be restored afterwards
+            function setPermissionPending(pending) {
+                if (pending === permissionPending) return;
+                permissionPending = pending;
+                if (pending) {
+                    document.querySelectorAll('.container button, .container select').forEach(el => {
+                        if (!el.disabled) {
+                            el.disabled = true;
+                            el.dataset.permissionPending = '1';
+                        }
+                    });
+                    showToast('Checking launch permission...', 'info');
+                } else {
+                    document.querySelectorAll('[data-permission-pending]').forEach(el => {
+                        el.disabled = false;
+                        delete el.dataset.permissionPending;
+                    });
+                }
+            }
+
             async function checkVersionOnStartup() {
+                let result;
                 try {
                     const response = await fetch('/api/check_version');
-                    const result = await response.json();
+                    result = await response.json();
+                } catch (error) {
+                    console.error('Version check failed:', error);
+                    result = { status: 'unknown' };
+                }
+
+                // Timed out or the scan failed: keep controls disabled and ask again
+                if (result.status === 'unknown' || (result.status === 'error' && result.type === 'exception')) {
+                    setPermissionPending(true);
+                    setTimeout(checkVersionOnStartup, VERSION_CHECK_RETRY);
+                    return;
+                }
+                setPermissionPending(false);
 
+                try {
                     if (result.status === 'update') {
                         document.getElementById('versionMessage').textContent = result.message;
                         document.getElementById('versionModal').classList.add('show');
@@ -2076,6 +5300,7 @@ def generate_index_html():
             let autoZLogPath = '';
             let allTxtPath = '';
             let progressInterval = null;  // ADDED: Global progress interval variable
+            let currentJobId = null;      // Running ALL.txt analysis job
             
             // Machine selection
             document.getElementById('machineSelect').addEventListener('change', async function() {
@@ -2193,26 +5418,38 @@ def generate_index_html():
                     showProgress('Processing ALL.txt and generating charts...');
                     this.disabled = true;
                     
-                    const processResponse = await fetch('/api/process_all_txt', {
+                    const submitResponse = await fetch('/api/process_all_txt', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({ file_path: allTxtPath })
                     });
                     
-                    const processResult = await processResponse.json();
+                    const submitResult = await submitResponse.json();
+                    
+                    if (!submitResult.success) {
+                        hideProgress();
+                        this.disabled = false;
+                        showError(submitResult.error);
+                        return;
+                    }
+
+                    const job = await waitForJob(submitResult.job_id);
                     
                     hideProgress();
                     
-                    if (processResult.success) {
+                    if (job.status === 'completed') {
                         document.getElementById('step3').classList.add('completed');
                         document.getElementById('stepIndicator').classList.remove('progress-66');
                         document.getElementById('stepIndicator').classList.add('progress-100');
 
                         isNormalNavigation = true;  // 標記為正常跳轉
-                        window.location.href = processResult.redirect_url;
+                        window.location.href = job.redirect_url;
+                    } else if (job.status === 'cancelled') {
+                        this.disabled = false;
+                        showToast('Analysis cancelled', 'info');
                     } else {
                         this.disabled = false;
-                        showError(processResult.error);
+                        showError(job.error);
                     }
                 } catch (error) {
                     hideProgress();
@@ -2221,6 +5458,105 @@ def generate_index_html():
                 }
             });
             
+            // ========== Analysis job polling ==========
+
+            function formatDuration(seconds) {
+                seconds = Math.max(0, Math.round(seconds));
+                const minutes = Math.floor(seconds / 60);
+                return minutes > 0 ? `${minutes}m ${seconds % 60}s` : `${seconds}s`;
+            }
+
+            // Poll job status until it finishes; returns the final job state
+            async function waitForJob(jobId) {
+                currentJobId = jobId;
+                updateCancelButton({ cancellable: true, cancel_requested: false });
+
+                try {
+                    while (true) {
+                        await new Promise(resolve => setTimeout(resolve, 500));
+
+                        const response = await fetch(`/api/jobs/${jobId}`);
+                        const result = await response.json();
+
+                        if (!result.success) {
+                            return { status: 'failed', error: result.error };
+                        }
+
+                        updateJobProgress(result.job);
+                        updateCancelButton(result.job);
+
+                        if (['completed', 'failed', 'cancelled'].includes(result.job.status)) {
+                            return result.job;
+                        }
+                    }
+                } finally {
+                    currentJobId = null;
+                    document.getElementById('cancelJobBtn').classList.remove('show');
+                }
+            }
+
+            // Formats parsed in one pass cannot be stopped midway: disable cancel and say why
+            function updateCancelButton(job) {
+                const button = document.getElementById('cancelJobBtn');
+                const label = document.getElementById('cancelJobLabel');
+                button.classList.add('show');
+                button.disabled = !job.cancellable;
+                if (job.cancellable) {
+                    label.textContent = 'Cancel Analysis';
+                    button.title = '';
+                } else if (job.cancel_requested) {
+                    label.textContent = 'Cancelling when parsing finishes...';
+                    button.title = 'The result will be discarded once the current parse completes';
+                } else {
+                    label.textContent = 'Cannot cancel: ALL.txt is parsed in one pass';
+                    button.title = 'Record boundaries of this ALL.txt format could not be determined, so parsing cannot be stopped midway';
+                }
+            }
+
+            function updateJobProgress(job) {
+                if (job.status === 'queued') {
+                    document.getElementById('progressDetails').textContent = 'Waiting for the previous analysis to finish';
+                    return;
+                }
+
+                const details = [
+                    `${(job.bytes_processed / 1048576).toFixed(1)} / ${(job.total_bytes / 1048576).toFixed(1)} MB`,
+                    `${job.wafers_found} wafers`,
+                    `${formatDuration(job.elapsed)} elapsed`
+                ];
+                if (job.eta !== null) {
+                    details.push(`ETA ${formatDuration(job.eta)}`);
+                }
+                document.getElementById('progressDetails').textContent = details.join(' · ');
+
+                // Real progress replaces the simulated animation once bytes are reported
+                if (job.bytes_processed > 0 && job.total_bytes > 0) {
+                    if (progressInterval) {
+                        clearInterval(progressInterval);
+                        progressInterval = null;
+                    }
+                    const percent = Math.floor(job.bytes_processed / job.total_bytes * 100);
+                    const progressFill = document.getElementById('progressFill');
+                    progressFill.style.width = percent + '%';
+                    progressFill.textContent = percent + '%';
+                }
+            }
+
+            document.getElementById('cancelJobBtn').addEventListener('click', async function() {
+                if (!currentJobId) return;
+
+                this.disabled = true;
+                try {
+                    const response = await fetch(`/api/jobs/${currentJobId}/cancel`, { method: 'POST' });
+                    const result = await response.json();
+                    if (result.success && currentJobId) {
+                        updateCancelButton(result.job);
+                    }
+                } catch (error) {
+                    console.error('Failed to cancel analysis:', error);
+                }
+            });
+
             // MODIFIED: Fixed showProgress to prevent duplicate progress bar execution
             function showProgress(message) {
                 // Clear old progress interval to prevent duplicate execution
@@ -2230,6 +5566,7 @@ def generate_index_html():
                 }
 
                 document.getElementById('progressLabel').textContent = message;
+                document.getElementById('progressDetails').textContent = '';
                 document.getElementById('progressContainer').classList.add('show');
                 const progressFill = document.getElementById('progressFill');
                 progressFill.style.width = '0%';
@@ -2366,15 +5703,17 @@ def generate_index_html():
                 }
             });
             
-            // Heartbeat mechanism
-            setInterval(() => {
+            // Heartbeat mechanism (the first beat registers this tab's session with the server)
+            function sendHeartbeat() {
                 fetch('/api/heartbeat', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' }
                 }).catch(error => {
                     console.error('Heartbeat failed:', error);
                 });
-            }, 60000);
+            }
+            sendHeartbeat();
+            setInterval(sendHeartbeat, 60000);
         </script>
     </body>
     </html>
@@ -2382,80 +5721,34 @@ def generate_index_html():
     
     return html
 
-def generate_result_html(data):
-    """生成結果頁面 HTML - 採用現代化設計風格"""
+def generate_result_html(data, machine_type, follow_unavailable, cache):
+    """生成結果頁面 HTML - 採用現代化設計風格 (follow_unavailable 為 follow 模式無法使用的原因,按鈕停用並顯示原因;
+    cache 為工作階段的圖表快取)"""
 
-    wafer_data = data['wafer_data']
+    dataset = data['dataset']
     x_standard = data['x_standard']
     y_standard = data['y_standard']
     z_standard = data['z_standard']
 
-    # 準備 AutoZ complete 點位資料
-    standard_point_data = {
-        'x': x_standard,
-        'y': y_standard,
-        'z': z_standard
-    }
-
-    # 為所有三個軸生成圖表(包含 AutoZ complete 點位)
-    x_fig, x_stats = create_line_chart(wafer_data, 'x', x_standard, standard_point_data)
-    y_fig, y_stats = create_line_chart(wafer_data, 'y', y_standard, standard_point_data)
-    z_fig, z_stats = create_line_chart(wafer_data, 'z', z_standard, standard_point_data)
+    # 僅內嵌預設的 Z 軸圖表資料,其他軸與 Wafer 狀態在切換時才向 API 取得
+    # 前端以此 ETag 重新驗證 Z 軸圖表,需與 API 依相同 Accept-Encoding 回傳的壓縮版本一致
+    z_chart = get_chart_response(cache, data, 'z')
+    _, (_, z_chart_etag) = z_chart.variant(choose_encoding())
+    initial_chart_json = z_chart.body.decode('utf-8').replace('</', '<\\/')
 
-    # 生成新的圖表(包含 AutoZ complete 點位)
-    z_anomaly_fig, z_anomaly_stats = create_anomaly_chart(wafer_data, 'z', z_standard, standard_point_data)
-    wafer_status_html = create_wafer_status_dashboard(wafer_data, z_standard)
-
-    # 生成 Plotly.js 內嵌程式碼（離線可用）
-    plotly_js_code = plotly.offline.get_plotlyjs()
+    if follow_unavailable is None:
+        follow_button_attrs = 'onclick="toggleFollow()" title="Append new wafers while ALL.txt is still being written"'
+    else:
+        follow_button_attrs = f'disabled title="{escape(follow_unavailable)}"'
 
-    # 轉換為 HTML
-    x_html = x_fig.to_html(include_plotlyjs=False, full_html=False, config={"responsive": True})
-    y_html = y_fig.to_html(include_plotlyjs=False, full_html=False, config={"responsive": True})
-    z_html = z_fig.to_html(include_plotlyjs=False, full_html=False, config={"responsive": True})
-    z_anomaly_html = z_anomaly_fig.to_html(include_plotlyjs=False, full_html=False, config={"responsive": True})
+    # Plotly.js 由本機路由提供（離線可用,瀏覽器可快取）
+    plotly_js_url = get_plotly_js_url()
 
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # 計算統計資訊
-    total_wafers = len(wafer_data)
-    total_points = sum(len(data.get('z_values', [])) for data in wafer_data.values())
-    anomaly_count = z_anomaly_stats.get('anomaly_points', 0)
-    anomaly_percent = z_anomaly_stats.get('anomaly_percent', 0)
-
-    # 創建統計 HTML
-    x_stats_html = f'''
-    <div class="statistics-box">
-        <div class="stat-item"><span class="stat-label">X Min:</span> <span class="stat-value">{x_stats['min']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">X Max:</span> <span class="stat-value">{x_stats['max']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">X Mean:</span> <span class="stat-value">{x_stats['mean']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">X Median:</span> <span class="stat-value">{x_stats['median']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">X Std Dev:</span> <span class="stat-value">{x_stats['std']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Data Points:</span> <span class="stat-value">{x_stats['count']:,}</span></div>
-    </div>
-    '''
-
-    y_stats_html = f'''
-    <div class="statistics-box">
-        <div class="stat-item"><span class="stat-label">Y Min:</span> <span class="stat-value">{y_stats['min']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Y Max:</span> <span class="stat-value">{y_stats['max']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Y Mean:</span> <span class="stat-value">{y_stats['mean']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Y Median:</span> <span class="stat-value">{y_stats['median']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Y Std Dev:</span> <span class="stat-value">{y_stats['std']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Data Points:</span> <span class="stat-value">{y_stats['count']:,}</span></div>
-    </div>
-    '''
-
-    z_stats_html = f'''
-    <div class="statistics-box">
-        <div class="stat-item"><span class="stat-label">Z Min:</span> <span class="stat-value">{z_stats['min']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Z Max:</span> <span class="stat-value">{z_stats['max']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Z Mean:</span> <span class="stat-value">{z_stats['mean']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Z Median:</span> <span class="stat-value">{z_stats['median']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Z Std Dev:</span> <span class="stat-value">{z_stats['std']:.4f} µm</span></div>
-        <div class="stat-item"><span class="stat-label">Data Points:</span> <span class="stat-value">{z_stats['count']:,}</span></div>
-    </div>
-    '''
+    total_wafers = dataset.n_wafers
+    total_points = dataset.point_count('z')
 
     # 創建完整的 HTML 與標籤頁
     html = f'''
@@ -2464,13 +5757,11 @@ def generate_result_html(data):
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>AutoZ Wafer4P Aligner - {selected_machine_type}</title>
+        <title>AutoZ Wafer4P Aligner - {machine_type}</title>
         <link rel="stylesheet" href="/assets/Google_Fonts/css/noto-sans-tc.css">
         <link rel="stylesheet" href="/assets/Font_Awesome/css/all.min.css">
 
-        <script type="text/javascript">
-            {plotly_js_code}
-        </script>
+        <script type="text/javascript" src="{plotly_js_url}"></script>
 
         <style>
 
@@ -2536,6 +5827,67 @@ def generate_result_html(data):
                 display: block;
             }}
 
+            .tab-placeholder {{
+                padding: 40px;
+                text-align: center;
+                color: #6c757d;
+                font-size: 14px;
+            }}
+
+            /* Wafer Statistics Table */
+            .wafer-stats-toolbar {{
+                display: flex;
+                align-items: center;
+                gap: 12px;
+                margin-bottom: 12px;
+                font-size: 14px;
+            }}
+
+            .wafer-stats-toolbar select,
+            .wafer-stats-toolbar button {{
+                padding: 4px 10px;
+                border: 1px solid #ccc;
+                border-radius: 4px;
+                background-color: white;
+                font-size: 14px;
+                cursor: pointer;
+            }}
+
+            .wafer-stats-toolbar button:disabled {{
+                cursor: default;
+                color: #aaa;
+            }}
+
+            .wafer-stats-table {{
+                width: 100%;
+                border-collapse: collapse;
+                font-size: 13px;
+            }}
+
+            .wafer-stats-table th,
+            .wafer-stats-table td {{
+                border: 1px solid #ddd;
+                padding: 6px 10px;
+                text-align: right;
+                white-space: nowrap;
+            }}
+
+            .wafer-stats-table th {{
+                background-color: #2D2D2D;
+                color: white;
+                cursor: pointer;
+                user-select: none;
+            }}
+
+            .wafer-stats-table th:first-child,
+            .wafer-stats-table td:first-child {{
+                text-align: left;
+            }}
+
+            .wafer-stats-table tr.below-standard td {{
+                background-color: #f8d7da;
+            }}
+
             /* Info Section */
             .info-section {{
                 margin-bottom: 30px;
@@ -2674,7 +6026,7 @@ def generate_result_html(data):
                 flex-wrap: wrap;
             }}
 
-            .axis-btn {{
+            .axis-btn, .follow-btn {{
                 padding: 10px 24px;
                 border: 2px solid rgba(255,255,255,0.3);
                 background: rgba(255,255,255,0.15);
@@ -2687,12 +6039,20 @@ def generate_result_html(data):
                 font-family: "Noto Sans TC", Arial, sans-serif;
             }}
 
-            .axis-btn:hover {{
+            .axis-btn:hover, .follow-btn:hover {{
                 background: rgba(255,255,255,0.25);
                 border-color: rgba(255,255,255,0.5);
                 transform: translateY(-1px);
             }}
 
+            .follow-btn:disabled {{
+                opacity: 0.5;
+                cursor: not-allowed;
+                transform: none;
+                background: rgba(255,255,255,0.15);
+                border-color: rgba(255,255,255,0.3);
+            }}
+
             .axis-btn.active {{
                 background: linear-gradient(135deg, #E0E0E0 0%, #FFFFFF 100%);
                 color: #2D2D2D;
@@ -2700,6 +6060,12 @@ def generate_result_html(data):
                 box-shadow: 0 2px 8px rgba(255, 255, 255, 0.3);
             }}
 
+            .follow-btn.active {{
+                background: linear-gradient(135deg, #43A047 0%, #66BB6A 100%);
+                border-color: #A5D6A7;
+                box-shadow: 0 2px 8px rgba(76, 175, 80, 0.4);
+            }}
+
             /* Statistics Container */
             .statistics-container {{
                 margin: 20px auto;
@@ -2813,7 +6179,7 @@ def generate_result_html(data):
         <div class="container">
             <!-- Header -->
             <div class="header">
-                <h1>AutoZ Wafer4P Aligner - {selected_machine_type}</h1>
+                <h1>AutoZ Wafer4P Aligner - {machine_type}</h1>
                 <p style="font-size: 14px;">Data Visualization Analytics Tool</p>
                 <p style="font-size: 14px;">Analysis Time: {timestamp}</p>
             </div>
@@ -2822,6 +6188,7 @@ def generate_result_html(data):
             <div class="tabs">
                 <div class="tab active" onclick="showTab('info')">Info</div>
                 <div class="tab" onclick="showTab('wafer-status')">Wafer Status</div>
+                <div class="tab" onclick="showTab('wafer-stats')">Wafer Statistics</div>
                 <div class="tab" onclick="showTab('charts')">Charts</div>
             </div>
 
@@ -2832,7 +6199,7 @@ def generate_result_html(data):
                     <div class="info-grid">
                         <div class="info-item">
                             <div class="info-label">Machine Type</div>
-                            <div class="info-value">{selected_machine_type}</div>
+                            <div class="info-value">{machine_type}</div>
                         </div>
                         <div class="info-item">
                             <div class="info-label">Analysis Time</div>
@@ -2840,7 +6207,7 @@ def generate_result_html(data):
                         </div>
                         <div class="info-item">
                             <div class="info-label">Status</div>
-                            <div class="info-value">Completed</div>
+                            <div class="info-value" id="analysisStatus">Completed</div>
                         </div>
                     </div>
                 </div>
@@ -2866,9 +6233,9 @@ def generate_result_html(data):
                 <div class="info-section">
                     <div class="info-title">Analysis Summary</div>
                     <div class="summary-box">
-                        <p><strong>Total Wafers:</strong> {total_wafers}</p>
-                        <p><strong>Total Data Points:</strong> {total_points:,}</p>
-                        <p><strong>Z Axis Anomalies:</strong> {anomaly_count} ({anomaly_percent:.2f}%)</p>
+                        <p><strong>Total Wafers:</strong> <span id="totalWafers">{total_wafers}</span></p>
+                        <p><strong>Total Data Points:</strong> <span id="totalPoints">{total_points:,}</span></p>
+                        <p><strong>Z Axis Anomalies:</strong> <span id="zAnomalySummary">-</span></p>
                         <p><strong>AutoZ Complete Points:</strong> Identified</p>
                     </div>
                 </div>
@@ -2876,7 +6243,28 @@ def generate_result_html(data):
 
             <!-- Wafer Status Tab Content -->
             <div id="wafer-status" class="tab-content">
-                {wafer_status_html}
+                <div class="tab-placeholder" id="waferStatusPlaceholder">Loading wafer status...</div>
+            </div>
+
+            <!-- Wafer Statistics Tab Content -->
+            <div id="wafer-stats" class="tab-content">
+                <div class="wafer-stats-toolbar">
+                    <label>Axis
+                        <select id="waferStatsAxis" onchange="changeWaferStatsAxis(this.value)">
+                            <option value="x">X</option>
+                            <option value="y">Y</option>
+                            <option value="z" selected>Z</option>
+                        </select>
+                    </label>
+                    <button id="waferStatsPrev" onclick="changeWaferStatsPage(-1)" disabled>&lt; Prev</button>
+                    <span id="waferStatsPageInfo"></span>
+                    <button id="waferStatsNext" onclick="changeWaferStatsPage(1)" disabled>Next &gt;</button>
+                </div>
+                <div class="tab-placeholder" id="waferStatsPlaceholder">Loading wafer statistics...</div>
+                <table class="wafer-stats-table" id="waferStatsTable" style="display: none;">
+                    <thead><tr id="waferStatsHeader"></tr></thead>
+                    <tbody id="waferStatsBody"></tbody>
+                </table>
             </div>
 
             <!-- Charts Tab Content -->
@@ -2889,12 +6277,14 @@ def generate_result_html(data):
                             <div>
                                 <div class="header-title">Axis Selection</div>
                                 <div class="header-subtitle">Select axis to display chart</div>
+                                <div class="header-subtitle" id="followStatus"></div>
                             </div>
                         </div>
                         <div class="axis-buttons">
                             <button class="axis-btn active" data-axis="z" onclick="switchAxis('z')">Z Axis</button>
                             <button class="axis-btn" data-axis="x" onclick="switchAxis('x')">X Axis</button>
                             <button class="axis-btn" data-axis="y" onclick="switchAxis('y')">Y Axis</button>
+                            <button class="follow-btn" id="followBtn" {follow_button_attrs}>Follow ALL.txt</button>
                         </div>
                     </div>
                 </div>
@@ -2902,15 +6292,13 @@ def generate_result_html(data):
                 <!-- Statistics Section -->
                 <div class="statistics-container">
                     <div class="stats-title" id="statsTitle">Z Data Statistics</div>
-                    <div id="statsContent">
-                        {z_stats_html}
-                    </div>
+                    <div id="statsContent"></div>
                 </div>
 
                 <!-- AutoZ Values Chart -->
                 <div class="chart-container" id="autoZValuesChartContainer">
                     <div class="chart-title">Z AutoZ Values</div>
-                    {z_html}
+                    <div id="newChart"></div>
                 </div>
 
                 <div class="section-divider"></div>
@@ -2918,7 +6306,7 @@ def generate_result_html(data):
                 <!-- Z Value Anomaly Analysis Chart -->
                 <div class="chart-container" id="anomalyChartContainer">
                     <div class="chart-title" id="anomalyChartTitle">Z Value Anomaly Analysis</div>
-                    <div id="anomalyChart">{z_anomaly_html}</div>
+                    <div id="anomalyChart"></div>
                 </div>
             </div>
         </div>
@@ -2932,7 +6320,27 @@ def generate_result_html(data):
             </div>
         </div>
 
+        <!-- Default Z axis chart data (other axes are fetched on demand) -->
+        <script type="application/json" id="initialChartData" data-etag="{z_chart_etag}">{initial_chart_json}</script>
+
         <script>
+            // ========== Session ==========
+            // Each tab keeps its own analysis session (kept across reloads) and sends it with every API request
+
+            const SESSION_ID = new URLSearchParams(window.location.search).get('sid') || sessionStorage.getItem('autozSessionId') || (
+                window.crypto && crypto.randomUUID
+                    ? crypto.randomUUID()
+                    : Date.now().toString(36) + Math.random().toString(36).slice(2)
+            );
+            sessionStorage.setItem('autozSessionId', SESSION_ID);
+
+            const nativeFetch = window.fetch.bind(window);
+            window.fetch = (url, options = {{}}) => {{
+                const headers = new Headers(options.headers || {{}});
+                headers.set('X-Session-Id', SESSION_ID);
+                return nativeFetch(url, {{ ...options, headers }});
+            }};
+
             // ========== Browser close detection mechanism ==========
 
             let isNormalNavigation = false;
@@ -2965,8 +6373,163 @@ def generate_result_html(data):
                 document.getElementById(tabName).style.display = "block";
                 document.getElementById(tabName).classList.add("active");
                 event.target.classList.add("active");
+
+                if (tabName === 'wafer-status') {{
+                    loadWaferStatus();
+                }} else if (tabName === 'wafer-stats' && !waferStatsLoaded) {{
+                    loadWaferStats();
+                }}
+            }}
+
+            // Wafer status dashboard is loaded the first time its tab is opened
+            let waferStatusLoaded = false;
+
+            async function loadWaferStatus() {{
+                if (waferStatusLoaded) return;
+                waferStatusLoaded = true;
+
+                try {{
+                    const response = await fetch('/api/wafer_status');
+                    const result = await response.json();
+
+                    if (result.success) {{
+                        document.getElementById('wafer-status').innerHTML = result.html;
+                    }} else {{
+                        waferStatusLoaded = false;
+                        document.getElementById('waferStatusPlaceholder').textContent = 'Failed to load wafer status: ' + result.error;
+                    }}
+                }} catch (error) {{
+                    waferStatusLoaded = false;
+                    console.error('Error loading wafer status:', error);
+                    document.getElementById('waferStatusPlaceholder').textContent = 'Error loading wafer status. Please try again.';
+                }}
+            }}
+
+            // ========== Per-wafer statistics (sorted and paged by the server) ==========
+
+            // Columns marked "axis" belong to the selected axis (sort key "<axis>_<key>")
+            const WAFER_STATS_COLUMNS = [
+                {{ key: 'wafer', label: 'Wafer ID' }},
+                {{ key: 'start', label: 'Order' }},
+                {{ key: 'count', label: 'Points', axis: true }},
+                {{ key: 'min', label: 'Min (µm)', axis: true, digits: 4 }},
+                {{ key: 'max', label: 'Max (µm)', axis: true, digits: 4 }},
+                {{ key: 'mean', label: 'Mean (µm)', axis: true, digits: 4 }},
+                {{ key: 'std', label: 'Std Dev (µm)', axis: true, digits: 4 }},
+                {{ key: 'range', label: 'Range (µm)', axis: true, digits: 4 }},
+                {{ key: 'below', label: 'Below Standard', axis: true }}
+            ];
+            const waferStatsState = {{ axis: 'z', column: 'start', order: 'asc', page: 1, pages: 1, pageSize: {WAFER_STATS_PAGE_SIZE} }};
+            let waferStatsLoaded = false;
+            let waferStatsRequestId = 0;
+
+            function waferStatsSortKey(column) {{
+                return column.axis ? waferStatsState.axis + '_' + column.key : column.key;
+            }}
+
+            function sortWaferStats(column) {{
+                if (waferStatsState.column === column.key) {{
+                    waferStatsState.order = waferStatsState.order === 'asc' ? 'desc' : 'asc';
+                }} else {{
+                    waferStatsState.column = column.key;
+                    waferStatsState.order = column.axis ? 'desc' : 'asc';
+                }}
+                waferStatsState.page = 1;
+                loadWaferStats();
+            }}
+
+            function changeWaferStatsAxis(axis) {{
+                waferStatsState.axis = axis;
+                waferStatsState.page = 1;
+                loadWaferStats();
+            }}
+
+            function changeWaferStatsPage(step) {{
+                waferStatsState.page = Math.min(Math.max(waferStatsState.page + step, 1), waferStatsState.pages);
+                loadWaferStats();
+            }}
+
+            async function loadWaferStats() {{
+                waferStatsLoaded = true;
+                const requestId = ++waferStatsRequestId;
+                const column = WAFER_STATS_COLUMNS.find(item => item.key === waferStatsState.column);
+                const params = new URLSearchParams({{
+                    sort: waferStatsSortKey(column),
+                    order: waferStatsState.order,
+                    page: waferStatsState.page,
+                    page_size: waferStatsState.pageSize
+                }});
+
+                try {{
+                    const response = await fetch('/api/wafer_stats?' + params);
+                    const result = await response.json();
+                    if (requestId !== waferStatsRequestId) return;
+
+                    if (result.success) {{
+                        renderWaferStats(result);
+                    }} else {{
+                        waferStatsLoaded = false;
+                        document.getElementById('waferStatsPlaceholder').textContent = 'Failed to load wafer statistics: ' + result.error;
+                    }}
+                }} catch (error) {{
+                    waferStatsLoaded = false;
+                    console.error('Error loading wafer statistics:', error);
+                    document.getElementById('waferStatsPlaceholder').textContent = 'Error loading wafer statistics. Please try again.';
+                }}
+            }}
+
+            function renderWaferStats(result) {{
+                const axis = waferStatsState.axis;
+                waferStatsState.page = result.page;
+                waferStatsState.pages = result.pages;
+
+                // Header: click to sort, arrow on the current sort column
+                const header = document.getElementById('waferStatsHeader');
+                header.innerHTML = '';
+                WAFER_STATS_COLUMNS.forEach(column => {{
+                    const th = document.createElement('th');
+                    const arrow = waferStatsSortKey(column) === result.sort ? (result.order === 'asc' ? ' ▲' : ' ▼') : '';
+                    th.textContent = (column.axis ? axis.toUpperCase() + ' ' : '') + column.label + arrow;
+                    th.onclick = () => sortWaferStats(column);
+                    header.appendChild(th);
+                }});
+
+                // Rows (wafer IDs are inserted as text, never as HTML)
+                const body = document.getElementById('waferStatsBody');
+                body.innerHTML = '';
+                result.rows.forEach(row => {{
+                    const tr = document.createElement('tr');
+                    if (row[axis + '_below'] > 0) {{
+                        tr.className = 'below-standard';
+                    }}
+                    WAFER_STATS_COLUMNS.forEach(column => {{
+                        const td = document.createElement('td');
+                        const value = row[waferStatsSortKey(column)];
+                        if (value === null) {{
+                            td.textContent = '-';
+                        }} else if (column.key === 'start') {{
+                            td.textContent = value + 1;
+                        }} else if (column.digits) {{
+                            td.textContent = value.toFixed(column.digits);
+                        }} else {{
+                            td.textContent = typeof value === 'number' ? value.toLocaleString() : value;
+                        }}
+                        tr.appendChild(td);
+                    }});
+                    body.appendChild(tr);
+                }});
+
+                document.getElementById('waferStatsPlaceholder').style.display = 'none';
+                document.getElementById('waferStatsTable').style.display = '';
+                document.getElementById('waferStatsPageInfo').textContent =
+                    `Page ${{result.page}} / ${{result.pages}} · ${{result.total.toLocaleString()}} wafers`;
+                document.getElementById('waferStatsPrev').disabled = result.page <= 1;
+                document.getElementById('waferStatsNext').disabled = result.page >= result.pages;
             }}
 
+            // Chart responses already received, keyed by axis (revalidated with ETag)
+            const chartResponseCache = {{}};
+
             // Axis switching function
             async function switchAxis(axisType) {{
                 // Update button states
@@ -2984,45 +6547,35 @@ def generate_result_html(data):
 
                 try {{
                     // Call API to regenerate chart
+                    const headers = {{ 'Content-Type': 'application/json' }};
+                    const cachedEntry = chartResponseCache[axisType];
+                    if (cachedEntry) {{
+                        headers['If-None-Match'] = cachedEntry.etag;
+                    }}
+
                     const response = await fetch('/api/regenerate_chart', {{
                         method: 'POST',
-                        headers: {{ 'Content-Type': 'application/json' }},
-                        body: JSON.stringify({{ axis_type: axisType }})
+                        headers: headers,
+                        body: JSON.stringify({{ axis_type: axisType, encoding: 'binary' }})
                     }});
 
-                    const result = await response.json();
+                    let result;
+                    if (response.status === 304 && cachedEntry) {{
+                        result = cachedEntry.result;
+                    }} else {{
+                        result = await response.json();
+                        if (result.success) {{
+                            decodeChartArrays(result.main_chart);
+                            decodeChartArrays(result.anomaly_chart);
+                        }}
+                        const etag = response.headers.get('ETag');
+                        if (result.success && etag) {{
+                            chartResponseCache[axisType] = {{ etag: etag, result: result }};
+                        }}
+                    }}
 
                     if (result.success) {{
-                        // Update stats title
-                        const statsTitle = document.getElementById('statsTitle');
-                        statsTitle.textContent = axisType.toUpperCase() + ' Data Statistics';
-
-                        // Update statistics data
-                        const stats = result.stats;
-                        const statsHtml = `
-                            <div class="statistics-box">
-                                <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Min:</span> <span class="stat-value">${{stats.min.toFixed(4)}} µm</span></div>
-                                <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Max:</span> <span class="stat-value">${{stats.max.toFixed(4)}} µm</span></div>
-                                <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Mean:</span> <span class="stat-value">${{stats.mean.toFixed(4)}} µm</span></div>
-                                <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Median:</span> <span class="stat-value">${{stats.median.toFixed(4)}} µm</span></div>
-                                <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Std Dev:</span> <span class="stat-value">${{stats.std.toFixed(4)}} µm</span></div>
-                                <div class="stat-item"><span class="stat-label">Data Points:</span> <span class="stat-value">${{stats.count.toLocaleString()}}</span></div>
-                            </div>
-                        `;
-                        document.getElementById('statsContent').innerHTML = statsHtml;
-
-                        // Update main chart
-                        const chartContainer = document.getElementById('autoZValuesChartContainer');
-                        chartContainer.innerHTML = '<div class="chart-title">' + axisType.toUpperCase() + ' AutoZ Values</div><div id="newChart"></div>';
-                        Plotly.newPlot('newChart', result.main_chart.data, result.main_chart.layout, {{responsive: true}});
-
-                        // Update anomaly chart
-                        const anomalyContainer = document.getElementById('anomalyChartContainer');
-                        anomalyContainer.innerHTML = `
-                            <div class="chart-title" id="anomalyChartTitle">${{axisType.toUpperCase()}} Value Anomaly Analysis</div>
-                            <div id="anomalyChart"></div>
-                        `;
-                        Plotly.newPlot('anomalyChart', result.anomaly_chart.data, result.anomaly_chart.layout, {{responsive: true}});
+                        renderChartResult(axisType, result);
                     }} else {{
                         console.error('Failed to regenerate chart:', result.error);
                         alert('Failed to load chart: ' + result.error);
@@ -3036,43 +6589,861 @@ def generate_result_html(data):
                 }}
             }}
 
-            // Heartbeat mechanism
-            setInterval(() => {{
+            // ========== Typed array decoding (binary chart encoding) ==========
+
+            const TYPED_ARRAY_TYPES = {{
+                f8: Float64Array, f4: Float32Array,
+                i4: Int32Array, u4: Uint32Array,
+                i2: Int16Array, u2: Uint16Array,
+                i1: Int8Array, u1: Uint8Array
+            }};
+
+            // Decode a base64 little-endian typed array spec into a TypedArray
+            function decodeTypedArray(value) {{
+                if (!value || typeof value !== 'object' || typeof value.bdata !== 'string') {{
+                    return value;
+                }}
+                const binary = atob(value.bdata);
+                const bytes = new Uint8Array(binary.length);
+                for (let i = 0; i < binary.length; i++) {{
+                    bytes[i] = binary.charCodeAt(i);
+                }}
+                return new TYPED_ARRAY_TYPES[value.dtype](bytes.buffer);
+            }}
+
+            function decodeChartArrays(chart) {{
+                chart.data.forEach(trace => {{
+                    trace.x = decodeTypedArray(trace.x);
+                    trace.y = decodeTypedArray(trace.y);
+                    if (trace.marker) {{
+                        trace.marker.size = decodeTypedArray(trace.marker.size);
+                    }}
+                }});
+                return chart;
+            }}
+
+            // Axis and dataset version of the charts currently on screen
+            let currentAxis = 'z';
+            let chartVersion = null;
+            // Render tier and point count the charts on screen were built with (follow updates extend them)
+            let chartRenderTier = null;
+            let chartBasePoints = 0;
+
+            // ========== Zoom refinement (decimated overview -> detailed window) ==========
+
+            // Main values trace of a decimated overview, restored when the zoom is reset
+            let mainOverview = null;
+            let windowRequestId = 0;
+
+            function mainTraceUpdate(trace) {{
+                const update = {{ x: [trace.x], y: [trace.y], text: [trace.text] }};
+                if (trace.marker && Array.isArray(trace.marker.color)) {{
+                    update['marker.color'] = [trace.marker.color];
+                    update['marker.size'] = [trace.marker.size];
+                }}
+                return update;
+            }}
+
+            function trackMainOverview(axisType, result) {{
+                mainOverview = null;
+                if (!result.decimated) return;
+                const chartDiv = document.getElementById('newChart');
+                const index = result.main_chart.data.findIndex(trace => trace.name === axisType.toUpperCase() + ' Values');
+                if (index < 0) return;
+                mainOverview = {{ index: index, update: mainTraceUpdate(result.main_chart.data[index]) }};
+                chartDiv.on('plotly_relayout', refineMainChart);
+            }}
+
+            // Replace the overview with the points of the visible index range
+            async function refineMainChart(event) {{
+                if (!mainOverview) return;
+                const chartDiv = document.getElementById('newChart');
+                const requestId = ++windowRequestId;
+
+                let range = null;
+                if ('xaxis.range[0]' in event) {{
+                    range = [event['xaxis.range[0]'], event['xaxis.range[1]']];
+                }} else if (Array.isArray(event['xaxis.range'])) {{
+                    range = event['xaxis.range'];
+                }}
+                if (!range) {{
+                    if (event['xaxis.autorange']) {{
+                        Plotly.restyle(chartDiv, mainOverview.update, [mainOverview.index]);
+                    }}
+                    return;
+                }}
+
+                try {{
+                    const params = new URLSearchParams({{
+                        axis: currentAxis,
+                        start: Math.floor(range[0]),
+                        stop: Math.ceil(range[1]) + 1,
+                        encoding: 'binary'
+                    }});
+                    const response = await fetch('/api/chart_window?' + params);
+                    const result = await response.json();
+                    if (requestId !== windowRequestId || !result.success || result.version !== chartVersion) {{
+                        return;
+                    }}
+                    decodeChartArrays(result.window);
+                    Plotly.restyle(chartDiv, mainTraceUpdate(result.window.data[0]), [mainOverview.index]);
+                }} catch (error) {{
+                    console.error('Error loading chart window:', error);
+                }}
+            }}
+
+            function renderStats(axisType, stats) {{
+                // Update stats title
+                const statsTitle = document.getElementById('statsTitle');
+                statsTitle.textContent = axisType.toUpperCase() + ' Data Statistics';
+
+                // Update statistics data
+                const statsHtml = `
+                    <div class="statistics-box">
+                        <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Min:</span> <span class="stat-value">${{stats.min.toFixed(4)}} µm</span></div>
+                        <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Max:</span> <span class="stat-value">${{stats.max.toFixed(4)}} µm</span></div>
+                        <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Mean:</span> <span class="stat-value">${{stats.mean.toFixed(4)}} µm</span></div>
+                        <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Median:</span> <span class="stat-value">${{stats.median.toFixed(4)}} µm</span></div>
+                        <div class="stat-item"><span class="stat-label">${{axisType.toUpperCase()}} Std Dev:</span> <span class="stat-value">${{stats.std.toFixed(4)}} µm</span></div>
+                        <div class="stat-item"><span class="stat-label">Data Points:</span> <span class="stat-value">${{stats.count.toLocaleString()}}</span></div>
+                    </div>
+                `;
+                document.getElementById('statsContent').innerHTML = statsHtml;
+            }}
+
+            // Large lots are drawn with WebGL or as min/max envelopes (chosen by the server)
+            const RENDER_TIER_LABELS = {{ webgl: ' (WebGL)', envelope: ' (Min/Max Envelope)' }};
+
+            // Render statistics, main chart and anomaly chart for one axis
+            function renderChartResult(axisType, result) {{
+                currentAxis = axisType;
+                chartVersion = result.version;
+                chartRenderTier = result.render_tier;
+                chartBasePoints = result.stats.count;
+                renderStats(axisType, result.stats);
+                const tierLabel = RENDER_TIER_LABELS[result.render_tier] || '';
+                // The main chart draws its (decimated) points with WebGL in both non-SVG tiers
+                const mainTierLabel = result.render_tier === 'svg' ? '' : RENDER_TIER_LABELS.webgl;
+                const overviewLabel = result.decimated ? ' (Min/Max Overview, zoom in for detail)' : '';
+
+                // Update main chart
+                const chartContainer = document.getElementById('autoZValuesChartContainer');
+                chartContainer.innerHTML = '<div class="chart-title">' + axisType.toUpperCase() + ' AutoZ Values' + mainTierLabel + overviewLabel + '</div><div id="newChart"></div>';
+                Plotly.newPlot('newChart', result.main_chart.data, result.main_chart.layout, {{responsive: true}});
+                trackMainOverview(axisType, result);
+
+                // Update anomaly chart
+                const anomalyContainer = document.getElementById('anomalyChartContainer');
+                anomalyContainer.innerHTML = `
+                    <div class="chart-title" id="anomalyChartTitle">${{axisType.toUpperCase()}} Value Anomaly Analysis${{tierLabel}}</div>
+                    <div id="anomalyChart"></div>
+                `;
+                Plotly.newPlot('anomalyChart', result.anomaly_chart.data, result.anomaly_chart.layout, {{responsive: true}});
+            }}
+
+            // Render the inline default Z view and seed the response cache with it
+            (function renderInitialChart() {{
+                const initialData = document.getElementById('initialChartData');
+                const result = JSON.parse(initialData.textContent);
+                decodeChartArrays(result.main_chart);
+                decodeChartArrays(result.anomaly_chart);
+                chartResponseCache['z'] = {{ etag: '"' + initialData.dataset.etag + '"', result: result }};
+                renderChartResult('z', result);
+
+                const anomalyStats = result.anomaly_stats;
+                document.getElementById('zAnomalySummary').textContent =
+                    `${{anomalyStats.anomaly_points}} (${{anomalyStats.anomaly_percent.toFixed(2)}}%)`;
+            }})();
+
+            // ========== Follow mode (append new wafers while ALL.txt grows) ==========
+
+            const FOLLOW_POLL_INTERVAL = {FOLLOW_POLL_INTERVAL * 1000};
+            let followTimer = null;
+            let followPolling = false;
+
+            function setFollowStatus(text) {{
+                document.getElementById('followStatus').textContent = text;
+            }}
+
+            async function toggleFollow() {{
+                const followBtn = document.getElementById('followBtn');
+
+                if (followTimer) {{
+                    clearInterval(followTimer);
+                    followTimer = null;
+                    followBtn.classList.remove('active');
+                    document.getElementById('analysisStatus').textContent = 'Completed';
+                    setFollowStatus('');
+                    fetch('/api/follow/stop', {{ method: 'POST' }});
+                    return;
+                }}
+
+                try {{
+                    const response = await fetch('/api/follow/start', {{ method: 'POST' }});
+                    const result = await response.json();
+                    if (!result.success) {{
+                        // Follow cannot start for this analysis; disable the button instead of failing on every click
+                        followBtn.disabled = true;
+                        followBtn.title = result.error;
+                        setFollowStatus(result.error);
+                        return;
+                    }}
+                    followBtn.classList.add('active');
+                    document.getElementById('analysisStatus').textContent = 'Following';
+                    setFollowStatus('Following ALL.txt from byte ' + result.offset.toLocaleString());
+                    followTimer = setInterval(pollFollow, FOLLOW_POLL_INTERVAL);
+                }} catch (error) {{
+                    console.error('Error starting follow mode:', error);
+                    alert('Error starting follow mode. Please try again.');
+                }}
+            }}
+
+            // Plotly extends typed arrays in their own type, so widen decoded x/y to Float64 first
+            function widenTypedArrays(trace) {{
+                ['x', 'y'].forEach(key => {{
+                    if (ArrayBuffer.isView(trace[key]) && !(trace[key] instanceof Float64Array)) {{
+                        trace[key] = Float64Array.from(trace[key]);
+                    }}
+                }});
+            }}
+
+            // Per-point marker arrays are extended only where the trace has them (SVG tier)
+            function extendTrace(div, traceIndex, points, color, size, symbol) {{
+                const count = points.x.length;
+                if (!count) return;
+                const trace = div.data[traceIndex];
+                widenTypedArrays(trace);
+                const update = {{ x: [points.x], y: [points.y] }};
+                if (points.text) {{
+                    update.text = [points.text];
+                }}
+                const marker = trace.marker || {{}};
+                [['color', color], ['size', size], ['symbol', symbol]].forEach(([key, value]) => {{
+                    if (value !== undefined && Array.isArray(marker[key])) {{
+                        update['marker.' + key] = [new Array(count).fill(value)];
+                    }}
+                }});
+                Plotly.extendTraces(div, update, [traceIndex]);
+            }}
+
+            // Keep the restorable overview of a decimated main chart in step with appended points
+            function extendMainOverview(points) {{
+                if (!mainOverview || !points.x.length) return;
+                const update = mainOverview.update;
+                update.x = [Array.from(update.x[0]).concat(points.x)];
+                update.y = [Array.from(update.y[0]).concat(points.y)];
+                update.text = [Array.from(update.text[0]).concat(points.text)];
+                if (update['marker.color']) {{
+                    update['marker.color'] = [Array.from(update['marker.color'][0]).concat(new Array(points.x.length).fill('#93A1C1'))];
+                    update['marker.size'] = [Array.from(update['marker.size'][0]).concat(new Array(points.x.length).fill(8))];
+                }}
+            }}
+
+            // Append the points of a follow update to the charts on screen (false if a full reload is needed)
+            function applyChartDelta(axisType, delta) {{
+                const mainDiv = document.getElementById('newChart');
+                const anomalyDiv = document.getElementById('anomalyChart');
+                const label = axisType.toUpperCase();
+                const findTrace = (div, test) => div.data.findIndex(trace => test(trace.name || ''));
+                const main = delta.main;
+                const envelope = delta.anomaly.envelope;
+
+                // A new render tier changes the trace types; once the lot has doubled, a rebuilt overview is
+                // smaller than the extended one; a chart that becomes decimated needs zoom refinement
+                if (delta.render_tier !== chartRenderTier
+                        || main.point_count > 2 * chartBasePoints
+                        || (main.decimated && !mainOverview)) {{
+                    return false;
+                }}
+
+                const mainTrace = findTrace(mainDiv, name => name === label + ' Values');
+                const boundaryTrace = findTrace(mainDiv, name => name === 'Wafer Boundaries');
+                const normalTrace = findTrace(anomalyDiv, name => name === 'Normal Points');
+                const anomalyTrace = findTrace(anomalyDiv, name => name === 'Below Standard');
+                const minTrace = findTrace(anomalyDiv, name => name === 'Points Min');
+                const maxTrace = findTrace(anomalyDiv, name => name.startsWith('All Points'));
+                if (mainTrace < 0) {{
+                    return false;
+                }}
+                if (envelope) {{
+                    if (minTrace < 0 || maxTrace < 0 || (envelope.below.x.length && anomalyTrace < 0)) {{
+                        return false;
+                    }}
+                }} else if ((delta.anomaly.normal.x.length && normalTrace < 0)
+                        || (delta.anomaly.anomaly.x.length && anomalyTrace < 0)) {{
+                    return false;
+                }}
+
+                // Main chart: new (decimated) points, new wafer boundaries and the standard line span
+                extendTrace(mainDiv, mainTrace, main, '#93A1C1', 8);
+                extendMainOverview(main);
+                // Lots with more wafers than the overview limit are drawn without boundary lines
+                if (boundaryTrace >= 0) {{
+                    if (main.boundaries.length) {{
+                        const boundaryX = [];
+                        main.boundaries.forEach(position => boundaryX.push(position, position, null));
+                        Plotly.extendTraces(mainDiv, {{ x: [boundaryX] }}, [boundaryTrace]);
+                    }}
+                    const boundaryY = [];
+                    for (let i = 0; i < mainDiv.data[boundaryTrace].x.length / 3; i++) {{
+                        boundaryY.push(main.min, main.max, null);
+                    }}
+                    Plotly.restyle(mainDiv, {{ y: [boundaryY] }}, [boundaryTrace]);
+                }}
+
+                const mainStandard = findTrace(mainDiv, name => name === label + ' Standard');
+                if (mainStandard >= 0) {{
+                    Plotly.restyle(mainDiv, {{ x: [[0, main.point_count - 1]] }}, [mainStandard]);
+                    if (mainDiv.layout.annotations && mainDiv.layout.annotations.length) {{
+                        Plotly.relayout(mainDiv, {{ 'annotations[0].x': (main.point_count - 1) / 2 }});
+                    }}
+                }}
+
+                // Anomaly chart: normal / below-standard points (or new envelope buckets) and the standard line span
+                if (envelope) {{
+                    extendTrace(anomalyDiv, minTrace, {{ x: envelope.x, y: envelope.min }});
+                    extendTrace(anomalyDiv, maxTrace, {{ x: envelope.x, y: envelope.max }});
+                    extendTrace(anomalyDiv, anomalyTrace, envelope.below);
+                }} else {{
+                    extendTrace(anomalyDiv, normalTrace, delta.anomaly.normal, '#4CAF50', 8, 'circle');
+                    extendTrace(anomalyDiv, anomalyTrace, delta.anomaly.anomaly, '#F44336', 10, 'circle');
+                }}
+                const anomalyStandard = findTrace(anomalyDiv, name => name.startsWith(label + ' Standard'));
+                if (anomalyStandard >= 0) {{
+                    Plotly.restyle(anomalyDiv, {{ x: [[0, delta.anomaly.point_count]] }}, [anomalyStandard]);
+                }}
+
+                renderStats(axisType, delta.stats);
+                if (axisType === 'z') {{
+                    const anomalyStats = delta.anomaly_stats;
+                    document.getElementById('zAnomalySummary').textContent =
+                        `${{anomalyStats.anomaly_points}} (${{anomalyStats.anomaly_percent.toFixed(2)}}%)`;
+                }}
+                return true;
+            }}
+
+            async function pollFollow() {{
+                if (followPolling) return;
+                followPolling = true;
+
+                try {{
+                    const axisType = currentAxis;
+                    const response = await fetch(`/api/follow?axis=${{axisType}}&version=${{chartVersion}}`);
+                    const result = await response.json();
+
+                    if (!result.success) {{
+                        setFollowStatus(result.error);
+                        return;
+                    }}
+
+                    const checkedAt = new Date().toLocaleTimeString();
+                    if (!result.changed) {{
+                        setFollowStatus(`Following ALL.txt · ${{result.offset.toLocaleString()}} bytes · checked ${{checkedAt}}`);
+                        return;
+                    }}
+
+                    // Cached responses of every axis are now stale
+                    Object.keys(chartResponseCache).forEach(axis => delete chartResponseCache[axis]);
+
+                    if (result.delta && axisType === currentAxis && applyChartDelta(axisType, result.delta)) {{
+                        chartVersion = result.version;
+                    }} else {{
+                        await switchAxis(currentAxis);
+                    }}
+
+                    document.getElementById('totalWafers').textContent = result.summary.total_wafers;
+                    document.getElementById('totalPoints').textContent = result.summary.total_points.toLocaleString();
+
+                    // Wafer status is rebuilt the next time its tab is shown
+                    waferStatusLoaded = false;
+                    if (document.getElementById('wafer-status').classList.contains('active')) {{
+                        loadWaferStatus();
+                    }}
+                    waferStatsLoaded = false;
+                    if (document.getElementById('wafer-stats').classList.contains('active')) {{
+                        loadWaferStats();
+                    }}
+
+                    setFollowStatus(`Following ALL.txt · ${{result.offset.toLocaleString()}} bytes · updated ${{checkedAt}}`);
+                }} catch (error) {{
+                    console.error('Error polling ALL.txt:', error);
+                    setFollowStatus('Error polling ALL.txt, retrying...');
+                }} finally {{
+                    followPolling = false;
+                }}
+            }}
+
+            // Heartbeat mechanism (the first beat registers this tab's session with the server)
+            function sendHeartbeat() {{
                 fetch('/api/heartbeat', {{
                     method: 'POST',
                     headers: {{ 'Content-Type': 'application/json' }}
                 }}).catch(error => {{
                     console.error('Heartbeat failed:', error);
                 }});
-            }}, 60000);
+            }}
+            sendHeartbeat();
+            setInterval(sendHeartbeat, 60000);
         </script>
     </body>
     </html>
     '''
 
-    return html
+    return link_mirrored_assets(html)
+
+# 效能量測
+def benchmark_line_chart(wafer_counts=(100, 500, 1000, 2000, 5000), points_per_wafer=50):
+    """量測主折線圖的建圖時間與 JSON 大小對晶圓數的變化
+
+    Build 為直接建立字典 (路由使用的路徑),go.Figure 為同一份字典再經 Plotly 驗證所需的時間 (僅匯出時使用)。
+    使用隨機產生的資料集,執行方式: 主程式加上 --benchmark 參數
+    """
+    import plotly.graph_objects as go
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'Wafers':>8} {'Points':>10} {'Traces':>7} {'Build (ms)':>11} {'JSON (ms)':>10} "
+          f"{'go.Figure (ms)':>15} {'JSON (KB)':>10}")
+    for wafer_count in wafer_counts:
+        point_count = wafer_count * points_per_wafer
+        offsets = np.arange(0, point_count + 1, points_per_wafer, dtype=np.int64)
+        dataset = WaferDataset(
+            [f"W{i:05d}" for i in range(wafer_count)],
+            list(range(wafer_count)),
+            {axis: rng.normal(0, 5, point_count) for axis in WaferDataset.AXES},
+            {axis: offsets for axis in WaferDataset.AXES}
+        )
+        dataset.sorted_axis('z')
+
+        start = time.perf_counter()
+        figure, _ = build_line_chart_figure(dataset, 'z', 0.0, {'x': 0.0, 'y': 0.0, 'z': 0.0})
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        figure_json = app.json.dumps(figure)
+        json_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        go.Figure(figure)
+        validate_time = time.perf_counter() - start
+
+        print(f"{wafer_count:>8} {point_count:>10,} {len(figure['data']):>7} {build_time * 1000:>11.1f} "
+              f"{json_time * 1000:>10.1f} {validate_time * 1000:>15.1f} {len(figure_json) / 1024:>10.1f}")
+
+def get_peak_rss():
+    """目前行程的峰值常駐記憶體 (bytes),無法取得時回傳 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage'
+                )
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except Exception:
+        pass
+    return None
+
+def measure_all_txt_parse(module_name, autoz_log_path, all_txt_path, mode):
+    """子行程：解析 ALL.txt 並建立資料集,回傳 (秒數, 峰值記憶體增量, 晶圓數)
+
+    mode 為 'whole' (process_all_txt 一次解析整個檔案) 或 'chunked' (parse_all_txt 依紀錄邊界分段解析)
+    """
+    global PARALLEL_PARSE_WORKERS
+    PARALLEL_PARSE_WORKERS = 1  # 只量測本行程,不啟動平行解析
+    module = import_processor_module(module_name)
+    timestamp = module.process_autoz_log(autoz_log_path)
+
+    peak_before = get_peak_rss()
+    start = time.perf_counter()
+    if mode == 'whole':
+        result = module.process_all_txt(all_txt_path, timestamp)
+    else:
+        result = parse_all_txt(module, all_txt_path, timestamp)
+    dataset = WaferDataset.from_wafer_data(result['wafer_data'])
+
+    elapsed = time.perf_counter() - start
+    peak_after = get_peak_rss()
+    peak_delta = peak_after - peak_before if peak_before is not None and peak_after is not None else None
+    return elapsed, peak_delta, dataset.n_wafers
+
+def benchmark_all_txt_memory(module_name, autoz_log_path, all_txt_path):
+    """量測整檔解析與分段解析同一個 ALL.txt 的時間與峰值記憶體,每個量測在新的子行程中執行
+
+    執行方式: 主程式加上 --benchmark-memory <機台類型> <AutoZLog.txt> <ALL.txt> 參數
+    """
+    size_mb = os.path.getsize(all_txt_path) / 1024 / 1024
+    print(f"ALL.txt: {all_txt_path} ({size_mb:.1f} MB), module {module_name}")
+    print(f"{'Mode':>8} {'Time (s)':>9} {'Peak RSS +MB':>13} {'Wafers':>7}")
+    for mode in ('whole', 'chunked'):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            elapsed, peak_delta, wafer_count = executor.submit(
+                measure_all_txt_parse, module_name, autoz_log_path, all_txt_path, mode
+            ).result()
+        peak_text = f"{peak_delta / 1024 / 1024:.1f}" if peak_delta is not None else '-'
+        print(f"{mode:>8} {elapsed:>9.2f} {peak_text:>13} {wafer_count:>7}")
+
+# 批次處理 (命令列模式)
+#
+# 不啟動 Flask、Tkinter 與瀏覽器,以行程池同時分析多個批次。每個批次資料夾需包含 AutoZLog.txt 與 ALL.txt,
+# 也可用 --pair 直接指定檔案。每個批次寫出摘要 JSON (各軸統計、異常點統計與 Wafer 狀態),
+# 全部批次彙整為 summary.csv,並可選擇輸出獨立的 HTML 報告。
+# 執行方式: 主程式加上 --batch 參數,例如 --batch J750 "D:\Lots\*" --html
+
+def find_lot_files(folder):
+    """在批次資料夾中尋找 AutoZLog.txt 與 ALL.txt (不分大小寫),找不到的項目為 None"""
+    names = {name.lower(): name for name in os.listdir(folder)}
+    autoz_log = names.get(BATCH_AUTOZ_LOG_NAME.lower())
+    all_txt = names.get(BATCH_ALL_TXT_NAME.lower())
+    return (
+        os.path.join(folder, autoz_log) if autoz_log else None,
+        os.path.join(folder, all_txt) if all_txt else None
+    )
+
+def collect_batch_lots(patterns, pairs=()):
+    """展開批次資料夾路徑 (可含萬用字元) 並加上明確指定的檔案對
+
+    Args:
+        patterns: 批次資料夾路徑或 glob 樣式
+        pairs: (AutoZLog.txt, ALL.txt) 檔案對,批次名稱取 ALL.txt 所在資料夾名稱
+
+    Returns:
+        tuple: (lots, skipped) lots 為 (批次名稱, AutoZLog 路徑, ALL.txt 路徑) 列表,
+            skipped 為缺少檔案而略過的路徑
+    """
+    lots = []
+    skipped = []
+    seen = set()
+
+    for pattern in patterns:
+        for folder in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.normcase(os.path.abspath(folder)) in seen:
+                continue
+            seen.add(os.path.normcase(os.path.abspath(folder)))
+
+            autoz_log, all_txt = find_lot_files(folder) if os.path.isdir(folder) else (None, None)
+            if autoz_log is None or all_txt is None:
+                skipped.append(folder)
+                continue
+            lots.append((os.path.basename(os.path.normpath(folder)), autoz_log, all_txt))
+
+    for autoz_log, all_txt in pairs:
+        lots.append((os.path.basename(os.path.dirname(os.path.abspath(all_txt))), autoz_log, all_txt))
+
+    # 同名批次加上序號,避免輸出檔案互相覆蓋
+    name_counts = {}
+    unique_lots = []
+    for name, autoz_log, all_txt in lots:
+        name = re.sub(r'[^\w.-]+', '_', name) or 'lot'
+        name_counts[name] = name_counts.get(name, 0) + 1
+        if name_counts[name] > 1:
+            name = f"{name}_{name_counts[name]}"
+        unique_lots.append((name, autoz_log, all_txt))
+
+    return unique_lots, skipped
+
+def summarize_analysis(analysis_data):
+    """整理分析資料的摘要:各軸統計、異常點統計與 Wafer 狀態 (數值與結果頁面相同)"""
+    dataset = analysis_data['dataset']
+    axes = {}
+    for axis_type in WaferDataset.AXES:
+        standard_value = float(analysis_data[f"{axis_type}_standard"])
+        # 與圖表相同,第一個點為 AutoZ complete 點
+        values = np.concatenate(([standard_value], dataset.sorted_axis(axis_type).values))
+        axes[axis_type] = {
+            'standard': standard_value,
+            'stats': compute_axis_stats(values),
+            'anomaly_stats': compute_anomaly_stats(values, standard_value)
+        }
+
+    return {
+        'total_wafers': dataset.n_wafers,
+        'total_points': dataset.point_count('z'),
+        'axes': axes,
+        'wafer_status': compute_wafer_status(dataset, analysis_data['z_standard'])
+    }
+
+def generate_report_html(analysis_data, machine_type, lot_name, summary, plotly_js_src='plotly.min.js'):
+    """生成獨立的 HTML 報告 (各軸主圖表、異常分析圖表與 Wafer 狀態),不需伺服器即可開啟
+
+    Args:
+        analysis_data: 分析資料
+        machine_type: 機台類型
+        lot_name: 批次名稱
+        summary: summarize_analysis 的結果
+        plotly_js_src: Plotly.js 的路徑 (多份報告共用同一個檔案)
+    """
+    dataset = analysis_data['dataset']
+    standard_point_data = {axis: analysis_data[f"{axis}_standard"] for axis in WaferDataset.AXES}
+
+    sections = []
+    for axis_type in WaferDataset.AXES:
+        standard_value = standard_point_data[axis_type]
+        main_fig, _ = create_line_chart(
+            dataset, axis_type, standard_value if axis_type == 'z' else None, standard_point_data
+        )
+        anomaly_fig, _ = create_anomaly_chart(dataset, axis_type, standard_value, standard_point_data)
+        stats = summary['axes'][axis_type]['stats']
+        anomaly_stats = summary['axes'][axis_type]['anomaly_stats']
+
+        sections.append(f"""
+        <h2>{axis_type.upper()} Axis</h2>
+        <table class="stats">
+            <tr><th>Min</th><th>Max</th><th>Mean</th><th>Median</th><th>Std</th><th>Points</th><th>Below Standard</th></tr>
+            <tr>
+                <td>{stats['min']:.3f}</td><td>{stats['max']:.3f}</td><td>{stats['mean']:.3f}</td>
+                <td>{stats['median']:.3f}</td><td>{stats['std']:.3f}</td><td>{stats['count']}</td>
+                <td>{anomaly_stats['anomaly_points']} ({anomaly_stats['anomaly_percent']:.1f}%)</td>
+            </tr>
+        </table>
+        {main_fig.to_html(full_html=False, include_plotlyjs=False)}
+        {anomaly_fig.to_html(full_html=False, include_plotlyjs=False)}
+        """)
+
+    title = f"AutoZ Wafer4P Aligner - {escape(machine_type)} - {escape(lot_name)}"
+    return f"""<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <script type="text/javascript" src="{escape(plotly_js_src)}"></script>
+    <style>
+        body {{ font-family: "Microsoft JhengHei", Arial, sans-serif; margin: 20px; background-color: #f8f9fa; color: #333; }}
+        h1 {{ font-size: 24px; }}
+        h2 {{ font-size: 20px; margin-top: 30px; }}
+        .stats {{ border-collapse: collapse; margin-bottom: 10px; background-color: white; }}
+        .stats th, .stats td {{ border: 1px solid #ddd; padding: 6px 12px; text-align: center; }}
+        .stats th {{ background-color: #2D2D2D; color: white; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <p>Total Wafers: {summary['total_wafers']} &nbsp; Total Points: {summary['total_points']} &nbsp;
+       Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
+    {''.join(sections)}
+    {create_wafer_status_dashboard(dataset, analysis_data['z_standard'])}
+</body>
+</html>
+"""
+
+def process_lot(machine_type, lot_name, autoz_log_path, all_txt_path, output_dir, write_html=False):
+    """分析單一批次,寫出摘要 JSON (與選用的 HTML 報告),回傳 summary.csv 的一列
+
+    在行程池中執行。批次之間已平行處理,ALL.txt 以單一行程解析;解析結果快取與網頁介面共用。
+    紀錄起始行的樣式由主行程推得後於工作行程啟動時載入 (見 learn_batch_record_start),此處只確認適用於此檔案。
+    """
+    started = time.perf_counter()
+    row = {'lot': lot_name, 'status': 'failed', 'wafers': None, 'points': None, 'wafers_below_standard': None}
+    for axis_type in WaferDataset.AXES:
+        row.update({f"{axis_type}_mean": None, f"{axis_type}_std": None,
+                    f"{axis_type}_below": None, f"{axis_type}_below_percent": None})
+    row.update({'seconds': None, 'error': None, 'autoz_log': autoz_log_path, 'all_txt': all_txt_path})
+
+    try:
+        module = get_processor_module(machine_type)
+        log_result = process_autoz_log_worker(autoz_log_path, module, machine_type)
+        if not log_result['success']:
+            raise ValueError(f"AutoZLog.txt: {log_result['error']}")
+        timestamp = log_result['timestamp']
+
+        cache_key = parse_cache.make_key('all_txt', machine_type, module, all_txt_path, timestamp)
+        cached = load_cached_analysis(cache_key)
+        if cached is not None:
+            analysis_data = cached[0]
+        else:
+            # 與 parse_all_txt 相同,推得紀錄邊界時只解析開始時的檔案大小範圍
+            end = os.path.getsize(all_txt_path)
+            record_start = get_record_start(module, all_txt_path, timestamp, end)
+            if record_start is None:
+                end = None
+            analysis_data = build_analysis_data(
+                parse_all_txt_serial(module, all_txt_path, timestamp, end=end, record_start=record_start)
+            )
+            store_cached_analysis(cache_key, analysis_data, end)
+
+        summary = summarize_analysis(analysis_data)
+        with open(os.path.join(output_dir, f"{lot_name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'lot': lot_name,
+                'machine_type': machine_type,
+                'autoz_log': autoz_log_path,
+                'all_txt': all_txt_path,
+                'autoz_log_timestamp': timestamp,
+                **summary
+            }, f, ensure_ascii=False, indent=2, default=str)
+
+        if write_html:
+            report = generate_report_html(analysis_data, machine_type, lot_name, summary)
+            with open(os.path.join(output_dir, f"{lot_name}.html"), 'w', encoding='utf-8') as f:
+                f.write(report)
+
+        row.update({
+            'status': 'completed',
+            'wafers': summary['total_wafers'],
+            'points': summary['total_points'],
+            'wafers_below_standard': sum(status['below_standard'] for status in summary['wafer_status'].values())
+        })
+        for axis_type, axis_summary in summary['axes'].items():
+            row.update({
+                f"{axis_type}_mean": round(axis_summary['stats']['mean'], 4),
+                f"{axis_type}_std": round(axis_summary['stats']['std'], 4),
+                f"{axis_type}_below": axis_summary['anomaly_stats']['anomaly_points'],
+                f"{axis_type}_below_percent": round(axis_summary['anomaly_stats']['anomaly_percent'], 2)
+            })
+    except Exception as e:
+        row['error'] = str(e)
+
+    row['seconds'] = round(time.perf_counter() - started, 2)
+    return row
+
+def learn_batch_record_start(machine_type, lots):
+    """批次處理開始前在主行程取得紀錄起始行的樣式,回傳供工作行程載入的 record_starts 內容
+
+    已推得 (或已保存) 時直接沿用;否則依序以各批次的 ALL.txt 推得,直到得到可套用到其他檔案的結果。
+    """
+    try:
+        module = get_processor_module(machine_type)
+        key, known, _ = load_record_start(module)
+        for name, autoz_log_path, all_txt_path in lots:
+            if known:
+                break
+            log_result = process_autoz_log_worker(autoz_log_path, module, machine_type)
+            if not log_result['success']:
+                continue
+            record_start, known = learn_record_start(module, all_txt_path, log_result['timestamp'])
+            if known:
+                remember_record_start(key, record_start)
+    except Exception as e:
+        print(f"Failed to determine ALL.txt record boundaries before batch processing: {str(e)}")
+
+    with record_starts_lock:
+        return dict(record_starts)
+
+def init_batch_worker(known_record_starts):
+    """批次處理工作行程的初始化:載入主行程推得的紀錄起始行樣式"""
+    with record_starts_lock:
+        record_starts.update(known_record_starts)
+
+def batch_main(argv=None):
+    """命令列批次處理的進入點
+
+    Returns:
+        int: 結束代碼 (全部成功為 0,有批次失敗或沒有可處理的批次為 1)
+    """
+    parser = argparse.ArgumentParser(
+        prog='AutoZ Wafer4P Aligner --batch',
+        description='Analyse many lots without the web interface.'
+    )
+    parser.add_argument('machine_type', choices=sorted(PROCESSOR_MODULES), help='machine type of all lots')
+    parser.add_argument('lots', nargs='*',
+                        help=f'lot folders or glob patterns; each folder contains {BATCH_AUTOZ_LOG_NAME} and {BATCH_ALL_TXT_NAME}')
+    parser.add_argument('--pair', nargs=2, action='append', default=[], metavar=('AUTOZLOG', 'ALLTXT'),
+                        help='an explicit AutoZLog.txt / ALL.txt pair (may be repeated)')
+    parser.add_argument('-o', '--output', default=BATCH_OUTPUT_DIR, help=f'output folder (default: {BATCH_OUTPUT_DIR})')
+    parser.add_argument('-j', '--workers', type=int, default=PARALLEL_PARSE_WORKERS,
+                        help=f'number of worker processes (default: {PARALLEL_PARSE_WORKERS})')
+    parser.add_argument('--html', action='store_true', help='also write a standalone HTML report per lot')
+    args = parser.parse_args(argv)
+
+    lots, skipped = collect_batch_lots(args.lots, args.pair)
+    for folder in skipped:
+        print(f"Skipped {folder}: {BATCH_AUTOZ_LOG_NAME} or {BATCH_ALL_TXT_NAME} not found")
+    if not lots:
+        print("No lots to process")
+        return 1
+
+    save_log()
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.html:
+        # 所有報告共用同一份 Plotly.js,離線也能開啟
+        import plotly.offline
+        with open(os.path.join(args.output, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    workers = max(1, min(args.workers, len(lots)))
+    print(f"Processing {len(lots)} lots with {workers} workers...")
+    started = time.perf_counter()
+    rows = [None] * len(lots)
+
+    # 紀錄邊界只在主行程推得一次,工作行程不再各自推得
+    known_record_starts = learn_batch_record_start(args.machine_type, lots)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                             initargs=(known_record_starts,)) as executor:
+        futures = {
+            executor.submit(process_lot, args.machine_type, name, autoz_log, all_txt, args.output, args.html): index
+            for index, (name, autoz_log, all_txt) in enumerate(lots)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows[futures[future]] = row
+            detail = f"{row['wafers']} wafers" if row['status'] == 'completed' else row['error']
+            print(f"[{done}/{len(lots)}] {row['lot']}: {row['status']} ({detail}, {row['seconds']}s)")
+
+    summary_path = os.path.join(args.output, 'summary.csv')
+    with open(summary_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    failed = sum(row['status'] != 'completed' for row in rows)
+    print(f"Processed {len(lots)} lots in {time.perf_counter() - started:.1f}s, {failed} failed. Summary: {summary_path}")
+
+    # 使用記錄已寫入 spool 即可,未送出的部分下次啟動時再送出
+    usage_logger.flush(USAGE_LOG_FLUSH_TIMEOUT)
+    return 1 if failed else 0
 
 def main():
     """主程式啟動函數"""
+    startup_timer.mark('module import')
+
     save_log()
+    startup_timer.mark('usage log')
     
-    version_result = check_version()
-    if version_result['status'] == 'error' and version_result.get('type') == 'permission':
-        print(f"ERROR: {version_result['message']}")
-        input("Press Enter to exit...")
-        sys.exit(1)
+    # 版本檢查在背景執行,與尋找埠號同時進行
+    version_checker.refresh()
     
     try:
         port = find_available_port()
-        print(f"Starting server on port {port}...")
+        startup_timer.mark('find port')
     except RuntimeError as e:
         print(f"ERROR: {e}")
         input("Press Enter to exit...")
         return
+
+    # 沒有啟動權限時結束程式;網路磁碟在 VERSION_CHECK_TIMEOUT 內沒有回應時先啟動,
+    # 取得確定結果前首頁停用操作,分析相關 API 也拒絕執行 (見 require_launch_permission)
+    version_result = version_checker.get()
+    startup_timer.mark('version check')
+    if version_result['status'] == 'error' and version_result.get('type') == 'permission':
+        print(f"ERROR: {version_result['message']}")
+        input("Press Enter to exit...")
+        sys.exit(1)
+    print(f"Starting server on port {port}...")
     
     activity_thread = threading.Thread(target=check_activity_thread, daemon=True)
     activity_thread.start()
     print("Activity timeout monitor started (30 minutes)")
+
+    threading.Thread(target=asset_mirror_thread, daemon=True).start()
+    startup_timer.mark('activity monitor')
+    startup_timer.report()
     
     url = f'http://localhost:{port}'
     print(f"Opening browser: {url}")
@@ -3089,4 +7460,14 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark_line_chart()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--benchmark-memory':
+        # 用法: --benchmark-memory <機台類型> <AutoZLog.txt> <ALL.txt>
+        benchmark_all_txt_memory(PROCESSOR_MODULES[sys.argv[2]], sys.argv[3], sys.argv[4])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        sys.exit(batch_main(sys.argv[2:]))
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""以 autoz_aligner 名稱匯入主程式 (主程式檔名含空格與版本號,無法直接 import)
+
+平行解析的子行程也依此名稱匯入,spawn 啟動方式下同樣可用。
+"""
+import glob
+import importlib.util
+import os
+import sys
+
+APP_PATH = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'AutoZ Wafer4P Aligner_V*.py')))[-1]
+
+_spec = importlib.util.spec_from_file_location(__name__, APP_PATH)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
@@ -0,0 +1,27 @@
+"""測試共用的晶圓產生函數與 fixture"""
+import random
+
+import pytest
+
+import autoz_aligner as aligner
+
+
+def make_wafers(wafer_count, seed=0, max_points=40):
+    """產生測試用晶圓:[(晶圓 ID, 開始時間, 點位)],最後再加一段重測第一片晶圓的紀錄"""
+    rng = random.Random(seed)
+    wafers = []
+    for index in range(wafer_count):
+        points = [(rng.uniform(-5, 5), rng.uniform(-5, 5), rng.uniform(-2, 2))
+                  for _ in range(rng.randint(1, max_points))]
+        wafers.append((f"W{index + 1}", f"09:{index // 60:02d}:{index % 60:02d}", points))
+    first_id, first_time, _ = wafers[0]
+    wafers.append((first_id, first_time, [(rng.uniform(-5, 5), 0.0, rng.uniform(-2, 2)) for _ in range(5)]))
+    return wafers
+
+
+@pytest.fixture(autouse=True)
+def clear_record_starts(tmp_path, monkeypatch):
+    monkeypatch.setattr(aligner, 'RECORD_START_CACHE_PATH', str(tmp_path / 'record_starts.json'))
+    aligner.record_starts.clear()
+    yield
+    aligner.record_starts.clear()
@@ -0,0 +1,37 @@
+"""測試用的處理模組:每行以時間開頭,晶圓由 "<時間> Wafer ID: <ID>" 行開始,點位行為 "<時間> Z <x>,<y>,<z>" """
+
+
+def process_autoz_log(file_path):
+    return '2024-01-01 00:00:00'
+
+
+def process_all_txt(file_path, timestamp):
+    wafer_data = {}
+    standard = None
+    current = None
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            stamp, _, content = line.rstrip('\n').partition(' ')
+            if content.startswith('Standard '):
+                standard = [float(value) for value in content[len('Standard '):].split(',')]
+            elif content.startswith('Wafer ID: '):
+                current = wafer_data.setdefault(content[len('Wafer ID: '):], {
+                    'x_values': [], 'y_values': [], 'z_values': [], 'start_time': stamp
+                })
+            elif content.startswith('Z ') and current is not None:
+                x, y, z = (float(value) for value in content[2:].split(','))
+                current['x_values'].append(x)
+                current['y_values'].append(y)
+                current['z_values'].append(z)
+
+    return {'wafer_data': wafer_data, 'x_standard': standard[0], 'y_standard': standard[1], 'z_standard': standard[2]}
+
+
+def write_all_txt(path, wafers, standard=(0.5, -0.5, 0.0)):
+    with open(path, 'w') as f:
+        f.write('08:00:00 Standard {},{},{}\n'.format(*standard))
+        for wafer_id, start_time, points in wafers:
+            f.write(f'{start_time} Wafer ID: {wafer_id}\n')
+            for x, y, z in points:
+                f.write(f'{start_time} Z {x!r},{y!r},{z!r}\n')
@@ -0,0 +1,31 @@
+"""測試用的處理模組:晶圓行只有 "NEXT",晶圓 ID 由模組依出現順序編號 (ID 不出現在檔案中,無法推得紀錄邊界)"""
+
+
+def process_autoz_log(file_path):
+    return '2024-01-01 00:00:00'
+
+
+def process_all_txt(file_path, timestamp):
+    wafer_data = {}
+    current = None
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if parts == ['NEXT']:
+                current = wafer_data.setdefault(f'#{len(wafer_data) + 1}', {
+                    'x_values': [], 'y_values': [], 'z_values': [], 'start_time': len(wafer_data)
+                })
+            elif len(parts) == 3 and current is not None:
+                for axis, value in zip('xyz', parts):
+                    current[f'{axis}_values'].append(float(value))
+
+    return {'wafer_data': wafer_data, 'x_standard': 0.0, 'y_standard': 0.0, 'z_standard': 0.0}
+
+
+def write_all_txt(path, wafers, standard=None):
+    with open(path, 'w') as f:
+        for _, _, points in wafers:
+            f.write('NEXT\n')
+            for x, y, z in points:
+                f.write(f'{x!r} {y!r} {z!r}\n')
@@ -0,0 +1,45 @@
+"""測試用的處理模組:每片晶圓以 "WAFER <ID> <開始時間>" 行開始,之後每行 "TD <x> <y> <z>" 為一個點位
+
+同一片晶圓可在檔案後段再次出現 (例如重測),點位接在原本的點位之後。
+"""
+
+
+def process_autoz_log(file_path):
+    return '2024-01-01 00:00:00'
+
+
+def process_all_txt(file_path, timestamp):
+    wafer_data = {}
+    standard = None
+    current = None
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'STANDARD':
+                standard = [float(value) for value in parts[1:4]]
+            elif parts[0] == 'WAFER':
+                current = wafer_data.setdefault(parts[1], {
+                    'x_values': [], 'y_values': [], 'z_values': [], 'start_time': parts[2]
+                })
+            elif parts[0] == 'TD' and current is not None:
+                current['x_values'].append(float(parts[1]))
+                current['y_values'].append(float(parts[2]))
+                current['z_values'].append(float(parts[3]))
+
+    if standard is None:
+        raise ValueError('STANDARD line not found')
+    return {'wafer_data': wafer_data, 'x_standard': standard[0], 'y_standard': standard[1], 'z_standard': standard[2]}
+
+
+def write_all_txt(path, wafers, standard=(0.5, -0.5, 0.0)):
+    """寫出測試用 ALL.txt,wafers 為 [(晶圓 ID, 開始時間, [(x, y, z), ...]), ...]"""
+    with open(path, 'w') as f:
+        f.write('LOT TEST\n')
+        f.write('STANDARD {} {} {}\n'.format(*standard))
+        for wafer_id, start_time, points in wafers:
+            f.write(f'WAFER {wafer_id} {start_time}\n')
+            for x, y, z in points:
+                f.write(f'TD {x!r} {y!r} {z!r}\n')
@@ -0,0 +1,137 @@
+"""圖表快取:等待中的建立失敗時自行重新建立,預先壓縮只產生指定的版本,各工作階段的快取互不擠出,
+已移除的資料集版本不會再由背景預先計算存回"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import autoz_aligner as aligner
+
+
+def make_payload():
+    return aligner.ResponsePayload(b'{"data": [' + b'1.0, ' * 2000 + b'1.0]}', 'application/json', 'test')
+
+
+def test_waiter_rebuilds_after_failed_build():
+    cache = aligner.ChartResponseCache(4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_build():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('warm-up failed')
+
+    def warm():
+        with pytest.raises(RuntimeError):
+            cache.get_or_build('key', failing_build)
+
+    warmer = threading.Thread(target=warm)
+    warmer.start()
+    started.wait(5)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(cache.get_or_build('key', make_payload)))
+    waiter.start()
+    time.sleep(0.1)   # 等待者已在等候背景建立的結果
+    release.set()
+    warmer.join(5)
+    waiter.join(5)
+
+    assert len(results) == 1
+    assert isinstance(results[0], aligner.ResponsePayload)
+    assert cache.get_or_build('key', failing_build) is results[0]
+
+
+def test_precompress_only_requested_encoding():
+    payload = make_payload().precompress(('gzip',))
+    assert set(payload._variants) == {'identity', 'gzip'}
+
+
+def make_analysis_data(seed):
+    rng = np.random.default_rng(seed)
+    offsets = np.arange(0, 20 * 30 + 1, 30, dtype=np.int64)
+    dataset = aligner.WaferDataset(
+        [f"W{i:03d}" for i in range(20)],
+        list(range(20)),
+        {axis: rng.normal(0, 5, 20 * 30) for axis in aligner.WaferDataset.AXES},
+        {axis: offsets for axis in aligner.WaferDataset.AXES}
+    )
+    return {'dataset': dataset, 'version': next(aligner.dataset_versions),
+            'x_standard': -5.0, 'y_standard': -5.0, 'z_standard': -5.0}
+
+
+def test_concurrent_sessions_keep_their_charts(monkeypatch):
+    store = aligner.SessionStore(aligner.SESSION_MAX_COUNT, aligner.SESSION_MAX_BYTES)
+    monkeypatch.setattr(aligner, 'session_store', store)
+    session_ids = [f"tab{index}" for index in range(6)]
+    for index, session_id in enumerate(session_ids):
+        store.get(session_id).set_analysis_data(make_analysis_data(index))
+
+    builds = []
+    build_chart_payload = aligner.build_chart_payload
+    monkeypatch.setattr(aligner, 'build_chart_payload', lambda *args: builds.append(args) or build_chart_payload(*args))
+
+    def request_all(session_id):
+        with aligner.app.test_client() as client:
+            headers = {aligner.SESSION_HEADER: session_id}
+            for axis_type in aligner.WaferDataset.AXES:
+                for encoding in aligner.CHART_ENCODINGS:
+                    result = client.post('/api/regenerate_chart', headers=headers,
+                                         json={'axis_type': axis_type, 'encoding': encoding}).get_json()
+                    assert result['success']
+            assert client.get('/api/wafer_stats', headers=headers).get_json()['success']
+
+    # 兩輪:第二輪應全部由各工作階段的快取回傳
+    for _ in range(2):
+        with ThreadPoolExecutor(max_workers=len(session_ids)) as executor:
+            list(executor.map(request_all, session_ids))
+
+    assert len(builds) == len(session_ids) * len(aligner.WaferDataset.AXES) * len(aligner.CHART_ENCODINGS)
+    for session_id in session_ids:
+        session = store.get(session_id)
+        assert len(session.chart_cache._entries) == len(aligner.WaferDataset.AXES) * len(aligner.CHART_ENCODINGS)
+        assert len(session.wafer_stats_cache._entries) == 1
+        assert session.nbytes > session.analysis_data['dataset'].nbytes
+
+
+def test_discarded_version_is_not_stored_by_pending_build():
+    cache = aligner.ChartResponseCache(4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        return make_payload()
+
+    results = []
+    warmer = threading.Thread(target=lambda: results.append(cache.get_or_build((1, 'z'), slow_build)))
+    warmer.start()
+    started.wait(5)
+    cache.discard_version(1)   # follow 模式更新或工作階段被移除
+    release.set()
+    warmer.join(5)
+
+    assert isinstance(results[0], aligner.ResponsePayload)
+    assert cache.get((1, 'z')) is None
+    assert cache.get_or_build((2, 'z'), make_payload) is cache.get((2, 'z'))
+
+
+def test_warm_up_skips_replaced_version(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(aligner, 'chart_warmup_executor', executor)
+    builds = []
+    monkeypatch.setattr(aligner, 'build_chart_payload', lambda *args: builds.append(args))
+
+    session = aligner.AnalysisSession('test')
+    stale = make_analysis_data(0)
+    session.set_analysis_data(stale)
+    session.set_analysis_data(make_analysis_data(1))
+    aligner.warm_chart_cache(session, stale, 'gzip')
+    executor.shutdown(wait=True)
+
+    assert builds == []
+    assert len(session.chart_cache._entries) == 0
@@ -0,0 +1,59 @@
+"""直接建立的 Plotly 圖表字典與經 go.Figure 驗證後的 to_dict() 結果完全一致 (三軸、各繪製層級)"""
+import numpy as np
+import pytest
+
+import autoz_aligner as aligner
+
+go = pytest.importorskip('plotly.graph_objects')
+
+
+def make_random_dataset(wafer_count, points_per_wafer, rng):
+    """產生隨機的 WaferDataset (各軸為平均 0、標準差 5 的常態分布)"""
+    point_count = wafer_count * points_per_wafer
+    offsets = np.arange(0, point_count + 1, points_per_wafer, dtype=np.int64)
+    return aligner.WaferDataset(
+        [f"W{i:05d}" for i in range(wafer_count)],
+        list(range(wafer_count)),
+        {axis: rng.normal(0, 5, point_count) for axis in aligner.WaferDataset.AXES},
+        {axis: offsets for axis in aligner.WaferDataset.AXES}
+    )
+
+
+def diff_figure_dicts(actual, expected, path='figure'):
+    """遞迴比對兩個 Plotly 圖表字典,回傳不一致位置的說明 (空列表代表內容相同)"""
+    if actual == expected:
+        return []
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        differences = []
+        for key in sorted(set(actual) | set(expected)):
+            if key not in expected:
+                differences.append(f"{path}.{key}: only in built figure")
+            elif key not in actual:
+                differences.append(f"{path}.{key}: only in validated figure")
+            else:
+                differences.extend(diff_figure_dicts(actual[key], expected[key], f"{path}.{key}"))
+        return differences
+    if isinstance(actual, (list, tuple)) and isinstance(expected, (list, tuple)) and len(actual) == len(expected):
+        differences = []
+        for index, (item, expected_item) in enumerate(zip(actual, expected)):
+            differences.extend(diff_figure_dicts(item, expected_item, f"{path}[{index}]"))
+        return differences
+    return [f"{path}: built={actual!r:.80} validated={expected!r:.80}"]
+
+
+# 晶圓數 × 每片 50 點,涵蓋 svg、webgl 與 envelope 三個繪製層級
+@pytest.mark.parametrize('wafer_count', [20, 400, 2000, 24000])
+@pytest.mark.parametrize('axis_type', aligner.WaferDataset.AXES)
+def test_built_figures_match_go_figure(wafer_count, axis_type):
+    dataset = make_random_dataset(wafer_count, 50, np.random.default_rng(wafer_count))
+    standard_point_data = {axis: -5.0 for axis in aligner.WaferDataset.AXES}
+    standard_value = standard_point_data[axis_type]
+    tier = aligner.choose_render_tier(dataset.point_count(axis_type) + 1)
+
+    charts = (
+        (aligner.build_line_chart_figure, standard_value if axis_type == 'z' else None),
+        (aligner.build_anomaly_chart_figure, standard_value),
+    )
+    for builder, chart_standard in charts:
+        figure, _ = builder(dataset, axis_type, chart_standard, standard_point_data, tier)
+        assert diff_figure_dicts(figure, go.Figure(figure).to_dict()) == [], f"{builder.__name__} ({tier})"
@@ -0,0 +1,28 @@
+"""主折線圖 min/max 抽樣:低於標準值的點一律保留,但數量有上限"""
+import numpy as np
+
+import autoz_aligner as aligner
+
+
+def test_few_below_standard_points_are_all_kept():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, 100_000)
+    values[rng.choice(values.size, 500, replace=False)] = -10.0
+
+    indices, decimated = aligner.select_line_chart_points(values, 0, values.size, 4000, 0, -5.0)
+    assert decimated
+    assert set(np.flatnonzero(values < -5.0)) <= set(indices.tolist())
+    assert len(indices) <= 4000 + 500 + 2
+
+
+def test_forced_points_are_capped():
+    rng = np.random.default_rng(1)
+    values = rng.normal(-10, 1, 200_000)   # 整批低於標準值
+
+    indices, decimated = aligner.select_line_chart_points(values, 0, values.size, 4000, 1, -5.0)
+    assert decimated
+    assert len(indices) <= 4000 + aligner.CHART_FORCED_KEEP_MAX_POINTS + 2
+    assert np.all(np.diff(indices) > 0)
+    # AutoZ complete 點與極值仍保留
+    assert indices[0] == 0
+    assert values.argmin() in indices and values.argmax() in indices
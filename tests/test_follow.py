@@ -0,0 +1,147 @@
+"""follow 模式:可推得紀錄邊界時接續解析新增的紀錄,無法推得時結果頁面停用按鈕"""
+import pytest
+
+import autoz_aligner as aligner
+import fake_numbered_processor
+import fake_wafer_processor
+from conftest import make_wafers
+
+
+def analyse(tmp_path, module, wafers):
+    file_path = str(tmp_path / 'ALL.txt')
+    module.write_all_txt(file_path, wafers)
+    job = aligner.AnalysisJob(aligner.AnalysisSession('test'), file_path)
+    result = aligner.parse_all_txt(module, file_path, None, job)
+
+    session = aligner.AnalysisSession('test')
+    session.set_analysis_data(aligner.build_analysis_data(result), {
+        'module': module, 'file_path': file_path, 'timestamp': None, 'parsed_end': job.parsed_end
+    })
+    return session, file_path
+
+
+def render_follow_button(session):
+    with aligner.app.test_request_context('/result'):
+        html = aligner.generate_result_html(session.analysis_data, 'FAKE', session.follow_unavailable_reason(),
+                                            session.chart_cache)
+    start = html.index('id="followBtn"')
+    return html[start:html.index('>', start)]
+
+
+def test_follow_appends_new_records(tmp_path):
+    session, file_path = analyse(tmp_path, fake_wafer_processor, make_wafers(10)[:-1])
+    assert session.follow_unavailable_reason() is None
+    assert 'onclick="toggleFollow()"' in render_follow_button(session)
+
+    session.start_follow()
+    with open(file_path, 'a') as f:
+        f.write('TD 1.0 2.0 3.0\nWAFER W99 10:00:00\nTD 4.0 5.0 6.0\n')
+    _, _, current = session.poll_follow()
+
+    dataset = current['dataset']
+    assert dataset.wafer_ids[-1] == 'W99'
+    assert dataset.n_wafers == 11
+    assert dataset.values['z'][-2:].tolist() == [3.0, 6.0]
+
+
+def test_follow_disabled_without_record_boundaries(tmp_path):
+    session, _ = analyse(tmp_path, fake_numbered_processor, make_wafers(10)[:-1])
+
+    assert session.follow_unavailable_reason() is not None
+    button = render_follow_button(session)
+    assert 'disabled' in button
+    assert 'toggleFollow' not in button
+    with pytest.raises(ValueError):
+        session.start_follow()
+
+
+def append_wafer(file_path, wafer_id, start_time, points):
+    with open(file_path, 'a') as f:
+        f.write(f'WAFER {wafer_id} {start_time}\n')
+        for x, y, z in points:
+            f.write(f'TD {x!r} {y!r} {z!r}\n')
+
+
+def assert_same_dataset(dataset, expected):
+    assert dataset.wafer_ids == expected.wafer_ids
+    assert aligner.np.array_equal(dataset.order, expected.order)
+    for axis in aligner.WaferDataset.AXES:
+        assert aligner.np.array_equal(dataset.values[axis], expected.values[axis])
+        assert aligner.np.array_equal(dataset.offsets[axis], expected.offsets[axis])
+        assert aligner.np.array_equal(dataset.codes[axis], expected.codes[axis])
+        for field, expected_field in zip(dataset.sorted_axis(axis), expected.sorted_axis(axis)):
+            assert aligner.np.array_equal(field, expected_field)
+
+
+def test_follow_appends_to_shared_buffers(tmp_path):
+    session, file_path = analyse(tmp_path, fake_wafer_processor, make_wafers(10)[:-1])
+    session.start_follow()
+    for axis in aligner.WaferDataset.AXES:
+        session.analysis_data['dataset'].sorted_axis(axis)   # 圖表已建立排序資料
+
+    snapshots = []
+    for index in range(3):
+        with open(file_path, 'a') as f:
+            f.write('TD 1.0 2.0 -3.0\n')
+        append_wafer(file_path, f'W{20 + index}', f'10:00:0{index}', [(0.5, 0.5, -1.0), (0.25, 0.75, 1.5)])
+        _, previous, current = session.poll_follow()
+        snapshots.append((previous['dataset'], previous['dataset'].values['z'].copy()))
+
+    # 新版本與前一版本共用同一塊記憶體,前一版本的內容不變
+    assert aligner.np.shares_memory(current['dataset'].values['z'], previous['dataset'].values['z'])
+    for dataset, values in snapshots:
+        assert aligner.np.array_equal(dataset.values['z'], values)
+
+    expected = aligner.WaferDataset.from_wafer_data(fake_wafer_processor.process_all_txt(file_path, None)['wafer_data'])
+    assert_same_dataset(current['dataset'], expected)
+
+
+def test_follow_retest_of_earlier_wafer_rebuilds(tmp_path):
+    session, file_path = analyse(tmp_path, fake_wafer_processor, make_wafers(10)[:-1])
+    session.start_follow()
+    append_wafer(file_path, 'W1', '09:00:00', [(1.0, 1.0, 1.0)])
+    append_wafer(file_path, 'W30', '10:00:00', [(2.0, 2.0, 2.0)])
+    _, _, current = session.poll_follow()
+
+    expected = aligner.WaferDataset.from_wafer_data(fake_wafer_processor.process_all_txt(file_path, None)['wafer_data'])
+    assert_same_dataset(current['dataset'], expected)
+
+
+def poll_large_increment(tmp_path):
+    session, file_path = analyse(tmp_path, fake_wafer_processor, make_wafers(10)[:-1])
+    session.start_follow()
+    rng = aligner.np.random.default_rng(0)
+    append_wafer(file_path, 'W30', '10:00:00', [(0.0, 0.0, z) for z in rng.normal(0, 1, 400).tolist()])
+    _, previous, current = session.poll_follow()
+    return previous, current
+
+
+def test_decimated_overview_gets_delta(tmp_path, monkeypatch):
+    monkeypatch.setattr(aligner, 'CHART_OVERVIEW_MAX_POINTS', 100)
+    previous, current = poll_large_increment(tmp_path)
+    old_count = previous['dataset'].point_count('z')
+
+    delta = aligner.build_chart_delta(previous, current, 'z')
+    main = delta['main']
+    assert main['decimated']
+    assert 0 < len(main['x']) < 400
+    assert main['x'] == sorted(main['x']) and main['x'][0] >= old_count + 1
+    # 低於標準值 (0.0) 的新增點位一律保留
+    new_values = current['dataset'].sorted_axis('z').values[old_count:]
+    assert set((aligner.np.flatnonzero(new_values < 0.0) + old_count + 1).tolist()) <= set(main['x'])
+    assert len(delta['anomaly']['normal']['x']) + len(delta['anomaly']['anomaly']['x']) == 400
+
+
+def test_envelope_tier_gets_new_buckets(tmp_path, monkeypatch):
+    monkeypatch.setattr(aligner, 'RENDER_WEBGL_MIN_POINTS', 10)
+    monkeypatch.setattr(aligner, 'RENDER_ENVELOPE_MIN_POINTS', 20)
+    monkeypatch.setattr(aligner, 'RENDER_ENVELOPE_BUCKETS', 50)
+    previous, current = poll_large_increment(tmp_path)
+    old_count = previous['dataset'].point_count('z')
+
+    delta = aligner.build_chart_delta(previous, current, 'z')
+    assert delta['render_tier'] == 'envelope'
+    envelope = delta['anomaly']['envelope']
+    assert envelope['x'] and min(envelope['x']) >= old_count + 1
+    assert all(low <= high for low, high in zip(envelope['min'], envelope['max']))
+    assert envelope['below']['x']
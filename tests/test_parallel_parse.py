@@ -0,0 +1,243 @@
+"""ALL.txt 紀錄邊界推得、平行解析與單一行程解析結果一致性的測試"""
+import types
+
+import pytest
+
+import autoz_aligner as aligner
+import fake_labelled_processor
+import fake_numbered_processor
+import fake_wafer_processor
+from conftest import make_wafers
+
+
+@pytest.mark.parametrize('module', [fake_wafer_processor, fake_labelled_processor])
+@pytest.mark.parametrize('workers', [2, 3, 7])
+def test_parallel_parse_matches_serial(tmp_path, module, workers):
+    file_path = str(tmp_path / 'ALL.txt')
+    module.write_all_txt(file_path, make_wafers(25, seed=workers))
+    timestamp = module.process_autoz_log(None)
+
+    record_start = aligner.get_record_start(module, file_path, timestamp)
+    assert record_start is not None
+
+    serial = module.process_all_txt(file_path, timestamp)
+    parallel = aligner.parse_all_txt_parallel(module, file_path, timestamp, record_start, workers=workers)
+    assert aligner.all_txt_results_equal(parallel, serial)
+    assert list(parallel['wafer_data']) == list(serial['wafer_data'])
+
+
+def test_parse_all_txt_uses_parallel_path(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(60))
+    monkeypatch.setattr(aligner, 'PARALLEL_PARSE_MIN_SIZE', 0)
+    monkeypatch.setattr(aligner, 'PARALLEL_PARSE_WORKERS', 3)
+
+    calls = []
+    original = aligner.parse_all_txt_parallel
+
+    def parse_all_txt_parallel(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(aligner, 'parse_all_txt_parallel', parse_all_txt_parallel)
+    result = aligner.parse_all_txt(fake_wafer_processor, file_path, None)
+    assert calls
+    assert aligner.all_txt_results_equal(result, fake_wafer_processor.process_all_txt(file_path, None))
+
+
+def test_parse_stops_at_end_of_growing_file(tmp_path):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(30))
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    end = content.index(b'WAFER W20 ')
+
+    # 解析開始後檔案繼續寫入,結果只包含前 end 位元組
+    record_start = aligner.get_record_start(fake_wafer_processor, file_path, None, end)
+    with open(file_path, 'ab') as f:
+        f.write(b'WAFER W99 10:00:00\nTD 1.0 1.0 1.0\n')
+    result = aligner.parse_all_txt_serial(fake_wafer_processor, file_path, None, end=end, record_start=record_start)
+
+    truncated_path = str(tmp_path / 'truncated.txt')
+    with open(truncated_path, 'wb') as f:
+        f.write(content[:end])
+    assert aligner.all_txt_results_equal(result, fake_wafer_processor.process_all_txt(truncated_path, None))
+
+
+def test_unverifiable_format_falls_back_to_serial(tmp_path):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_numbered_processor.write_all_txt(file_path, make_wafers(10)[:-1])
+
+    assert aligner.get_record_start(fake_numbered_processor, file_path, None) is None
+    result = aligner.parse_all_txt(fake_numbered_processor, file_path, None)
+    assert aligner.all_txt_results_equal(result, fake_numbered_processor.process_all_txt(file_path, None))
+
+
+def test_single_wafer_sample_is_not_cached(tmp_path):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(1)[:1])
+
+    assert aligner.get_record_start(fake_wafer_processor, file_path, None) is None
+    assert not aligner.record_starts
+
+    # 晶圓增加後可再推得
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(5))
+    assert aligner.get_record_start(fake_wafer_processor, file_path, None) is not None
+
+
+def make_job(file_path, module):
+    session = types.SimpleNamespace(processor_module=module, machine_type='FAKE', autoz_log_timestamp=None)
+    return aligner.AnalysisJob(session, file_path)
+
+
+def test_serial_parse_reports_progress_per_chunk(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(40))
+    monkeypatch.setattr(aligner, 'SERIAL_PARSE_CHUNK_SIZE', 4096)
+
+    job = make_job(file_path, fake_wafer_processor)
+    reports = []
+    original = job.report_progress
+
+    def report_progress(byte_count, wafer_ids):
+        reports.append(byte_count)
+        original(byte_count, wafer_ids)
+
+    job.report_progress = report_progress
+    result = aligner.parse_all_txt(fake_wafer_processor, file_path, None, job)
+
+    assert len(reports) > 2
+    assert job.bytes_processed == job.total_bytes
+    assert job.cancellable
+    assert aligner.all_txt_results_equal(result, fake_wafer_processor.process_all_txt(file_path, None))
+
+
+def test_serial_parse_stops_between_chunks_when_cancelled(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(40))
+    monkeypatch.setattr(aligner, 'SERIAL_PARSE_CHUNK_SIZE', 4096)
+    record_start = aligner.get_record_start(fake_wafer_processor, file_path, None)
+
+    chunks = []
+    original = aligner.parse_all_txt_chunk
+
+    def parse_all_txt_chunk(*args):
+        chunks.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(aligner, 'parse_all_txt_chunk', parse_all_txt_chunk)
+    job = make_job(file_path, fake_wafer_processor)
+    job.report_progress = lambda byte_count, wafer_ids: job.cancel_event.set()
+
+    with pytest.raises(aligner.AnalysisCancelled):
+        aligner.parse_all_txt_serial(fake_wafer_processor, file_path, None, job, record_start=record_start)
+    assert len(chunks) == 1
+
+
+def test_one_pass_parse_is_not_cancellable(tmp_path):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_numbered_processor.write_all_txt(file_path, make_wafers(10)[:-1])
+
+    job = make_job(file_path, fake_numbered_processor)
+    job.status = 'running'
+    aligner.parse_all_txt(fake_numbered_processor, file_path, None, job)
+
+    assert not job.cancellable
+    assert not job.cancel()
+    assert job.status == 'running'
+    # 狀態 API 讓頁面停用取消按鈕,並顯示解析完成後才會丟棄結果
+    state = job.to_dict()
+    assert state['cancellable'] is False
+    assert state['cancel_requested'] is True
+
+
+def test_chunked_parse_builds_same_dataset(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_labelled_processor.write_all_txt(file_path, make_wafers(30))
+    monkeypatch.setattr(aligner, 'SERIAL_PARSE_CHUNK_SIZE', 2048)
+
+    result = aligner.parse_all_txt(fake_labelled_processor, file_path, None)
+    assert all(isinstance(data['z_values'], aligner.np.ndarray) for data in result['wafer_data'].values())
+
+    chunked = aligner.WaferDataset.from_wafer_data(result['wafer_data'])
+    whole = aligner.WaferDataset.from_wafer_data(fake_labelled_processor.process_all_txt(file_path, None)['wafer_data'])
+    assert chunked.wafer_ids == whole.wafer_ids
+    for axis in aligner.WaferDataset.AXES:
+        assert aligner.np.array_equal(chunked.values[axis], whole.values[axis])
+        assert aligner.np.array_equal(chunked.offsets[axis], whole.offsets[axis])
+
+
+def test_learned_record_start_is_persisted(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(20))
+    record_start = aligner.get_record_start(fake_wafer_processor, file_path, None)
+    assert record_start is not None
+
+    # 重新啟動後直接讀取保存的樣式,不再推得
+    aligner.record_starts.clear()
+    monkeypatch.setattr(aligner, 'learn_record_start', lambda *args: pytest.fail('record start learned again'))
+    assert aligner.get_record_start(fake_wafer_processor, file_path, None) == record_start
+
+
+def test_record_start_is_checked_per_file(tmp_path):
+    first_path = str(tmp_path / 'first.txt')
+    fake_wafer_processor.write_all_txt(first_path, make_wafers(20))
+    assert aligner.get_record_start(fake_wafer_processor, first_path, None) is not None
+
+    # 同一處理模組的另一個檔案:STANDARD 行在第一片晶圓之後,切段後的分段缺少標準值
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(20))
+    with open(file_path) as f:
+        lines = f.readlines()
+    lines.insert(3, lines.pop(1))
+    with open(file_path, 'w') as f:
+        f.writelines(lines)
+
+    assert aligner.get_record_start(fake_wafer_processor, file_path, None) is None
+    job = make_job(file_path, fake_wafer_processor)
+    result = aligner.parse_all_txt(fake_wafer_processor, file_path, None, job)
+    assert job.parsed_end is None
+    assert aligner.all_txt_results_equal(result, fake_wafer_processor.process_all_txt(file_path, None))
+
+
+def test_disagreeing_chunks_fall_back_to_whole_parse(tmp_path, monkeypatch):
+    first_path = str(tmp_path / 'first.txt')
+    fake_wafer_processor.write_all_txt(first_path, make_wafers(20))
+    assert aligner.get_record_start(fake_wafer_processor, first_path, None) is not None
+
+    # 檔案後段另有 STANDARD 行 (開頭的小樣本中看不到),各段解析出的標準值不同
+    file_path = str(tmp_path / 'ALL.txt')
+    fake_wafer_processor.write_all_txt(file_path, make_wafers(60))
+    with open(file_path, 'a') as f:
+        f.write('STANDARD 9.0 9.0 9.0\nWAFER W99 10:00:00\nTD 1.0 1.0 1.0\n')
+    monkeypatch.setattr(aligner, 'RECORD_START_CHECK_SIZE', 2048)
+    monkeypatch.setattr(aligner, 'SERIAL_PARSE_CHUNK_SIZE', 4096)
+
+    with pytest.raises(aligner.RecordBoundaryMismatch):
+        record_start = aligner.get_record_start(fake_wafer_processor, file_path, None)
+        aligner.parse_all_txt_serial(fake_wafer_processor, file_path, None, record_start=record_start)
+
+    result = aligner.parse_all_txt(fake_wafer_processor, file_path, None)
+    assert result['z_standard'] == 9.0
+    assert aligner.all_txt_results_equal(result, fake_wafer_processor.process_all_txt(file_path, None))
+
+
+def test_batch_workers_reuse_parent_record_start(tmp_path, monkeypatch):
+    lots = []
+    for index in range(3):
+        file_path = str(tmp_path / f"ALL{index}.txt")
+        fake_wafer_processor.write_all_txt(file_path, make_wafers(20, seed=index))
+        lots.append((f"lot{index}", str(tmp_path / 'AutoZLog.txt'), file_path))
+    monkeypatch.setattr(aligner, 'get_processor_module', lambda machine_type: fake_wafer_processor)
+    monkeypatch.setattr(aligner, 'process_autoz_log_worker',
+                        lambda path, module, machine_type: {'success': True, 'timestamp': None})
+
+    known = aligner.learn_batch_record_start('FAKE', lots)
+
+    # 工作行程:記憶體與保存的結果皆為空,只由初始化載入主行程的結果
+    aligner.record_starts.clear()
+    monkeypatch.setattr(aligner, 'RECORD_START_CACHE_PATH', str(tmp_path / 'missing' / 'record_starts.json'))
+    monkeypatch.setattr(aligner, 'learn_record_start', lambda *args: pytest.fail('record start learned again'))
+    aligner.init_batch_worker(known)
+    for _, _, file_path in lots:
+        assert aligner.get_record_start(fake_wafer_processor, file_path, None) is not None
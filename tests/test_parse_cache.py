@@ -0,0 +1,45 @@
+"""解析結果快取 (ParseCache) 的 meta 以 JSON 儲存、讀取時不使用 pickle 的測試"""
+from datetime import date, datetime
+
+import numpy as np
+
+import autoz_aligner as aligner
+
+
+def test_meta_round_trip(tmp_path):
+    cache = aligner.ParseCache(str(tmp_path), 1024 * 1024)
+    meta = {
+        'fields': {'x_standard': np.float64(1.5), 'z_standard': float('nan'), 'limits': (1, 2.5, None)},
+        'wafer_ids': ['W1', 2, np.int64(3)],
+        'start_times': [datetime(2024, 1, 2, 3, 4, 5, 6), date(2024, 1, 2), '09:00:00'],
+        'parsed_end': 1234,
+        'counts': {1: [True, False], ('a', 1): {}},
+    }
+    arrays = {'z_values': np.arange(5, dtype=np.float64)}
+    cache.store('key', meta, arrays)
+
+    loaded_meta, loaded_arrays = cache.load('key')
+    assert loaded_meta['fields']['x_standard'] == 1.5
+    assert np.isnan(loaded_meta['fields']['z_standard'])
+    assert loaded_meta['fields']['limits'] == (1, 2.5, None)
+    assert loaded_meta['wafer_ids'] == ['W1', 2, 3]
+    assert loaded_meta['start_times'] == meta['start_times']
+    assert loaded_meta['parsed_end'] == 1234
+    assert loaded_meta['counts'] == {1: [True, False], ('a', 1): {}}
+    assert np.array_equal(loaded_arrays['z_values'], arrays['z_values'])
+
+
+def test_unsupported_meta_is_not_cached(tmp_path):
+    cache = aligner.ParseCache(str(tmp_path), 1024 * 1024)
+    cache.store('key', {'timestamp': object()}, {})
+
+    assert cache.load('key') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_pickled_meta_is_ignored(tmp_path):
+    cache = aligner.ParseCache(str(tmp_path), 1024 * 1024)
+    with open(tmp_path / 'key.npz', 'wb') as f:
+        np.savez(f, meta=np.array([{'timestamp': 1}], dtype=object))
+
+    assert cache.load('key') is None
@@ -0,0 +1,39 @@
+"""多個實例共用使用記錄 spool 時,每筆記錄恰好寫入一次"""
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import autoz_aligner as aligner
+
+
+class SlowSQLiteLogTarget(aligner.SQLiteLogTarget):
+    """寫入前稍候,讓兩個實例的讀取、送出與移除交錯"""
+
+    def write(self, records):
+        time.sleep(0.01)
+        super().write(records)
+
+
+def log_records(spool_path, db_path, prefix, count):
+    logger = aligner.UsageLogger(spool_path, SlowSQLiteLogTarget(db_path), batch_size=7)
+    for index in range(count):
+        logger.log(f"{prefix}-{index}")
+        if index % 10 == 0:
+            time.sleep(0.005)
+    return logger.flush(60)
+
+
+def test_shared_spool_sends_each_record_once(tmp_path):
+    spool_path = str(tmp_path / 'spool' / 'usage_log_spool.jsonl')
+    db_path = str(tmp_path / 'usage.db')
+
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(log_records, spool_path, db_path, f"p{worker}", 60) for worker in range(3)]
+        assert all(future.result() for future in futures)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        statuses = [row[0] for row in conn.execute('SELECT Status FROM apps_log')]
+    finally:
+        conn.close()
+    assert sorted(statuses) == sorted(f"p{worker}-{index}" for worker in range(3) for index in range(60))
@@ -0,0 +1,73 @@
+"""版本檢查:取得確定結果前分析相關 API 拒絕執行,掃描失敗時保留先前確定的結果"""
+import threading
+
+import pytest
+
+import autoz_aligner as aligner
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    checker = aligner.VersionChecker(ttl=600, timeout=0.05)
+    monkeypatch.setattr(aligner, 'version_checker', checker)
+    return checker
+
+
+def post_select_machine():
+    with aligner.app.test_client() as client:
+        return client.post('/api/select_machine', json={'machine_type': 'NO_SUCH_MACHINE'},
+                           headers={aligner.SESSION_HEADER: 'test'}).get_json()
+
+
+def test_actions_blocked_until_verdict(checker, monkeypatch):
+    release = threading.Event()
+
+    def check_version():
+        release.wait(5)
+        return {'status': 'ok'}
+
+    monkeypatch.setattr(aligner, 'check_version', check_version)
+    assert checker.get()['status'] == 'unknown'
+    result = post_select_machine()
+    assert not result['success']
+    assert 'still being checked' in result['error']
+
+    release.set()
+    checker._done.wait(5)
+    assert checker.get()['status'] == 'ok'
+    assert 'still being checked' not in (post_select_machine().get('error') or '')
+
+
+def test_permission_error_blocks_actions(checker, monkeypatch):
+    monkeypatch.setattr(aligner, 'check_version', lambda: {
+        'status': 'error', 'type': 'permission', 'message': 'Failed to get launch permission.'
+    })
+    result = post_select_machine()
+    assert not result['success']
+    assert result['error'] == 'Failed to get launch permission.'
+
+
+def test_failed_rescan_keeps_previous_verdict(checker, monkeypatch):
+    monkeypatch.setattr(aligner, 'check_version', lambda: {'status': 'ok'})
+    assert checker.get()['status'] == 'ok'
+
+    def check_version():
+        raise OSError('share unavailable')
+
+    monkeypatch.setattr(aligner, 'check_version', check_version)
+    checker.refresh()
+    checker._done.wait(5)
+    assert checker.get()['status'] == 'ok'
+
+
+def test_failed_first_scan_is_retried(checker, monkeypatch):
+    def check_version():
+        raise OSError('share unavailable')
+
+    monkeypatch.setattr(aligner, 'check_version', check_version)
+    assert checker.get()['type'] == 'exception'
+
+    monkeypatch.setattr(aligner, 'check_version', lambda: {'status': 'ok'})
+    checker.get()
+    checker._done.wait(5)
+    assert checker.get()['status'] == 'ok'